@@ -25,6 +25,9 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from etl.parser import MTNParser
 from etl.loader import MySQLDatabaseLoader
+from etl.prefilter import is_momo_sms
+from etl.event_log import EventLog, ApiStoreView
+from etl.dashboard import read_dashboard_progress
 from dsa.search_comparison import SearchComparison
 from dsa.sorting_comparison import SortingComparison
 
@@ -37,6 +40,10 @@ class UnifiedRESTAPIHandler(BaseHTTPRequestHandler):
     Provides transaction management and DSA demonstrations.
     """
     
+    # Event log store shared by all requests, opened once by run_unified_rest_api
+    event_log: Optional[EventLog] = None
+    api_store: Optional[ApiStoreView] = None
+    
     def __init__(self, *args, **kwargs):
         # Initialize data storage
         self.transactions = []
@@ -46,7 +53,18 @@ class UnifiedRESTAPIHandler(BaseHTTPRequestHandler):
         super().__init__(*args, **kwargs)
     
     def load_sample_data(self):
-        """Load sample transaction data from XML file."""
+        """Load transactions from the event log store, or sample data from the XML file."""
+        store = self.api_store
+        if store is not None:
+            try:
+                store.refresh(self.event_log)
+            except Exception as e:
+                print(f"Error catching up the event log store: {e}")
+            # Changes made by a request stay out of the shared store
+            self.transactions = [dict(transaction) for transaction in store.transactions]
+            self.transaction_id_counter = len(self.transactions) + 1
+            return
+        
         try:
             xml_file = Path(__file__).parent.parent / "data" / "raw" / "modified_sms_v2.xml"
             if xml_file.exists():
@@ -124,18 +142,7 @@ class UnifiedRESTAPIHandler(BaseHTTPRequestHandler):
     
     def _is_momo_sms(self, body: str, address: str) -> bool:
         """Check if SMS is a MoMo transaction."""
-        momo_addresses = ['M-Money', 'MTN', 'MoMo', 'Mobile Money']
-        if any(addr.lower() in address.lower() for addr in momo_addresses):
-            return True
-        
-        momo_keywords = [
-            'RWF', 'UGX', 'deposit', 'withdraw', 'transfer', 'payment',
-            'balance', 'mobile money', 'momo', 'transaction', 'TxId',
-            'received', 'sent', 'completed', 'fee', 'new balance'
-        ]
-        
-        body_lower = body.lower()
-        return any(keyword.lower() in body_lower for keyword in momo_keywords)
+        return is_momo_sms(body, address)
     
     def _authenticate(self) -> bool:
         """Check Basic Authentication credentials."""
@@ -625,6 +632,10 @@ class UnifiedRESTAPIHandler(BaseHTTPRequestHandler):
     def _handle_get_dashboard_data(self):
         """Handle GET /api/dashboard-data"""
         dashboard_data = self._get_dashboard_data()
+        # Progress of an ETL load that is still publishing dashboard snapshots
+        progress = read_dashboard_progress()
+        if progress:
+            dashboard_data['etl_progress'] = progress
         self._send_response(200, dashboard_data)
     
     # Analytics handlers
@@ -1017,8 +1028,23 @@ class UnifiedRESTAPIHandler(BaseHTTPRequestHandler):
         pass
 
 
+def open_event_log_store():
+    """Catch up the API store view of the event log once, if there is a log."""
+    try:
+        event_log = EventLog()
+        if event_log.segments():
+            store = ApiStoreView()
+            store.catch_up(event_log)
+            UnifiedRESTAPIHandler.event_log = event_log
+            UnifiedRESTAPIHandler.api_store = store
+            print(f"Serving {len(store.transactions)} transactions from the event log")
+    except Exception as e:
+        print(f"Error loading event log store: {e}")
+
+
 def run_unified_rest_api(port: int = 8000):
     """Run the unified REST API server."""
+    open_event_log_store()
     server_address = ('', port)
     httpd = HTTPServer(server_address, UnifiedRESTAPIHandler)
     print(f"Unified REST API Server running on port {port}")
@@ -17,3 +17,58 @@ CREATE TABLE IF NOT EXISTS processed_files (
 CREATE INDEX idx_processed_files_name ON processed_files(file_name);
 CREATE INDEX idx_processed_files_hash ON processed_files(file_hash);
 CREATE INDEX idx_processed_files_processed_at ON processed_files(processed_at);
+
+-- Batch-level checkpoints so an interrupted file resumes where it stopped, and the
+-- high watermarks (last SMS _id) of incremental SQLite sources
+CREATE TABLE IF NOT EXISTS etl_checkpoints (
+    file_path VARCHAR(500) NOT NULL PRIMARY KEY,
+    file_hash VARCHAR(64) NOT NULL,
+    last_position BIGINT NOT NULL DEFAULT 0,
+    records_loaded INT DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Work queue: byte ranges of input files leased to ETL workers on any host
+CREATE TABLE IF NOT EXISTS etl_leases (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    file_path VARCHAR(500) NOT NULL,
+    file_hash VARCHAR(64) NOT NULL,
+    range_start BIGINT NOT NULL,
+    range_end BIGINT NOT NULL,
+    status ENUM('PENDING', 'LEASED', 'DONE', 'FAILED') DEFAULT 'PENDING',
+    owner VARCHAR(255) NULL,
+    lease_expires_at DATETIME NULL,
+    heartbeat_at DATETIME NULL,
+    attempts INT DEFAULT 0,
+    records_loaded INT DEFAULT 0,
+    error_message TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_etl_leases_range (file_hash, file_path(255), range_start)
+);
+
+-- Claiming scans pending and expired leases
+CREATE INDEX idx_etl_leases_claim ON etl_leases(status, lease_expires_at);
+
+-- Raw staging: MoMo SMS stored unparsed (--stage-raw), claimed in chunks by parsers (--parse-staged)
+CREATE TABLE IF NOT EXISTS raw_sms (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    source VARCHAR(255) NOT NULL,
+    source_hash VARCHAR(64) NOT NULL,
+    sms_index INT NOT NULL,
+    address VARCHAR(100) NULL,
+    sms_date BIGINT NULL,
+    readable_date VARCHAR(100) NULL,
+    body TEXT NOT NULL,
+    status ENUM('PENDING', 'CLAIMED', 'PARSED', 'FAILED') DEFAULT 'PENDING',
+    owner VARCHAR(255) NULL,
+    claim_expires_at DATETIME NULL,
+    attempts INT DEFAULT 0,
+    error_message TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    parsed_at DATETIME NULL,
+    UNIQUE KEY uq_raw_sms_position (source_hash, sms_index)
+);
+
+-- Claiming scans pending and expired rows
+CREATE INDEX idx_raw_sms_claim ON raw_sms(status, claim_expires_at);
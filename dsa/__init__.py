@@ -7,5 +7,7 @@ for the MoMo Data Processing System assignment requirements.
 from .search_comparison import SearchComparison
 from .sorting_comparison import SortingComparison
 from .data_structures import DataStructuresDemo
+from .bloom_filter import BloomFilter, ScalableBloomFilter
 
-__all__ = ['SearchComparison', 'SortingComparison', 'DataStructuresDemo']
+__all__ = ['SearchComparison', 'SortingComparison', 'DataStructuresDemo',
+           'BloomFilter', 'ScalableBloomFilter']
@@ -0,0 +1,231 @@
+"""
+Bloom Filter Module
+Implements standard and scalable Bloom filters for probabilistic membership tests.
+"""
+
+import json
+import math
+import os
+import struct
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+Key = Union[str, bytes]
+
+
+def _key_hashes(key: Key) -> tuple:
+    """Two independent 64-bit hashes of a key, for double hashing."""
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    digest = blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """
+    Fixed-capacity Bloom filter.
+
+    Sized for `capacity` keys at a false positive rate of `error_rate`.
+    Membership tests never give false negatives; the false positive rate
+    rises above error_rate once more than capacity keys are added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Optimal bit count m = -n ln p / (ln 2)^2 and hash count k = m/n ln 2
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: Key) -> List[int]:
+        h1, h2 = _key_hashes(key)
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, key: Key) -> bool:
+        """Add a key; returns False if it was (probably) present already."""
+        added = False
+        bits = self.bits
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key: Key) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def update(self, other: 'BloomFilter'):
+        """Add all keys of a filter with the same parameters (bitwise OR)."""
+        if other.num_bits != self.num_bits or other.num_hashes != self.num_hashes:
+            raise ValueError("Bloom filters differ in size or hash count")
+        self.bits = bytearray((int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little'))
+                              .to_bytes(len(self.bits), 'little'))
+        # Keys in both filters cannot be told apart, so estimate the count
+        # from the fraction of set bits: n = -m/k ln(1 - X/m)
+        set_bits = int.from_bytes(self.bits, 'little').bit_count()
+        if set_bits >= self.num_bits:
+            self.count = max(self.count, other.count, self.capacity)
+        else:
+            estimate = -self.num_bits / self.num_hashes * math.log(1 - set_bits / self.num_bits)
+            self.count = max(self.count, other.count, round(estimate))
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows with the number of keys (Almeida et al., 2007).
+
+    Keys are added to the newest of a series of BloomFilters. Once it holds
+    its capacity, a new filter `growth` times larger with an error rate
+    `tightening` times smaller is started, so the overall false positive
+    rate stays below error_rate however many keys are added. The filter can
+    be saved to and loaded from a file together with a metadata dict.
+    """
+
+    _MAGIC = b'SBF1'
+    _FILTER_HEADER = struct.Struct('<QdQIQ')  # capacity, error rate, bits, hashes, count
+
+    def __init__(self, initial_capacity: int = 100000, error_rate: float = 0.001,
+                 growth: int = 2, tightening: float = 0.8):
+        if growth < 1:
+            raise ValueError("growth must be at least 1")
+        if not 0 < tightening < 1:
+            raise ValueError("tightening must be between 0 and 1")
+
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.metadata: Dict[str, Any] = {}
+        # The first filter's rate is chosen so the geometric series of all
+        # filters' rates sums to error_rate
+        self.filters: List[BloomFilter] = [
+            BloomFilter(initial_capacity, error_rate * (1 - tightening))
+        ]
+
+    def add(self, key: Key) -> bool:
+        """Add a key; returns False if it was (probably) present already."""
+        if key in self:
+            return False
+
+        current = self.filters[-1]
+        if current.is_full:
+            current = BloomFilter(current.capacity * self.growth, current.error_rate * self.tightening)
+            self.filters.append(current)
+        current.add(key)
+        return True
+
+    def __contains__(self, key: Key) -> bool:
+        # The newest filter holds the most keys, so check it first
+        return any(key in bloom for bloom in reversed(self.filters))
+
+    def __len__(self) -> int:
+        return sum(len(bloom) for bloom in self.filters)
+
+    @property
+    def capacity(self) -> int:
+        return sum(bloom.capacity for bloom in self.filters)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+    def update(self, other: 'ScalableBloomFilter'):
+        """
+        Add all keys of another filter created with the same parameters, e.g.
+        a copy that another process extended from the same saved file.
+
+        Filters are grown in the same sequence, so they are merged slice by
+        slice; slices only the other filter has are copied. Metadata is not
+        merged.
+        """
+        if (other.initial_capacity, other.error_rate, other.growth, other.tightening) != \
+                (self.initial_capacity, self.error_rate, self.growth, self.tightening):
+            raise ValueError("Scalable Bloom filters were created with different parameters")
+
+        for bloom, other_bloom in zip(self.filters, other.filters):
+            bloom.update(other_bloom)
+        for other_bloom in other.filters[len(self.filters):]:
+            bloom = BloomFilter(other_bloom.capacity, other_bloom.error_rate)
+            bloom.bits = bytearray(other_bloom.bits)
+            bloom.count = other_bloom.count
+            self.filters.append(bloom)
+
+    def save(self, file_path: Path):
+        """Write the filter and its metadata to a file, replacing it atomically."""
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        header = json.dumps({
+            'initial_capacity': self.initial_capacity,
+            'error_rate': self.error_rate,
+            'growth': self.growth,
+            'tightening': self.tightening,
+            'filters': len(self.filters),
+            'metadata': self.metadata
+        }).encode('utf-8')
+
+        temp_path = file_path.with_name(file_path.name + f'.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(self._MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for bloom in self.filters:
+                f.write(self._FILTER_HEADER.pack(bloom.capacity, bloom.error_rate, bloom.num_bits,
+                                                 bloom.num_hashes, bloom.count))
+                f.write(bloom.bits)
+        os.replace(temp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: Path) -> 'ScalableBloomFilter':
+        """Read a filter written by save()."""
+        with open(file_path, 'rb') as f:
+            if f.read(4) != cls._MAGIC:
+                raise ValueError(f"{file_path} is not a saved ScalableBloomFilter")
+            (header_length,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_length))
+
+            scalable = cls(header['initial_capacity'], header['error_rate'],
+                           header['growth'], header['tightening'])
+            scalable.metadata = header.get('metadata', {})
+            scalable.filters = []
+            for _ in range(header['filters']):
+                capacity, error_rate, num_bits, num_hashes, count = cls._FILTER_HEADER.unpack(
+                    f.read(cls._FILTER_HEADER.size)
+                )
+                bloom = BloomFilter(capacity, error_rate)
+                bits = f.read((num_bits + 7) // 8)
+                if bloom.num_bits != num_bits or bloom.num_hashes != num_hashes or len(bits) != len(bloom.bits):
+                    raise ValueError(f"{file_path} is truncated or was written with different parameters")
+                bloom.bits = bytearray(bits)
+                bloom.count = count
+                scalable.filters.append(bloom)
+        return scalable
+
+    @classmethod
+    def load_or_create(cls, file_path: Optional[Path], **kwargs) -> 'ScalableBloomFilter':
+        """Load a saved filter, or start an empty one if there is none (or it is unreadable)."""
+        if file_path is not None and Path(file_path).exists():
+            try:
+                return cls.load(file_path)
+            except (OSError, ValueError, KeyError, struct.error):
+                pass
+        return cls(**kwargs)
@@ -6,3 +6,14 @@ MoMo SMS transaction data from XML format into a SQLite database.
 
 __version__ = "1.0.0"
 __author__ = "MoMo Data Processing Team"
+
+__all__ = ['iter_sms', 'iter_parse', 'iter_validate', 'iter_convert', 'load_stream']
+
+
+def __getattr__(name):
+    # Imported on first use, so importing any etl module does not pull in the
+    # loader and its database driver
+    if name in __all__:
+        from . import stream
+        return getattr(stream, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
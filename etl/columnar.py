@@ -0,0 +1,109 @@
+"""
+Columnar Transaction Output
+Writes parsed transactions to month-partitioned Parquet for analytics and rebuilds
+"""
+
+import logging
+import re
+from dataclasses import fields
+from pathlib import Path
+from typing import List, Optional
+
+from .config import PARQUET_DIR
+from .parser import ParsedTransaction, PARSER_VERSION
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pd = None
+    pa = None
+    pq = None
+
+TRANSACTION_COLUMNS = [field.name for field in fields(ParsedTransaction)]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet output needs pandas and pyarrow: pip install pandas pyarrow")
+
+
+def transactions_to_frame(transactions: List[ParsedTransaction], source: str = '') -> 'pd.DataFrame':
+    """
+    Build a DataFrame with one column per ParsedTransaction field.
+
+    Adds transaction_date (parsed timestamp), month ('YYYY-MM', or
+    'unknown' when the date cannot be parsed), source and parser_version.
+    """
+    _require_pyarrow()
+
+    frame = pd.DataFrame({
+        column: [getattr(transaction, column) for transaction in transactions]
+        for column in TRANSACTION_COLUMNS
+    })
+    frame['sms_index'] = frame['sms_index'].astype('Int64')
+    frame['new_balance'] = frame['new_balance'].astype('float64')
+
+    frame['transaction_date'] = pd.to_datetime(frame['date'], format='mixed', errors='coerce')
+    frame['month'] = frame['transaction_date'].dt.strftime('%Y-%m').fillna('unknown')
+    frame['source'] = source
+    frame['parser_version'] = PARSER_VERSION
+    return frame
+
+
+def write_parquet(transactions: List[ParsedTransaction], source: str,
+                  output_dir: Path = PARQUET_DIR) -> int:
+    """
+    Write transactions to a Parquet dataset partitioned by month.
+
+    Files are named after the source. Before writing, the files an earlier
+    run of the same source left in any month partition are deleted, so
+    processing it again replaces all of its data even when the new run
+    covers fewer months or files. Other sources in the same partitions are
+    left untouched.
+
+    Returns:
+        Number of month partitions written
+    """
+    _require_pyarrow()
+    if not transactions:
+        return 0
+
+    frame = transactions_to_frame(transactions, source)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    basename = re.sub(r'[^A-Za-z0-9_.-]+', '_', source) or 'transactions'
+    own_file = re.compile(rf'^{re.escape(basename)}-\d+\.parquet$')
+    for path in output_dir.glob('month=*/*.parquet'):
+        if own_file.match(path.name):
+            path.unlink()
+    pq.write_to_dataset(
+        table,
+        root_path=str(output_dir),
+        partition_cols=['month'],
+        basename_template=f"{basename}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+    months = frame['month'].nunique()
+    logger.info(f"Wrote {len(frame)} transactions from {source} to {months} month partitions in {output_dir}")
+    return months
+
+
+def read_parquet(output_dir: Path = PARQUET_DIR, months: Optional[List[str]] = None,
+                 columns: Optional[List[str]] = None) -> 'pd.DataFrame':
+    """
+    Read transactions back from the Parquet dataset.
+
+    Args:
+        output_dir: Dataset root
+        months: Only read these 'YYYY-MM' partitions
+        columns: Only read these columns
+    """
+    _require_pyarrow()
+    filters = [('month', 'in', months)] if months else None
+    return pq.read_table(str(output_dir), columns=columns, filters=filters).to_pandas()
@@ -17,6 +17,11 @@ DEAD_LETTER_DIR = LOGS_DIR / "dead_letter"
 XML_INPUT_FILE = RAW_DIR / "modified_sms_v2.xml"
 DATABASE_FILE = DATA_DIR / "db.sqlite3"
 DASHBOARD_JSON_FILE = PROCESSED_DIR / "dashboard.json"
+PARQUET_DIR = PROCESSED_DIR / "parquet"  # month-partitioned transactions (--parquet)
+EVENT_LOG_DIR = PROCESSED_DIR / "events"  # append-only transaction log (--event-log)
+EVENT_VIEW_DIR = EVENT_LOG_DIR / "views"
+DEDUP_FILTER_FILE = PROCESSED_DIR / "dedup_bloom.bin"  # Bloom filter of loaded SMS
+BENCHMARK_DIR = PROCESSED_DIR / "benchmarks"  # results of scripts/benchmark_etl.py
 ETL_LOG_FILE = LOGS_DIR / "etl.log"
 
 # Database configuration
@@ -38,6 +43,53 @@ MIN_AMOUNT = 100
 MAX_PHONE_LENGTH = 15
 MIN_PHONE_LENGTH = 10
 
+# Loading
+ETL_BATCH_SIZE = int(os.getenv('ETL_BATCH_SIZE', 1000))  # rows per commit / checkpoint
+LOAD_INSERT_MODE = os.getenv('LOAD_INSERT_MODE', 'batch')  # 'batch': one multi-row INSERT per batch, 'row': one per row,
+                                                            # 'bulk': LOAD DATA LOCAL INFILE and a set-based merge
+BULK_SPOOL_DIR = os.getenv('BULK_SPOOL_DIR')  # TSV files of bulk loads; the system temp directory when unset
+DASHBOARD_SNAPSHOT_INTERVAL = float(os.getenv('DASHBOARD_SNAPSHOT_INTERVAL', 1.0))  # seconds between live snapshots
+DEDUP_FILTER_ENABLED = os.getenv('DEDUP_FILTER_ENABLED', 'true').lower() == 'true'
+DEDUP_FILTER_CAPACITY = int(os.getenv('DEDUP_FILTER_CAPACITY', 100000))  # first slice; grows as needed
+DEDUP_FILTER_ERROR_RATE = float(os.getenv('DEDUP_FILTER_ERROR_RATE', 0.001))
+
+# Dead-letter spool
+DEAD_LETTER_MAX_BYTES = int(os.getenv('DEAD_LETTER_MAX_BYTES', 8 * 1024 * 1024))  # per segment
+
+# Event log
+EVENT_LOG_SEGMENT_BYTES = int(os.getenv('EVENT_LOG_SEGMENT_BYTES', 64 * 1024 * 1024))
+
+# Latest-first ingestion (--latest-first)
+LATEST_FIRST_WINDOW_DAYS = float(os.getenv('LATEST_FIRST_WINDOW_DAYS', 7))  # loaded and exported first
+LATEST_FIRST_CHUNK_SMS = int(os.getenv('LATEST_FIRST_CHUNK_SMS', 50000))  # back-fill chunk size
+
+# Directory ingestion
+XML_FILE_PATTERN = '*.xml'
+ETL_MAX_WORKERS = int(os.getenv('ETL_MAX_WORKERS', 4))
+
+# Parallel parsing of one file (--parse-workers)
+PARSE_CHUNK_SMS = int(os.getenv('PARSE_CHUNK_SMS', 20000))  # SMS per worker task
+PARSE_TRANSPORT = os.getenv('PARSE_TRANSPORT', 'shm')  # 'shm' (shared memory) or 'pickle'
+
+# Work queue (leases shared by workers on any host through MySQL)
+QUEUE_RANGE_BYTES = int(os.getenv('QUEUE_RANGE_BYTES', 8 * 1024 * 1024))  # input bytes per lease
+QUEUE_LEASE_SECONDS = int(os.getenv('QUEUE_LEASE_SECONDS', 60))  # lease expiry without heartbeat
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', 3))
+QUEUE_POLL_INTERVAL = float(os.getenv('QUEUE_POLL_INTERVAL', 2))  # seconds between claims when idle
+
+# Raw staging (--stage-raw stores SMS unparsed, --parse-staged parses them later)
+RAW_STAGE_BATCH = int(os.getenv('RAW_STAGE_BATCH', 5000))  # SMS per staging commit
+RAW_CLAIM_SMS = int(os.getenv('RAW_CLAIM_SMS', 1000))  # staged SMS per parser claim
+RAW_CLAIM_SECONDS = int(os.getenv('RAW_CLAIM_SECONDS', 120))  # claim expiry
+RAW_PARSE_IDLE_SECONDS = float(os.getenv('RAW_PARSE_IDLE_SECONDS', 30))  # parsers exit after this long without work
+
+# Ingest daemon
+DAEMON_FLUSH_INTERVAL = float(os.getenv('DAEMON_FLUSH_INTERVAL', 5))  # seconds
+DAEMON_BATCH_RECORDS = int(os.getenv('DAEMON_BATCH_RECORDS', 500))
+DAEMON_POLL_INTERVAL = float(os.getenv('DAEMON_POLL_INTERVAL', 2))  # seconds, polling fallback only
+DAEMON_RETRY_MAX = float(os.getenv('DAEMON_RETRY_MAX', 300))  # seconds, longest wait between failed flushes
+DAEMON_MAX_BUFFER = int(os.getenv('DAEMON_MAX_BUFFER', 50000))  # SMS held while the database is down
+
 # Transaction categories
 TRANSACTION_CATEGORIES = {
     'DEPOSIT': ['deposit', 'credit', 'topup', 'receive'],
@@ -70,6 +122,8 @@ DATE_FORMATS = [
 # Logging configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_AGGREGATE_WINDOW = float(os.getenv('LOG_AGGREGATE_WINDOW', 10))  # seconds
+LOG_AGGREGATE_BURST = int(os.getenv('LOG_AGGREGATE_BURST', 5))  # similar errors logged per window
 
 # API configuration (if using FastAPI)
 API_HOST = os.getenv('API_HOST', 'localhost')
@@ -0,0 +1,373 @@
+"""
+Continuous Ingest Daemon
+Watches the raw data directory and micro-batches new SMS into the database
+"""
+
+import logging
+import signal
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import (
+    RAW_DIR, XML_FILE_PATTERN, DAEMON_FLUSH_INTERVAL, DAEMON_BATCH_RECORDS, DAEMON_POLL_INTERVAL,
+    DAEMON_RETRY_MAX, DAEMON_MAX_BUFFER
+)
+from .parser import MTNParser
+from .loader import MySQLDatabaseLoader, TransactionRow
+from .file_tracker import FileTracker
+from .sources import SmsRecord, iter_xml_sms
+from .dead_letter import DeadLetterSpool
+from .validation import REJECT_PREFIX, validate_transactions
+
+logger = logging.getLogger(__name__)
+
+DAEMON_WATERMARK = 'daemon-watermark'  # etl_checkpoints hash of the per-file watermarks
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+
+class PollingWatcher:
+    """Detects new or modified files by comparing size and mtime between polls."""
+
+    def __init__(self, directory: Path, pattern: str, poll_interval: float = DAEMON_POLL_INTERVAL):
+        self.directory = directory
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self.known: Dict[Path, Tuple[int, float]] = {}
+        self.candidates: Dict[Path, Tuple[int, float]] = {}
+        self.last_poll = 0.0
+
+    def register(self, file_path: Path):
+        """Record the current state of a file so it is not reported as changed."""
+        self.known[file_path] = self._state(file_path)
+
+    def _state(self, file_path: Path) -> Tuple[int, float]:
+        stat = file_path.stat()
+        return stat.st_size, stat.st_mtime
+
+    def wait(self, timeout: float) -> List[Path]:
+        """Wait up to timeout seconds and return files that changed and are stable."""
+        delay = max(0.0, self.last_poll + self.poll_interval - time.monotonic())
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(delay)
+        self.last_poll = time.monotonic()
+
+        changed = []
+        for file_path in sorted(self.directory.glob(self.pattern)):
+            try:
+                state = self._state(file_path)
+            except FileNotFoundError:
+                continue
+
+            if self.known.get(file_path) == state:
+                continue
+
+            # Only report a file once it has stopped changing for a full poll,
+            # so a backup that is still being copied is not read half-written
+            if self.candidates.get(file_path) == state:
+                del self.candidates[file_path]
+                self.known[file_path] = state
+                changed.append(file_path)
+            else:
+                self.candidates[file_path] = state
+
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Reports files as soon as they are closed after writing or moved into the directory."""
+
+    def __init__(self, directory: Path, pattern: str):
+        self.directory = directory
+        self.pattern = pattern
+        self.inotify = INotify()
+        self.inotify.add_watch(str(directory), inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+
+    def register(self, file_path: Path):
+        pass
+
+    def wait(self, timeout: float) -> List[Path]:
+        """Wait up to timeout seconds and return files that were written."""
+        changed = []
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            file_path = self.directory / event.name
+            if file_path.match(self.pattern) and file_path not in changed:
+                changed.append(file_path)
+        return changed
+
+    def close(self):
+        self.inotify.close()
+
+
+class IngestDaemon:
+    """
+    Long-running ingest loop that keeps the parser and database connection warm.
+
+    New SMS are buffered and flushed to the loader whenever the buffer holds
+    batch_records SMS or the oldest buffered SMS has waited flush_interval
+    seconds. Each file keeps a high-watermark of the newest SMS date already
+    buffered, so a backup that is rewritten with more messages only
+    contributes the new ones instead of being re-parsed as a whole. The
+    watermarks are saved to etl_checkpoints once the SMS below them have been
+    loaded, so a restarted daemon carries on where it stopped.
+
+    While the database is down, failed flushes are retried with exponential
+    backoff up to retry_max seconds instead of on every new SMS, and once the
+    buffer holds max_buffer SMS they are moved to the dead-letter spool for a
+    later --replay-dead-letters. Buffered SMS are parsed and validated only
+    once: a retry loads the rows kept from the failed attempt, so parse
+    failures and rejects are not spooled again.
+    """
+
+    def __init__(self, watch_dir: Path = RAW_DIR, pattern: str = XML_FILE_PATTERN,
+                 flush_interval: float = DAEMON_FLUSH_INTERVAL,
+                 batch_records: int = DAEMON_BATCH_RECORDS,
+                 poll_interval: float = DAEMON_POLL_INTERVAL,
+                 retry_max: float = DAEMON_RETRY_MAX,
+                 max_buffer: int = DAEMON_MAX_BUFFER,
+                 export_json: bool = True):
+        self.watch_dir = watch_dir
+        self.pattern = pattern
+        self.flush_interval = flush_interval
+        self.batch_records = batch_records
+        self.poll_interval = poll_interval
+        self.retry_max = retry_max
+        self.max_buffer = max_buffer
+        self.export_json = export_json
+
+        self.parser = MTNParser()
+        self.dead_letter = DeadLetterSpool()
+        self.rejects = DeadLetterSpool(prefix=REJECT_PREFIX)
+        self.loader = MySQLDatabaseLoader(dead_letter=self.dead_letter)
+        self.file_tracker = FileTracker()
+
+        self.watermarks: Dict[Path, int] = {}
+        self.saved_counts: Dict[Path, int] = {}
+        self.unsaved_watermarks: Dict[Path, int] = {}
+        self.file_counts: Dict[Path, int] = {}
+        self.buffer: List[SmsRecord] = []
+        self.buffer_started: Optional[float] = None
+        # Rows of the first parsed_count buffered SMS, kept while their load is retried
+        self.parsed_rows: List[TransactionRow] = []
+        self.parsed_count = 0
+        self.failed_flushes = 0
+        self.next_retry_at = 0.0
+        self.completed_files: List[Path] = []
+        self.running = False
+
+        self.batches_flushed = 0
+        self.total_loaded = 0
+        self.spilled = 0
+
+    def _make_watcher(self):
+        """Use inotify when available, falling back to polling."""
+        if INotify is not None:
+            try:
+                watcher = InotifyWatcher(self.watch_dir, self.pattern)
+                logger.info(f"Watching {self.watch_dir} with inotify")
+                return watcher
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({e}), falling back to polling")
+
+        logger.info(f"Watching {self.watch_dir} by polling every {self.poll_interval}s")
+        return PollingWatcher(self.watch_dir, self.pattern, self.poll_interval)
+
+    def stop(self, *args):
+        """Ask the loop to exit after the current iteration."""
+        self.running = False
+
+    def run(self):
+        """Run until stopped by a signal or KeyboardInterrupt."""
+        self.watch_dir.mkdir(parents=True, exist_ok=True)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        self.loader.connect()
+        watcher = self._make_watcher()
+        self.running = True
+
+        try:
+            # Catch up on anything that arrived while the daemon was down
+            for file_path in sorted(self.watch_dir.glob(self.pattern)):
+                watcher.register(file_path)
+                if self.file_tracker.should_process_file(file_path):
+                    self.ingest_file(file_path)
+
+            while self.running:
+                changed = watcher.wait(self._time_until_flush())
+                for file_path in changed:
+                    self.ingest_file(file_path)
+
+                if self.buffer and self._time_until_flush() <= 0:
+                    self.flush()
+
+        except KeyboardInterrupt:
+            logger.info("Ingest daemon interrupted by user")
+        finally:
+            if self.buffer:
+                self.flush()
+            watcher.close()
+            self.loader.close()
+            self.dead_letter.close()
+            self.rejects.close()
+            logger.info(f"Ingest daemon stopped after {self.batches_flushed} batches, "
+                        f"{self.total_loaded} transactions loaded, {self.spilled} SMS spilled")
+
+    def _time_until_flush(self) -> float:
+        if not self.buffer:
+            return self.flush_interval
+        due = max(self.buffer_started + self.flush_interval, self.next_retry_at)
+        return max(0.0, due - time.monotonic())
+
+    @staticmethod
+    def _watermark_key(file_path: Path) -> Path:
+        return file_path.with_name(file_path.name + '#daemon')
+
+    def _load_watermark(self, file_path: Path):
+        """Start from the watermark a previous daemon saved for this file."""
+        saved = self.file_tracker.get_checkpoint(self._watermark_key(file_path), DAEMON_WATERMARK)
+        self.watermarks[file_path] = saved['last_position'] if saved['records_loaded'] else -1
+        self.saved_counts[file_path] = saved['records_loaded']
+
+    def _save_watermarks(self):
+        """Persist the watermarks of files whose buffered SMS have all been loaded or spooled."""
+        for file_path, watermark in list(self.unsaved_watermarks.items()):
+            if self.file_tracker.save_checkpoint(
+                    self._watermark_key(file_path), DAEMON_WATERMARK, watermark,
+                    self.saved_counts.get(file_path, 0) + self.file_counts.get(file_path, 0)):
+                del self.unsaved_watermarks[file_path]
+
+    def ingest_file(self, file_path: Path):
+        """Buffer the SMS of a file that are newer than its high-watermark."""
+        if file_path not in self.watermarks:
+            self._load_watermark(file_path)
+        watermark = self.watermarks[file_path]
+        new_records = 0
+
+        try:
+            for record in iter_xml_sms(file_path):
+                timestamp = record.timestamp_ms
+                if timestamp <= watermark:
+                    continue
+
+                self.watermarks[file_path] = max(self.watermarks[file_path], timestamp)
+                self.unsaved_watermarks[file_path] = self.watermarks[file_path]
+                self.file_counts[file_path] = self.file_counts.get(file_path, 0) + 1
+                self._buffer_record(record)
+                new_records += 1
+
+        except ET.ParseError as e:
+            # Most likely still being written; the rest is picked up on the next change
+            logger.warning(f"Incomplete XML in {file_path.name} ({e}), buffered {new_records} SMS so far")
+            return
+        except OSError as e:
+            logger.error(f"Error reading {file_path.name}: {e}")
+            return
+
+        self.completed_files.append(file_path)
+        logger.info(f"Buffered {new_records} new SMS from {file_path.name}")
+
+        if not self.buffer:
+            self._save_watermarks()
+            self._mark_completed_files()
+
+    def _buffer_record(self, record: SmsRecord):
+        if not self.buffer:
+            self.buffer_started = time.monotonic()
+        self.buffer.append(record)
+
+        if len(self.buffer) >= self.batch_records and time.monotonic() >= self.next_retry_at:
+            self.flush()
+        if len(self.buffer) >= self.max_buffer:
+            self._spill_buffer()
+
+    def _spill_buffer(self):
+        """Move the buffered SMS to the dead-letter spool while the database stays down."""
+        # SMS already parsed were spooled then if they failed; only their transactions are left
+        for row in self.parsed_rows:
+            self.dead_letter.write('daemon', 'buffer_full', body=row.original_message,
+                                   timestamp=row.date, address=row.address or '',
+                                   source='daemon', sms_date=row.sms_date)
+        for record in self.buffer[self.parsed_count:]:
+            self.dead_letter.write('daemon', 'buffer_full', body=record.body,
+                                   timestamp=record.readable_date, address=record.address,
+                                   source='daemon', sms_date=record.date)
+        self.dead_letter.flush()
+        moved = len(self.parsed_rows) + len(self.buffer) - self.parsed_count
+        logger.warning(f"Database unavailable, moved {moved} buffered SMS to the dead-letter spool")
+        self.spilled += moved
+        self._clear_buffer()
+
+    def _clear_buffer(self):
+        self.buffer = []
+        self.buffer_started = None
+        self.parsed_rows = []
+        self.parsed_count = 0
+
+    def flush(self):
+        """Parse, load and publish the buffered SMS as one micro-batch."""
+        # Imported here because run.py imports this module for --daemon
+        from etl.run import parse_sms_records, convert_to_database_format
+
+        records = self.buffer
+        start = time.monotonic()
+
+        try:
+            if self.parsed_count < len(records):
+                transactions = parse_sms_records(records[self.parsed_count:], self.parser,
+                                                 dead_letter=self.dead_letter, source='daemon')
+                transactions, _ = validate_transactions(transactions, self.rejects, 'daemon')
+                self.parsed_rows.extend(convert_to_database_format(transactions))
+                self.parsed_count = len(records)
+            rows = self.parsed_rows
+            if rows:
+                loaded_before = self.loader.loaded_count
+                self.loader.load_transactions(rows)
+                self.total_loaded += self.loader.loaded_count - loaded_before
+
+                if self.export_json:
+                    self.loader.export_dashboard_json()
+        except Exception as e:
+            # Keep the buffer and retry after a backoff that doubles with every failure
+            delay = min(self.retry_max, self.flush_interval * 2 ** self.failed_flushes)
+            self.failed_flushes += 1
+            self.next_retry_at = time.monotonic() + delay
+            logger.error(f"Micro-batch of {len(records)} SMS failed, retrying in {delay:.0f}s: {e}")
+            try:
+                self.loader.close()
+                self.loader.connect()
+            except Exception as reconnect_error:
+                logger.error(f"Reconnect failed: {reconnect_error}")
+            return
+
+        self._clear_buffer()
+        self.failed_flushes = 0
+        self.next_retry_at = 0.0
+        self.batches_flushed += 1
+        self.dead_letter.flush()
+        self.rejects.flush()
+        self._save_watermarks()
+
+        # Long-running process: keep counters but not the per-record error history
+        self.parser.errors.clear()
+        self.loader.errors.clear()
+
+        logger.info(f"Flushed micro-batch of {len(records)} SMS ({len(rows)} transactions) "
+                    f"in {time.monotonic() - start:.2f}s")
+
+        self._mark_completed_files()
+
+    def _mark_completed_files(self):
+        """Record fully ingested files so one-shot runs skip them."""
+        for file_path in self.completed_files:
+            self.file_tracker.mark_file_processed(file_path, self.file_counts.get(file_path, 0), 'SUCCESS')
+        self.completed_files = []
@@ -0,0 +1,236 @@
+"""
+Dashboard Aggregates
+Incremental dashboard aggregation shared by the loader's live snapshots and the event log view
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import DASHBOARD_JSON_FILE, DASHBOARD_SNAPSHOT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+AMOUNT_RANGES = ('0-10000', '10000-50000', '50000-100000', '100000+')
+RECENT_COLUMNS = ('date', 'amount', 'status', 'type', 'sender_phone', 'receiver_phone', 'category')
+_MONTH = re.compile(r'^\d{4}-\d{2}')
+
+
+def amount_range(amount: Optional[float]) -> str:
+    """Bucket of an amount, as in the amount distribution query of the dashboard export."""
+    if amount is None:
+        return '100000+'
+    if amount < 10000:
+        return '0-10000'
+    if amount < 50000:
+        return '10000-50000'
+    if amount < 100000:
+        return '50000-100000'
+    return '100000+'
+
+
+def _date_key(date) -> str:
+    """Sort key of a transaction date: its ISO text, '' when missing."""
+    if isinstance(date, datetime):
+        return date.isoformat(sep=' ')
+    return str(date) if date else ''
+
+
+def read_dashboard_progress(dashboard_file: Path = DASHBOARD_JSON_FILE) -> Optional[Dict[str, Any]]:
+    """Progress of the load that wrote the dashboard file, or None once it has finished."""
+    try:
+        with open(dashboard_file) as f:
+            return json.load(f).get('progress')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_dashboard_json(dashboard_data: Dict[str, Any], dashboard_file: Path = DASHBOARD_JSON_FILE):
+    """Write the dashboard file atomically, so readers never see a partial snapshot."""
+    dashboard_file.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = dashboard_file.with_name(f'.{dashboard_file.name}.{os.getpid()}.tmp')
+    with open(temp_file, 'w') as f:
+        json.dump(dashboard_data, f, indent=2, default=str)
+    os.replace(temp_file, dashboard_file)
+
+
+class DashboardAggregates:
+    """
+    Dashboard counts, sums, distributions and the newest transactions, built
+    up one transaction at a time.
+
+    Used by RunningDashboard for the rows a loader inserts and by the event
+    log's DashboardView for replayed events, so both compute the dashboard
+    the same way. Distributions set to None are not tracked (and left out of
+    dashboard_data()), for sources that cannot seed them. get_state() and
+    set_state() round-trip through JSON.
+    """
+
+    recent_limit = 100
+    success_statuses = ('SUCCESS', 'COMPLETED')
+
+    def __init__(self):
+        self.total_transactions = 0
+        self.total_amount = 0.0
+        self.successful_transactions = 0
+        self.amount_ranges: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.types: Optional[Counter] = Counter()
+        self.tags: Optional[Counter] = Counter()
+        self.months: Optional[Dict[str, List[float]]] = {}
+        # Min-heap of [date key, sequence, row] keeps the newest transactions;
+        # the sequence breaks ties between equal dates, so rows (which may
+        # hold None) are never compared
+        self.recent: List[list] = []
+        self._sequence = 0
+
+    def _push_recent(self, date, row: Dict[str, Any]):
+        key = _date_key(date)
+        entry = [key, self._sequence, row]
+        self._sequence += 1
+        if len(self.recent) < self.recent_limit:
+            heapq.heappush(self.recent, entry)
+        elif key > self.recent[0][0]:
+            heapq.heapreplace(self.recent, entry)
+
+    def add(self, date, amount: Optional[float], status: Optional[str], transaction_type: Optional[str],
+            sender_phone: Optional[str], receiver_phone: Optional[str], category: Optional[str],
+            tags: Iterable[str] = ()):
+        """Account for one transaction."""
+        self.total_transactions += 1
+        self.total_amount += amount or 0.0
+        if status in self.success_statuses:
+            self.successful_transactions += 1
+        self.amount_ranges[amount_range(amount)] += 1
+        if category:
+            self.categories[category] += 1
+        if self.types is not None:
+            self.types[transaction_type] += 1
+        if self.tags is not None:
+            for tag in tags or ():
+                self.tags[tag] += 1
+        if self.months is not None:
+            key = _date_key(date)
+            totals = self.months.setdefault(key[:7] if _MONTH.match(key) else 'unknown', [0, 0.0])
+            totals[0] += 1
+            totals[1] += amount or 0.0
+        self._push_recent(date, dict(zip(RECENT_COLUMNS, (date, amount, status, transaction_type,
+                                                           sender_phone, receiver_phone, category))))
+
+    def dashboard_data(self, progress: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Dashboard data in the shape written by MySQLDatabaseLoader.export_dashboard_json."""
+        total = self.total_transactions
+        now = datetime.now().isoformat()
+        analytics = {
+            'amountDistribution': {name: self.amount_ranges[name] for name in AMOUNT_RANGES
+                                   if self.amount_ranges[name]},
+            'transactionTypes': dict(self.categories.most_common())
+        }
+        if self.types is not None:
+            analytics['messageTypes'] = dict(self.types.most_common())
+        if self.tags is not None:
+            analytics['tagDistribution'] = dict(self.tags.most_common())
+        if self.months is not None:
+            analytics['monthly'] = {month: {'count': count, 'amount': amount}
+                                    for month, (count, amount) in sorted(self.months.items())}
+
+        dashboard_data = {
+            'summary': {
+                'total_transactions': total,
+                'total_amount': self.total_amount,
+                'avg_amount': self.total_amount / total if total else None,
+                'successful_transactions': self.successful_transactions,
+                'success_rate': self.successful_transactions / total * 100 if total else 0,
+                'last_updated': now
+            },
+            'transactions': [row for _, _, row in sorted(self.recent, reverse=True)],
+            'analytics': analytics,
+            'exported_at': now
+        }
+        if progress is not None:
+            dashboard_data['progress'] = progress
+        return dashboard_data
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            'total_transactions': self.total_transactions,
+            'total_amount': self.total_amount,
+            'successful_transactions': self.successful_transactions,
+            'amount_ranges': self.amount_ranges,
+            'categories': self.categories,
+            'types': self.types,
+            'tags': self.tags,
+            'months': self.months,
+            'recent': self.recent,
+            'sequence': self._sequence
+        }
+
+    def set_state(self, state: Dict[str, Any]):
+        self.total_transactions = state['total_transactions']
+        self.total_amount = state['total_amount']
+        self.successful_transactions = state['successful_transactions']
+        self.amount_ranges = Counter(state['amount_ranges'])
+        self.categories = Counter(state['categories'])
+        self.types = None if state['types'] is None else Counter(state['types'])
+        self.tags = None if state['tags'] is None else Counter(state['tags'])
+        self.months = state['months']
+        self.recent = state['recent']
+        heapq.heapify(self.recent)
+        self._sequence = state['sequence']
+
+
+class RunningDashboard(DashboardAggregates):
+    """
+    Dashboard aggregates kept current from the rows a loader inserts.
+
+    Seeded once from a full dashboard export, then every committed batch is
+    added to the counts, sums and a heap of the newest transactions. A
+    snapshot is one small JSON write instead of the summary queries, and is
+    written at most once per interval seconds. The export has no message type
+    or monthly breakdown, so those are not tracked.
+    """
+
+    def __init__(self, dashboard_data: Dict[str, Any], interval: float = DASHBOARD_SNAPSHOT_INTERVAL):
+        super().__init__()
+        summary = dashboard_data.get('summary') or {}
+        analytics = dashboard_data.get('analytics') or {}
+
+        self.total_transactions = int(summary.get('total_transactions') or 0)
+        self.total_amount = float(summary.get('total_amount') or 0)
+        self.successful_transactions = int(summary.get('successful_transactions') or 0)
+        self.amount_ranges = Counter(analytics.get('amountDistribution') or {})
+        self.categories = Counter(analytics.get('transactionTypes') or {})
+        self.tags = Counter(analytics.get('tagDistribution') or {})
+        self.types = None
+        self.months = None
+        for row in dashboard_data.get('transactions') or []:
+            self._push_recent(row.get('date'), row)
+
+        self.interval = interval
+        self._published_at = 0.0
+        self.snapshots = 0
+
+    def publish(self, progress: Optional[Dict[str, Any]], force: bool = False,
+                dashboard_file: Path = DASHBOARD_JSON_FILE) -> bool:
+        """
+        Write a snapshot unless one was written less than interval seconds ago.
+        Without progress the snapshot no longer reports a load in progress.
+        """
+        now = time.monotonic()
+        if not force and now - self._published_at < self.interval:
+            return False
+        try:
+            write_dashboard_json(self.dashboard_data(progress), dashboard_file)
+        except OSError as e:
+            logger.warning(f"Could not write dashboard snapshot: {e}")
+            return False
+        self._published_at = now
+        self.snapshots += 1
+        return True
@@ -0,0 +1,147 @@
+"""
+Dead-Letter Spool
+Keeps SMS that could not be parsed or loaded so they can be replayed later
+"""
+
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .config import DEAD_LETTER_DIR, DEAD_LETTER_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = '.open'  # segments still being written
+
+
+class DeadLetterSpool:
+    """
+    Append-only, gzip-compressed JSON-lines spool split into rotating segments.
+
+    Each entry holds the failing SMS (body, timestamp, address), the stage
+    that rejected it, the reason and the parser version. A segment is closed
+    and a new one started once it reaches max_bytes of compressed data;
+    segments are only removed by a successful replay.
+
+    A segment is written under an OPEN_SUFFIX name and renamed when it is
+    closed, so readers can tell finished segments from ones a live process
+    is still appending to.
+    """
+
+    def __init__(self, directory: Path = DEAD_LETTER_DIR, prefix: str = 'dead_letter',
+                 max_bytes: int = DEAD_LETTER_MAX_BYTES):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.segment_path: Optional[Path] = None
+        self._closed_path: Optional[Path] = None
+        self._file = None
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _open_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        self._closed_path = self.directory / f"{self.prefix}-{stamp}-{os.getpid()}.jsonl.gz"
+        self.segment_path = self._closed_path.with_name(self._closed_path.name + OPEN_SUFFIX)
+        self._raw = open(self.segment_path, 'ab')
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='ab')
+
+    def write(self, stage: str, reason: str, body: str, timestamp: Optional[str] = None,
+              address: str = '', parser_version: str = '', source: str = '', **extra):
+        """Append one failed SMS to the current segment."""
+        if self._file is None:
+            self._open_segment()
+
+        entry = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'stage': stage,
+            'reason': reason,
+            'parser_version': parser_version,
+            'source': source,
+            'address': address,
+            'timestamp': timestamp,
+            'body': body
+        }
+        entry.update(extra)
+
+        self._file.write(json.dumps(entry, separators=(',', ':'), default=str).encode('utf-8') + b'\n')
+        self.written += 1
+
+        # Compressed size is only known once the compressor flushes its block
+        if self._raw.tell() >= self.max_bytes:
+            self._close_segment()
+
+    def flush(self):
+        """Make everything written so far readable without closing the segment."""
+        if self._file is not None:
+            self._file.flush()
+            self._raw.flush()
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = None
+            self._raw = None
+            os.replace(self.segment_path, self._closed_path)
+            self.segment_path = self._closed_path
+
+    def close(self):
+        """Close the current segment."""
+        self._close_segment()
+        if self.written:
+            logger.info(f"Wrote {self.written} records to dead-letter spool {self.directory}")
+
+    def segments(self) -> List[Path]:
+        """
+        Closed segments and the open segments of processes that have exited,
+        oldest first. Segments a running process still writes to are left out.
+        """
+        if not self.directory.exists():
+            return []
+        closed = list(self.directory.glob(f"{self.prefix}-*.jsonl.gz"))
+        orphaned = [path for path in self.directory.glob(f"{self.prefix}-*.jsonl.gz{OPEN_SUFFIX}")
+                    if not _writer_alive(path)]
+        return sorted(closed + orphaned, key=lambda path: path.name)
+
+
+def _writer_alive(segment_path: Path) -> bool:
+    """Whether the process that opened a segment (pid at the end of its name) is running."""
+    try:
+        pid = int(segment_path.name.split('.', 1)[0].rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_segment(segment_path: Path) -> Iterator[Dict[str, Any]]:
+    """Read the entries of one spool segment."""
+    with gzip.open(segment_path, 'rt', encoding='utf-8') as f:
+        try:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping corrupt entry {segment_path.name}:{line_number}: {e}")
+        except EOFError:
+            # Segment of a process that died before closing it
+            logger.warning(f"Segment {segment_path.name} is truncated, read what was complete")
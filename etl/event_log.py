@@ -0,0 +1,515 @@
+"""
+Transaction Event Log
+Append-only, checksummed log of parsed transactions and the views rebuilt from it
+"""
+
+import itertools
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import zlib
+from dataclasses import fields
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import EVENT_LOG_DIR, EVENT_VIEW_DIR, EVENT_LOG_SEGMENT_BYTES, DASHBOARD_JSON_FILE
+from .dashboard import DashboardAggregates, write_dashboard_json
+from .parser import ParsedTransaction, PARSER_VERSION
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length, CRC32 of the payload, 64-bit key of the SMS
+_HEADER = struct.Struct('<IIQ')
+_SEGMENT_NAME = re.compile(r'^events-(\d+)\.log$')
+# Keys checked against the sealed segments at a time
+_KEY_BATCH = 4096
+
+TRANSACTION_FIELDS = tuple(field.name for field in fields(ParsedTransaction))
+
+
+class EventLogCorruption(ValueError):
+    """A record failed its checksum or has an impossible length."""
+
+    def __init__(self, path: Path, offset: int, reason: str):
+        super().__init__(f"{reason} in {path.name} at offset {offset}")
+        self.path = path
+        self.offset = offset
+
+
+class Position(NamedTuple):
+    """Log position just after an event; positions compare in log order."""
+    segment: int
+    offset: int
+
+
+class Event(NamedTuple):
+    """A parsed transaction read back from the log."""
+    position: Position
+    source: str
+    parser_version: str
+    transaction: ParsedTransaction
+
+
+def event_key(transaction: ParsedTransaction) -> int:
+    """64-bit key of the SMS behind a transaction (its date and text)."""
+    digest = blake2b(f"{transaction.date}\x00{transaction.original_message}".encode('utf-8'),
+                     digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _records(path: Path, offset: int = 0, verify: bool = True) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield (end offset, key, payload) for the records of a segment after offset.
+
+    The segment is read through mmap. A record cut short by the end of the
+    file (a write in progress or a crash) ends the scan silently; a bad
+    checksum raises EventLogCorruption.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if offset >= size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            while offset + _HEADER.size <= size:
+                length, crc, key = _HEADER.unpack_from(data, offset)
+                start = offset + _HEADER.size
+                end = start + length
+                if end > size:
+                    return
+                if not length:
+                    raise EventLogCorruption(path, offset, "Empty record")
+                payload = data[start:end]
+                if verify and zlib.crc32(payload) != crc:
+                    raise EventLogCorruption(path, offset, "Checksum mismatch")
+                offset = end
+                yield end, key, payload
+
+
+class EventLog:
+    """
+    Segmented append-only log of parsed transactions.
+
+    Each record is a fixed header (length, CRC32, SMS key) followed by the
+    transaction as a compact JSON array in ParsedTransaction field order.
+    Segments roll over at max_segment_bytes. An SMS already in the log (same
+    key) is not appended again, so re-processing a grown backup only adds
+    its new transactions. A segment that is full gets a sorted key index
+    (events-NNNNNN.keys) that is searched through mmap, so only the keys
+    of the segment being written are read from record headers and held in
+    memory. Appends are serialised between processes with a lock file and
+    fsynced once per call. A record cut short by a crash is truncated by
+    the next append; a checksum failure is never truncated away.
+    """
+
+    def __init__(self, directory: Path = EVENT_LOG_DIR, max_segment_bytes: int = EVENT_LOG_SEGMENT_BYTES):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self._keys: Set[int] = set()  # keys of the segment being written
+        self._sealed: Dict[int, np.ndarray] = {}  # sorted keys of each full segment
+        self._synced = Position(0, 0)
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"events-{number:06d}.log"
+
+    def _key_index_path(self, number: int) -> Path:
+        return self.directory / f"events-{number:06d}.keys"
+
+    def _seal(self, number: int, keys: Iterable[int]) -> np.ndarray:
+        """Write the sorted key index of a full segment and map it."""
+        index = np.unique(np.fromiter(keys, dtype=np.uint64))
+        with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as f:
+            np.save(f, index)
+        os.replace(f.name, self._key_index_path(number))
+        return self._load_key_index(number)
+
+    def _load_key_index(self, number: int) -> np.ndarray:
+        try:
+            return np.load(self._key_index_path(number), mmap_mode='r')
+        except ValueError:
+            # An empty array cannot be mapped
+            return np.load(self._key_index_path(number))
+
+    def segments(self) -> List[Tuple[int, Path]]:
+        """Segment numbers and paths in log order."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            (int(match.group(1)), path)
+            for path in self.directory.iterdir()
+            if (match := _SEGMENT_NAME.match(path.name))
+        )
+
+    def _sync(self, segments: List[Tuple[int, Path]]):
+        """
+        Catch up with segments sealed and keys appended since the last sync.
+
+        Full segments are indexed once (building a missing index from the
+        headers). A record cut short at the end of the last segment is
+        truncated; EventLogCorruption is raised for any damaged record.
+        """
+        if not segments:
+            return
+        for number, path in segments[:-1]:
+            if number in self._sealed:
+                continue
+            if self._key_index_path(number).exists():
+                self._sealed[number] = self._load_key_index(number)
+            else:
+                logger.info(f"Indexing the keys of {path.name}")
+                self._sealed[number] = self._seal(number, (key for _, key, _ in _records(path)))
+
+        number, path = segments[-1]
+        if number == self._synced.segment:
+            offset = self._synced.offset
+        else:
+            self._keys = set()
+            offset = 0
+        for offset, key, _ in _records(path, offset):
+            self._keys.add(key)
+        if path.stat().st_size > offset:
+            logger.warning(f"Truncating torn record at the end of {path.name} (offset {offset})")
+            os.truncate(path, offset)
+        self._synced = Position(number, offset)
+
+    def _unseen(self, keys: List[int]) -> np.ndarray:
+        """Mask of the keys found in no sealed segment."""
+        wanted = np.array(keys, dtype=np.uint64)
+        found = np.zeros(len(wanted), dtype=bool)
+        for index in self._sealed.values():
+            if len(index):
+                positions = np.minimum(np.searchsorted(index, wanted), len(index) - 1)
+                found |= index[positions] == wanted
+        return ~found
+
+    def append(self, transactions: Iterable[ParsedTransaction], source: str = '') -> int:
+        """
+        Append transactions not yet in the log.
+
+        Returns:
+            Number of events appended
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        with open(self.directory / 'events.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            segments = self.segments()
+            self._sync(segments)
+            number = segments[-1][0] if segments else 1
+            path = self._segment_path(number)
+
+            appended = 0
+            # Keys of this call, which may be sealed after they were checked
+            added: Set[int] = set()
+            f = open(path, 'ab')
+            try:
+                for transaction, key in self._new_events(transactions):
+                    if key in self._keys or key in added:
+                        continue
+
+                    payload = json.dumps(
+                        [source, PARSER_VERSION] + [getattr(transaction, name) for name in TRANSACTION_FIELDS],
+                        separators=(',', ':')
+                    ).encode('utf-8')
+
+                    if f.tell() and f.tell() + _HEADER.size + len(payload) > self.max_segment_bytes:
+                        f.flush()
+                        os.fsync(f.fileno())
+                        f.close()
+                        self._sealed[number] = self._seal(number, self._keys)
+                        self._keys = set()
+                        number += 1
+                        path = self._segment_path(number)
+                        f = open(path, 'ab')
+
+                    f.write(_HEADER.pack(len(payload), zlib.crc32(payload), key))
+                    f.write(payload)
+                    self._keys.add(key)
+                    added.add(key)
+                    appended += 1
+
+                f.flush()
+                os.fsync(f.fileno())
+                self._synced = Position(number, f.tell())
+            finally:
+                f.close()
+
+        logger.info(f"Appended {appended} events from {source or 'pipeline'} to the event log")
+        return appended
+
+    def _new_events(self, transactions: Iterable[ParsedTransaction]) -> Iterator[Tuple[ParsedTransaction, int]]:
+        """Transactions with their keys, leaving out those in a sealed segment (checked in batches)."""
+        iterator = iter(transactions)
+        while True:
+            batch = list(itertools.islice(iterator, _KEY_BATCH))
+            if not batch:
+                return
+            keys = [event_key(transaction) for transaction in batch]
+            for transaction, key, unseen in zip(batch, keys, self._unseen(keys)):
+                if unseen:
+                    yield transaction, key
+
+    def replay(self, position: Optional[Position] = None) -> Iterator[Event]:
+        """Yield the events after position (from the start when None), in log order."""
+        position = position or Position(0, 0)
+        segments = self.segments()
+
+        for index, (number, path) in enumerate(segments):
+            if number < position.segment:
+                continue
+            offset = position.offset if number == position.segment else 0
+            try:
+                for end, _, payload in _records(path, offset):
+                    values = json.loads(payload)
+                    yield Event(Position(number, end), values[0], values[1],
+                                ParsedTransaction(*values[2:2 + len(TRANSACTION_FIELDS)]))
+            except EventLogCorruption as e:
+                if index < len(segments) - 1:
+                    raise
+                # Left in place: the next append raises rather than truncating it
+                logger.warning(f"Replay stopped at a damaged record: {e}")
+
+
+class EventView:
+    """
+    State derived from the event log, saved with the position it reflects.
+
+    Subclasses define reset(), apply(), get_state() and set_state(). The
+    state is kept in state_dir/<name>.json, so catching up only replays the
+    events appended since the view was last saved.
+    """
+
+    name = 'view'
+
+    def __init__(self, state_dir: Path = EVENT_VIEW_DIR):
+        self.state_file = state_dir / f"{self.name}.json"
+        self.position = Position(0, 0)
+        self.events_applied = 0
+        self.reset()
+
+    def reset(self):
+        raise NotImplementedError
+
+    def apply(self, event: Event):
+        raise NotImplementedError
+
+    def get_state(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def set_state(self, state: Dict[str, Any]):
+        raise NotImplementedError
+
+    def load(self) -> bool:
+        """Load the saved state; False (and an empty view) if there is none."""
+        self.reset()
+        self.position = Position(0, 0)
+        self.events_applied = 0
+        if not self.state_file.exists():
+            return False
+        try:
+            saved = json.loads(self.state_file.read_text(encoding='utf-8'))
+            self.set_state(saved['state'])
+            self.position = Position(*saved['position'])
+            self.events_applied = saved.get('events_applied', 0)
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discarding unreadable view state {self.state_file.name}: {e}")
+            self.reset()
+            return False
+
+    def save(self):
+        """Write the state atomically."""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        # A temporary file of its own, so concurrent savers never write the same one
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.state_file.parent,
+                                         prefix=f'.{self.name}.', suffix='.tmp', delete=False) as f:
+            json.dump({
+                'position': list(self.position),
+                'events_applied': self.events_applied,
+                'state': self.get_state()
+            }, f, separators=(',', ':'), default=str)
+        try:
+            os.replace(f.name, self.state_file)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    def catch_up(self, log: EventLog) -> int:
+        """Apply the events appended since the saved position."""
+        return update_views(log, [self])
+
+    def refresh(self, log: EventLog) -> int:
+        """Apply the events appended since the in-memory position, without loading or saving."""
+        applied = 0
+        for event in log.replay(self.position):
+            self.apply(event)
+            self.position = event.position
+            self.events_applied += 1
+            applied += 1
+        return applied
+
+    def rebuild(self, log: EventLog) -> int:
+        """Discard the saved state and replay the whole log."""
+        return update_views(log, [self], rebuild=True)
+
+
+def update_views(log: EventLog, views: List[EventView], rebuild: bool = False) -> int:
+    """
+    Catch up (or rebuild) several views in one sequential pass over the log.
+
+    Returns:
+        Number of events read from the log
+    """
+    for view in views:
+        if rebuild:
+            view.reset()
+            view.position = Position(0, 0)
+            view.events_applied = 0
+        else:
+            view.load()
+    if not views:
+        return 0
+
+    read = 0
+    applied = {view.name: 0 for view in views}
+    for event in log.replay(min(view.position for view in views)):
+        read += 1
+        for view in views:
+            if event.position > view.position:
+                view.apply(event)
+                view.position = event.position
+                view.events_applied += 1
+                applied[view.name] += 1
+
+    for view in views:
+        if rebuild or applied[view.name] or not view.state_file.exists():
+            view.save()
+    logger.info(f"Replayed {read} events into {', '.join(view.name for view in views)}")
+    return read
+
+
+class DashboardView(EventView):
+    """Dashboard summary, distributions and the most recent transactions."""
+
+    name = 'dashboard'
+
+    def reset(self):
+        self.aggregates = DashboardAggregates()
+        # Parsed transactions carry no tags
+        self.aggregates.tags = None
+
+    def apply(self, event: Event):
+        transaction = event.transaction
+        self.aggregates.add(transaction.date, transaction.amount, transaction.status,
+                            transaction.transaction_type, transaction.sender_phone,
+                            transaction.recipient_phone, transaction.category)
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'aggregates': self.aggregates.get_state()}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.aggregates.set_state(state['aggregates'])
+
+    def dashboard_data(self) -> Dict[str, Any]:
+        """Dashboard data in the shape written by MySQLDatabaseLoader.export_dashboard_json."""
+        dashboard_data = self.aggregates.dashboard_data()
+        dashboard_data['source'] = 'event_log'
+        return dashboard_data
+
+    def export(self, output_file: Path = DASHBOARD_JSON_FILE) -> Dict[str, Any]:
+        """Write the dashboard JSON file from the view."""
+        dashboard_data = self.dashboard_data()
+        write_dashboard_json(dashboard_data, output_file)
+        logger.info(f"Dashboard data exported from the event log to {output_file}")
+        return dashboard_data
+
+
+class UserTotalsView(EventView):
+    """Per phone number: name, transaction count, money in and out, fees and last activity."""
+
+    name = 'user_totals'
+
+    def reset(self):
+        self.users: Dict[str, Dict[str, Any]] = {}
+
+    def apply(self, event: Event):
+        transaction = event.transaction
+        phone = transaction.recipient_phone or transaction.sender_phone
+        if not phone:
+            return
+
+        user = self.users.get(phone)
+        if user is None:
+            user = self.users[phone] = {'name': None, 'transactions': 0, 'received': 0.0,
+                                        'sent': 0.0, 'fees': 0.0, 'last_date': None}
+        user['name'] = transaction.recipient_name or transaction.sender_name or user['name']
+        user['transactions'] += 1
+        if transaction.direction == 'credit':
+            user['received'] += transaction.amount or 0.0
+        else:
+            user['sent'] += transaction.amount or 0.0
+        user['fees'] += transaction.fee or 0.0
+        if transaction.date and (user['last_date'] is None or transaction.date > user['last_date']):
+            user['last_date'] = transaction.date
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'users': self.users}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.users = state['users']
+
+
+class ApiStoreView(EventView):
+    """Transactions as served by the REST API, numbered in log order."""
+
+    name = 'api_store'
+
+    def reset(self):
+        self.transactions: List[Dict[str, Any]] = []
+
+    def apply(self, event: Event):
+        transaction = event.transaction
+        self.transactions.append({
+            'id': len(self.transactions) + 1,
+            'amount': transaction.amount,
+            'currency': transaction.currency,
+            'transaction_type': transaction.transaction_type,
+            'category': transaction.category,
+            'direction': transaction.direction,
+            'status': transaction.status,
+            'sender_name': transaction.sender_name,
+            'sender_phone': transaction.sender_phone,
+            'recipient_name': transaction.recipient_name,
+            'recipient_phone': transaction.recipient_phone,
+            'momo_code': transaction.momo_code,
+            'fee': transaction.fee,
+            'new_balance': transaction.new_balance,
+            'transaction_id': transaction.transaction_id,
+            'financial_transaction_id': transaction.financial_transaction_id,
+            'external_transaction_id': transaction.external_transaction_id,
+            'date': transaction.date,
+            'original_message': transaction.original_message,
+            'confidence': transaction.confidence
+        })
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'transactions': self.transactions}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.transactions = state['transactions']
+
+
+VIEWS = (DashboardView, UserTotalsView, ApiStoreView)
@@ -6,7 +6,7 @@ Tracks processed files to prevent reprocessing.
 import hashlib
 import os
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import mysql.connector
 from api.db import MySQLDatabaseManager
 
@@ -34,10 +34,10 @@ class FileTracker:
                 # Use absolute path for consistency
                 abs_path = str(file_path.resolve())
                 
-                # Check by file name and path
+                # Check by file name and path; failed and partial runs are retried
                 cursor.execute("""
                     SELECT id FROM processed_files 
-                    WHERE file_name = %s AND file_path = %s
+                    WHERE file_name = %s AND file_path = %s AND processing_status = 'SUCCESS'
                 """, (file_path.name, abs_path))
                 
                 result = cursor.fetchone()
@@ -88,6 +88,16 @@ class FileTracker:
         # Process if file hasn't been processed or has been modified
         return not self.is_file_processed(file_path) or self.is_file_changed(file_path)
     
+    def get_pending_files(self, directory: Path, pattern: str = '*.xml') -> List[Path]:
+        """Get files in a directory that are new or changed since last processing."""
+        if not directory.is_dir():
+            return []
+        
+        return [
+            file_path for file_path in sorted(directory.glob(pattern))
+            if file_path.is_file() and self.should_process_file(file_path)
+        ]
+    
     def mark_file_processed(self, file_path: Path, records_processed: int, 
                           status: str = 'SUCCESS', error_message: Optional[str] = None) -> bool:
         """Mark a file as processed."""
@@ -132,6 +142,68 @@ class FileTracker:
             print(f"Error marking file as processed: {e}")
             return False
     
+    def get_checkpoint(self, file_path: Path, file_hash: str) -> Dict[str, Any]:
+        """Get the resume position of a partially loaded file.
+        
+        A checkpoint only applies to the exact file contents it was taken from;
+        for a changed file the load starts over.
+        """
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT file_hash, last_position, records_loaded FROM etl_checkpoints
+                    WHERE file_path = %s
+                """, (str(file_path.resolve()),))
+                
+                result = cursor.fetchone()
+                cursor.close()
+                
+                if result and result[0] == file_hash:
+                    return {'last_position': result[1], 'records_loaded': result[2] or 0}
+                
+        except Exception as e:
+            print(f"Error reading checkpoint: {e}")
+        
+        return {'last_position': 0, 'records_loaded': 0}
+    
+    def save_checkpoint(self, file_path: Path, file_hash: str, last_position: int,
+                        records_loaded: int) -> bool:
+        """Store the position of a source, e.g. the high watermark of an incremental load."""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO etl_checkpoints (file_path, file_hash, last_position, records_loaded)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                    file_hash = VALUES(file_hash),
+                    last_position = VALUES(last_position),
+                    records_loaded = VALUES(records_loaded)
+                """, (str(file_path.resolve()), file_hash, last_position, records_loaded))
+                conn.commit()
+                cursor.close()
+                return True
+
+        except Exception as e:
+            print(f"Error saving checkpoint: {e}")
+            return False
+
+    def clear_checkpoint(self, file_path: Path) -> bool:
+        """Remove the checkpoint of a file once it has been fully loaded."""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM etl_checkpoints WHERE file_path = %s", (str(file_path.resolve()),))
+                conn.commit()
+                cursor.close()
+                return True
+                
+        except Exception as e:
+            print(f"Error clearing checkpoint: {e}")
+            return False
+    
     def get_processed_files(self) -> list:
         """Get list of all processed files."""
         try:
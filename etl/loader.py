@@ -3,22 +3,183 @@ MySQL Database Operations for MoMo Data
 """
 
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+import hashlib
 import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import os
+import struct
+import tempfile
+import time
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
-from .config import DASHBOARD_JSON_FILE
+from .config import (
+    DASHBOARD_JSON_FILE, ETL_BATCH_SIZE, LOAD_INSERT_MODE, BULK_SPOOL_DIR, DEDUP_FILTER_ENABLED,
+    DEDUP_FILTER_FILE, DEDUP_FILTER_CAPACITY, DEDUP_FILTER_ERROR_RATE
+)
+from .parser import PARSER_VERSION
+from .dashboard import RunningDashboard, write_dashboard_json
+from dsa.bloom_filter import ScalableBloomFilter
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+class TransactionRow(NamedTuple):
+    """
+    One transaction ready for loading.
+    
+    The SMS body is held once and processed_at is shared by every row of a
+    run; the xml_attributes and processing_metadata JSON columns are derived
+    from these fields at insert time.
+    """
+    amount: float
+    currency: str
+    date: Optional[str]
+    transaction_type: str
+    category: str
+    direction: str
+    confidence: float
+    sender_name: Optional[str]
+    sender_phone: Optional[str]
+    recipient_name: Optional[str]
+    recipient_phone: Optional[str]
+    momo_code: Optional[str]
+    sender_momo_id: Optional[str]
+    agent_momo_number: Optional[str]
+    business_name: Optional[str]
+    fee: float
+    new_balance: Optional[float]
+    transaction_id: Optional[str]
+    financial_transaction_id: Optional[str]
+    external_transaction_id: Optional[str]
+    original_message: str
+    processed_at: str
+    sms_index: Optional[int] = None
+    tags: Optional[Tuple[str, ...]] = None
+    address: Optional[str] = None
+    sms_date: Optional[str] = None
+    
+    @property
+    def phone(self) -> Optional[str]:
+        """Phone number of the user the transaction is recorded against."""
+        return self.recipient_phone or self.sender_phone
+    
+    @property
+    def reference(self) -> Optional[str]:
+        """Best available reference number."""
+        return self.transaction_id or self.financial_transaction_id or self.external_transaction_id
+
+INSERT_MODES = ('batch', 'row', 'bulk')
+
+INSERT_TRANSACTION_SQL = """
+    INSERT INTO transactions (
+        external_transaction_id, financial_transaction_id, sender_user_id, receiver_user_id, 
+        amount, fee, currency, transaction_date, category_id, transaction_type, direction, 
+        status, reference_number, description, sender_name, sender_phone, recipient_name, 
+        recipient_phone, momo_code, sender_momo_id, agent_momo_number, business_name, 
+        new_balance, confidence_score, raw_sms_data, original_message, xml_attributes, 
+        processing_metadata
+    ) VALUES (
+        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+    )
+"""
+
+# Table that bulk loads LOAD DATA into, one per connection. Users and the
+# category are carried as phone numbers and name until the merge resolves
+# them; the SMS body is stored once for raw_sms_data and original_message.
+# Column widths match transactions, users.phone_number and
+# transaction_categories.category_name, so values are cut the same way in the
+# staging table as in the dimension rows the merge joins them to
+BULK_STAGE_TABLE = """
+    CREATE TABLE {table} (
+        seq BIGINT NOT NULL PRIMARY KEY,
+        external_transaction_id VARCHAR(50),
+        financial_transaction_id VARCHAR(50),
+        sender_user_phone VARCHAR(15),
+        receiver_user_phone VARCHAR(15),
+        amount DECIMAL(15,2),
+        fee DECIMAL(15,2),
+        currency VARCHAR(3),
+        transaction_date DATETIME,
+        category_name VARCHAR(50),
+        transaction_type VARCHAR(50),
+        direction VARCHAR(10),
+        status VARCHAR(20),
+        reference_number VARCHAR(100),
+        description TEXT,
+        sender_name VARCHAR(100),
+        sender_phone VARCHAR(15),
+        recipient_name VARCHAR(100),
+        recipient_phone VARCHAR(15),
+        momo_code VARCHAR(10),
+        sender_momo_id VARCHAR(20),
+        agent_momo_number VARCHAR(15),
+        business_name VARCHAR(100),
+        new_balance DECIMAL(15,2),
+        confidence_score DECIMAL(3,2),
+        original_message TEXT,
+        xml_attributes JSON,
+        processing_metadata JSON
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+BULK_STAGE_COLUMNS = (
+    'seq', 'external_transaction_id', 'financial_transaction_id', 'sender_user_phone', 'receiver_user_phone',
+    'amount', 'fee', 'currency', 'transaction_date', 'category_name', 'transaction_type', 'direction', 'status',
+    'reference_number', 'description', 'sender_name', 'sender_phone', 'recipient_name', 'recipient_phone',
+    'momo_code', 'sender_momo_id', 'agent_momo_number', 'business_name', 'new_balance', 'confidence_score',
+    'original_message', 'xml_attributes', 'processing_metadata'
+)
+
+MERGE_TRANSACTIONS_SQL = """
+    INSERT IGNORE INTO transactions (
+        external_transaction_id, financial_transaction_id, sender_user_id, receiver_user_id, 
+        amount, fee, currency, transaction_date, category_id, transaction_type, direction, 
+        status, reference_number, description, sender_name, sender_phone, recipient_name, 
+        recipient_phone, momo_code, sender_momo_id, agent_momo_number, business_name, 
+        new_balance, confidence_score, raw_sms_data, original_message, xml_attributes, 
+        processing_metadata
+    )
+    SELECT
+        s.external_transaction_id, s.financial_transaction_id, su.user_id, ru.user_id,
+        s.amount, s.fee, s.currency, s.transaction_date, c.category_id, s.transaction_type, s.direction,
+        s.status, s.reference_number, s.description, s.sender_name, s.sender_phone, s.recipient_name,
+        s.recipient_phone, s.momo_code, s.sender_momo_id, s.agent_momo_number, s.business_name,
+        s.new_balance, s.confidence_score, s.original_message, s.original_message, s.xml_attributes,
+        s.processing_metadata
+    FROM {table} s
+    LEFT JOIN users su ON su.phone_number = s.sender_user_phone
+    LEFT JOIN users ru ON ru.phone_number = s.receiver_user_phone
+    LEFT JOIN transaction_categories c ON c.category_name = s.category_name
+    WHERE s.seq >= %s AND s.seq < %s
+    ORDER BY s.seq
+"""
+
+# MySQL's default LOAD DATA escaping; None is written as \N
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def _tsv_field(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.translate(_TSV_ESCAPES)
+    return str(value)
+
 class MySQLDatabaseLoader:
     """Loads categorized transactions into MySQL database with normalized schema."""
     
     def __init__(self, host: str = 'localhost', port: int = 3306, 
                  database: str = 'momo_sms_processing', user: str = 'root', 
-                 password: str = ''):
+                 password: str = '', dead_letter=None, use_dedup_filter: bool = DEDUP_FILTER_ENABLED,
+                 live_dashboard: bool = False, insert_mode: str = LOAD_INSERT_MODE):
+        if insert_mode not in INSERT_MODES:
+            raise ValueError(f"Unknown insert mode: {insert_mode}")
         self.host = host
         self.port = port
         self.database = database
@@ -28,7 +189,32 @@ class MySQLDatabaseLoader:
         self.connection = None
         self.loaded_count = 0
         self.error_count = 0
+        self.duplicate_count = 0  # bulk mode: rows skipped as already loaded
         self.errors = []
+        # Write a mysql_load_transactions row to system_logs for every load
+        # (callers that load in many calls log one summary instead)
+        self.log_loads = True
+        self.dead_letter = dead_letter
+        self.insert_mode = insert_mode
+        
+        # Dimension id caches, kept warm across load_transactions calls
+        self._user_cache: Dict[str, int] = {}
+        self._category_cache: Dict[str, int] = {}
+        
+        # Bloom filter of SMS already in the database, persisted between runs
+        # and opened on the first load
+        self.use_dedup_filter = use_dedup_filter
+        self.dedup_filter: Optional[ScalableBloomFilter] = None
+        self._dedup_filter_changed = False
+        
+        # With live_dashboard, dashboard.json is refreshed from running
+        # aggregates after committed batches
+        self.live_dashboard = live_dashboard
+        self.running_dashboard: Optional[RunningDashboard] = None
+        self._inserted_rows: Optional[List[Tuple[TransactionRow, tuple]]] = None
+        # Step between the ids of one multi-row INSERT, None if they may interleave
+        self._id_step: Optional[int] = None
+        self._id_step_checked = False
     
     def __enter__(self):
         self.connect()
@@ -49,8 +235,10 @@ class MySQLDatabaseLoader:
                 unix_socket=self.unix_socket,
                 charset='utf8mb4',
                 collation='utf8mb4_unicode_ci',
-                autocommit=False
+                autocommit=False,
+                allow_local_infile=self.insert_mode == 'bulk'
             )
+            self._id_step_checked = False
             
             if self.connection.is_connected():
                 logger.info(f"Connected to MySQL database: {self.database}")
@@ -61,34 +249,81 @@ class MySQLDatabaseLoader:
     
     def close(self):
         """Close database connection."""
+        self.save_dedup_filter()
         if self.connection and self.connection.is_connected():
             self.connection.close()
             logger.info("MySQL database connection closed")
     
-    def load_transactions(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Load transactions into normalized MySQL database."""
+    def load_transactions(self, transactions: List[TransactionRow], batch_size: int = ETL_BATCH_SIZE,
+                          checkpoint: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Load transactions into normalized MySQL database.
+        
+        Transactions are committed every batch_size rows, so a failure only
+        rolls back the batch in progress. In the default 'batch' insert mode a
+        batch is written with one multi-row INSERT; 'row' inserts one
+        transaction per statement. 'bulk' loads all transactions at once
+        (see bulk_load_transactions) and falls back to batches if that
+        fails. When checkpoint ({'file_path', 'file_hash',
+        'records_loaded'}) is given, the SMS position after each batch is saved
+        in the same database transaction as the batch itself.
+        """
+        if self.insert_mode == 'bulk' and transactions:
+            try:
+                return self.bulk_load_transactions(transactions, checkpoint, batch_size)
+            except Error as e:
+                logger.warning(f"Bulk load failed, loading in batches instead: {e}")
+        
         if not self.connection or not self.connection.is_connected():
             self.connect()
         
+        cursor = None
+        start = time.perf_counter()
         try:
             cursor = self.connection.cursor()
+            batch_size = max(1, batch_size)
+            if self.use_dedup_filter and self.dedup_filter is None:
+                self._open_dedup_filter(cursor)
+            if self.live_dashboard and self.running_dashboard is None:
+                self.running_dashboard = RunningDashboard(self._query_dashboard_data())
             
-            for i, transaction in enumerate(transactions):
-                try:
-                    transaction_id = self._process_transaction(cursor, transaction)
+            for batch_start in range(0, len(transactions), batch_size):
+                batch = transactions[batch_start:batch_start + batch_size]
+                existing, dedup_keys = self._check_dedup_filter(cursor, batch)
+                loaded_keys = []
+                self._inserted_rows = [] if self.running_dashboard is not None else None
+                
+                if self.insert_mode != 'row':
+                    transaction_ids = self._insert_batch(cursor, batch, batch_start, existing)
+                else:
+                    transaction_ids = self._insert_rows(cursor, enumerate(batch, start=batch_start), existing)
+                
+                for offset, transaction_id in enumerate(transaction_ids):
                     if transaction_id:
                         self.loaded_count += 1
-                    else:
-                        # Transaction was a duplicate, count as skipped
-                        logger.debug(f"Transaction {i}: Skipped duplicate (external_transaction_id: {transaction.get('external_transaction_id')})")
-                except Exception as e:
-                    self.error_count += 1
-                    error_msg = f"Transaction {i}: {str(e)}"
-                    self.errors.append(error_msg)
-                    logger.error(error_msg)
+                        if dedup_keys and dedup_keys[offset]:
+                            loaded_keys.append((dedup_keys[offset], transaction_id))
+                
+                if checkpoint and batch[-1].sms_index is not None:
+                    self._save_checkpoint(cursor, checkpoint, batch[-1].sms_index + 1)
+                
+                self.connection.commit()
+                logger.debug(f"Committed batch ending at transaction {batch_start + len(batch)}")
+                
+                # Only committed rows go into the filter
+                if loaded_keys:
+                    for key, _ in loaded_keys:
+                        self.dedup_filter.add(key)
+                    metadata = self.dedup_filter.metadata
+                    metadata['watermark'] = max(metadata['watermark'], max(row_id for _, row_id in loaded_keys))
+                    self._dedup_filter_changed = True
+                
+                if self.running_dashboard is not None:
+                    self._publish_dashboard_snapshot(batch_start + len(batch), len(transactions))
             
             # Log ETL process
-            self._log_etl_process(cursor, len(transactions))
+            if self.log_loads:
+                self._log_etl_process(cursor, len(transactions), time.perf_counter() - start)
             
             self.connection.commit()
             
@@ -98,28 +333,500 @@ class MySQLDatabaseLoader:
             
         except Exception as e:
             logger.error(f"Error loading transactions: {e}")
+            self._inserted_rows = None
             self.connection.rollback()
+            # Ids created inside the rolled back transaction no longer exist
+            self.clear_caches()
+            if self.running_dashboard is not None and self.running_dashboard.snapshots:
+                # The committed batches stay in the snapshot, the load is no longer in progress
+                self.running_dashboard.publish(None, force=True)
             raise
         finally:
             if cursor:
                 cursor.close()
     
-    def _process_transaction(self, cursor, transaction: Dict[str, Any]) -> Optional[int]:
-        """Process a single transaction with normalized schema."""
+    def bulk_load_transactions(self, transactions: List[TransactionRow],
+                               checkpoint: Optional[Dict[str, Any]] = None,
+                               batch_size: int = ETL_BATCH_SIZE) -> Dict[str, Any]:
+        """
+        Load transactions with LOAD DATA LOCAL INFILE and set-based SQL.
+        
+        Rows are spooled to a TSV file in BULK_SPOOL_DIR and loaded into a
+        staging table. After indexing its external ids, rows already in the
+        batch or in transactions are deleted from the staging table and
+        missing users and categories are inserted with INSERT ... SELECT.
+        INSERT IGNORE ... SELECT with joins for the dimension ids then merges
+        the rest into transactions batch_size rows at a time, each chunk
+        committed together with the checkpoint so an interrupted load resumes
+        after it. Only merged rows count as loaded; the others are counted in
+        duplicate_count. With live_dashboard, each committed chunk is added to
+        the running dashboard and published. Foreign key checks are off for the merge, since it reads the
+        ids from the joined tables; unique checks stay on, so rows another
+        loader inserted in the meantime are skipped. The rare rows with tags
+        go through the batch path afterwards. Raises mysql.connector.Error on
+        failure, after rolling back the current chunk.
+        """
+        if not self.connection or not self.connection.is_connected():
+            self.connect()
+        
+        start = time.perf_counter()
+        staged = [transaction for transaction in transactions if not transaction.tags]
+        tagged = [transaction for transaction in transactions if transaction.tags]
+        # The checkpoint must not pass a tagged row before it has been loaded
+        resume_limit = min((transaction.sms_index for transaction in tagged
+                            if transaction.sms_index is not None), default=None)
+        if self.live_dashboard and self.running_dashboard is None:
+            self.running_dashboard = RunningDashboard(self._query_dashboard_data())
+        cursor = self.connection.cursor()
+        table = f"transactions_bulk_stage_{self.connection.connection_id}"
+        spool = None
+        loaded_before = self.loaded_count
+        duplicates_before = self.duplicate_count
+        inserted = 0
+        try:
+            spool = self._spool_tsv(staged)
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(BULK_STAGE_TABLE.format(table=table))
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                ({', '.join(BULK_STAGE_COLUMNS)})
+            """, (spool,))
+            self.connection.commit()
+            # Indexed after the load; DDL commits, so nothing else has happened yet
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX (external_transaction_id)")
+            
+            cursor.execute(f"""
+                DELETE s FROM {table} s JOIN {table} f
+                ON f.external_transaction_id = s.external_transaction_id AND f.seq < s.seq
+            """)
+            cursor.execute(f"""
+                DELETE s FROM {table} s JOIN transactions t
+                ON t.external_transaction_id = s.external_transaction_id
+            """)
+            
+            # Dimensions are inserted with unique checks still on
+            for column in ('sender_user_phone', 'receiver_user_phone'):
+                cursor.execute(f"""
+                    INSERT IGNORE INTO users (phone_number, display_name, account_status, registration_date,
+                                              total_transactions, total_amount_sent, total_amount_received)
+                    SELECT DISTINCT s.{column}, CONCAT('User ', s.{column}), 'ACTIVE', NOW(), 0, 0.00, 0.00
+                    FROM {table} s LEFT JOIN users u ON u.phone_number = s.{column}
+                    WHERE s.{column} IS NOT NULL AND s.{column} <> '' AND u.user_id IS NULL
+                """)
+            cursor.execute(f"""
+                INSERT IGNORE INTO transaction_categories (category_name, category_code, description, is_active)
+                SELECT DISTINCT s.category_name, UPPER(LEFT(s.category_name, 3)),
+                       CONCAT('Auto-generated category for ', s.category_name), TRUE
+                FROM {table} s LEFT JOIN transaction_categories c ON c.category_name = s.category_name
+                WHERE s.category_name IS NOT NULL AND s.category_name <> '' AND c.category_id IS NULL
+            """)
+            self.connection.commit()
+            
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            try:
+                for chunk_start in range(0, len(staged), max(1, batch_size)):
+                    chunk = staged[chunk_start:chunk_start + batch_size]
+                    chunk_end = chunk_start + len(chunk)
+                    cursor.execute(MERGE_TRANSACTIONS_SQL.format(table=table), (chunk_start, chunk_end))
+                    merged = cursor.rowcount
+                    inserted += merged
+                    self.loaded_count += merged
+                    # Deleted from staging or ignored by the merge
+                    self.duplicate_count += len(chunk) - merged
+                    
+                    survivors = None
+                    if self.running_dashboard is not None:
+                        cursor.execute(f"SELECT seq, transaction_date, status FROM {table} "
+                                       f"WHERE seq >= %s AND seq < %s", (chunk_start, chunk_end))
+                        survivors = cursor.fetchall()
+                    positions = [transaction.sms_index for transaction in chunk
+                                 if transaction.sms_index is not None]
+                    if checkpoint and positions:
+                        position = max(positions) + 1
+                        if resume_limit is not None:
+                            position = min(position, resume_limit)
+                        self._save_checkpoint(cursor, checkpoint, position)
+                    self.connection.commit()
+                    
+                    if survivors is not None:
+                        # A row another loader inserted meanwhile was ignored by the merge; which
+                        # one is unknown, so such a chunk waits for the final dashboard export
+                        if len(survivors) == merged:
+                            for seq, transaction_date, status in survivors:
+                                transaction = staged[seq]
+                                self.running_dashboard.add(
+                                    transaction_date, transaction.amount, status, transaction.transaction_type,
+                                    transaction.phone, transaction.recipient_phone, transaction.category,
+                                    transaction.tags
+                                )
+                        self._publish_dashboard_snapshot(chunk_end, len(staged))
+            finally:
+                cursor.execute("SET SESSION foreign_key_checks = 1")
+            
+            if self.log_loads:
+                self._log_etl_process(cursor, len(staged), time.perf_counter() - start)
+            self.connection.commit()
+            
+        except Exception as e:
+            logger.error(f"Error bulk loading transactions: {e}")
+            self.connection.rollback()
+            # Committed chunks are skipped as duplicates and counted by the fallback
+            self.loaded_count = loaded_before
+            self.duplicate_count = duplicates_before
+            if self.running_dashboard is not None and self.running_dashboard.snapshots:
+                # The committed chunks stay in the snapshot, the load is no longer in progress
+                self.running_dashboard.publish(None, force=True)
+            raise
+        finally:
+            try:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            except Error as e:
+                logger.warning(f"Could not drop {table}: {e}")
+            cursor.close()
+            if spool:
+                os.unlink(spool)
+        
+        # Merged rows are added to the dedup filter when it is next opened
+        if self.dedup_filter is not None:
+            self.save_dedup_filter()
+            self.dedup_filter = None
+        
+        logger.info(f"Bulk loaded {len(staged)} transactions ({inserted} new) in "
+                    f"{time.perf_counter() - start:.2f}s")
+        if tagged:
+            self.insert_mode, mode = 'batch', self.insert_mode
+            try:
+                self.load_transactions(tagged, checkpoint=checkpoint)
+            finally:
+                self.insert_mode = mode
+        return self.get_loading_summary()
+    
+    def _spool_tsv(self, transactions: List[TransactionRow]) -> str:
+        """Write the staging table rows of transactions to a new TSV file; returns its path."""
+        handle, path = tempfile.mkstemp(prefix='bulk_load_', suffix='.tsv', dir=BULK_SPOOL_DIR)
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8', newline='\n') as f:
+                for seq, transaction in enumerate(transactions):
+                    params = list(self._transaction_params(transaction, transaction.phone,
+                                                           transaction.recipient_phone, transaction.category))
+                    # raw_sms_data repeats original_message
+                    del params[24]
+                    f.write('\t'.join(map(_tsv_field, [seq] + params)))
+                    f.write('\n')
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+    
+    def _insert_rows(self, cursor, rows: Iterable[Tuple[int, TransactionRow]],
+                     existing: Optional[Dict[str, int]]) -> List[Optional[int]]:
+        """Insert (index, transaction) pairs one at a time; returns each transaction id (None if not loaded)."""
+        transaction_ids = []
+        for i, transaction in rows:
+            try:
+                transaction_id = self._process_transaction(cursor, transaction, existing)
+                if not transaction_id:
+                    # Transaction was a duplicate, count as skipped
+                    logger.debug(f"Transaction {i}: Skipped duplicate (external_transaction_id: {transaction.external_transaction_id})")
+            except Exception as e:
+                transaction_id = None
+                self._record_load_error(i, transaction, e)
+            transaction_ids.append(transaction_id)
+        return transaction_ids
+    
+    def _insert_batch(self, cursor, batch: List[TransactionRow], batch_start: int,
+                      existing: Optional[Dict[str, int]]) -> List[Optional[int]]:
+        """
+        Insert a batch with one multi-row INSERT; returns each row's transaction id.
+        
+        Existing transactions are looked up with one query for the batch when
+        the dedup filter is off, users with one query for the phone numbers
+        not cached yet, and executemany sends the new rows as a single INSERT.
+        With innodb_autoinc_lock_mode 0 or 1 its rows get consecutive ids
+        (auto_increment_increment apart) from cursor.lastrowid on. In
+        interleaved mode (2) the ids of rows with an external_transaction_id
+        are read back in one query, rows without one but with tags are
+        inserted on their own, and the others, whose ids nothing needs, are
+        returned as True. If the INSERT fails, e.g. on a duplicate the filter
+        had not seen, the batch is retried row by row, so only the offending
+        rows are lost.
+        """
+        if existing is None:
+            existing = self._find_transaction_ids(cursor, {
+                transaction.external_transaction_id for transaction in batch
+                if transaction.external_transaction_id
+            })
+        self._prefetch_users(cursor, [phone for transaction in batch
+                                      for phone in (transaction.phone, transaction.recipient_phone)])
+        
+        transaction_ids: List[Optional[int]] = [None] * len(batch)
+        pending = []  # (offset, sender_user_id, params) of rows to insert
+        first_offset = {}  # external_transaction_id -> offset of its first row in the batch
+        repeats = []  # (offset, first_offset) of rows repeating an earlier one
+        for offset, transaction in enumerate(batch):
+            external_transaction_id = transaction.external_transaction_id
+            if external_transaction_id in existing:
+                transaction_ids[offset] = existing[external_transaction_id]
+                continue
+            if external_transaction_id in first_offset:
+                repeats.append((offset, first_offset[external_transaction_id]))
+                continue
+            try:
+                sender_user_id = self._get_or_create_user(cursor, transaction.phone)
+                receiver_user_id = self._get_or_create_user(cursor, transaction.recipient_phone)
+                category_id = self._get_or_create_category(cursor, transaction.category)
+                params = self._transaction_params(transaction, sender_user_id, receiver_user_id, category_id)
+            except Exception as e:
+                self._record_load_error(batch_start + offset, transaction, e)
+                continue
+            pending.append((offset, sender_user_id, params))
+            if external_transaction_id:
+                first_offset[external_transaction_id] = offset
+        
+        step = self._consecutive_id_step(cursor)
+        singles = []  # offsets of rows whose ids can only be known from their own INSERT
+        if step is None:
+            singles = [offset for offset, _, _ in pending
+                       if batch[offset].tags and not batch[offset].external_transaction_id]
+            pending = [row for row in pending if row[0] not in singles]
+        
+        if pending:
+            try:
+                cursor.executemany(INSERT_TRANSACTION_SQL, [params for _, _, params in pending])
+                first_id = cursor.lastrowid
+            except Error as e:
+                logger.warning(f"Multi-row insert of transactions {batch_start}-{batch_start + len(batch) - 1} "
+                               f"failed, retrying row by row: {e}")
+                retried = self._insert_rows(cursor, [(batch_start + offset, batch[offset])
+                                                     for offset, _, _ in pending], existing)
+                for (offset, _, _), transaction_id in zip(pending, retried):
+                    transaction_ids[offset] = transaction_id
+            else:
+                if step is not None:
+                    row_ids = [first_id + i * step for i in range(len(pending))]
+                else:
+                    found = self._find_transaction_ids(cursor, {
+                        batch[offset].external_transaction_id for offset, _, _ in pending
+                        if batch[offset].external_transaction_id
+                    })
+                    row_ids = [found.get(batch[offset].external_transaction_id)
+                               if batch[offset].external_transaction_id else True
+                               for offset, _, _ in pending]
+                
+                tags = []
+                for row_id, (offset, sender_user_id, params) in zip(row_ids, pending):
+                    transaction = batch[offset]
+                    transaction_ids[offset] = row_id
+                    if transaction.tags:
+                        tags.extend((row_id, tag_name, sender_user_id) for tag_name in transaction.tags)
+                    if self._inserted_rows is not None:
+                        self._inserted_rows.append((transaction, params))
+                if tags:
+                    tag_ids = {tag_name: self._get_or_create_tag(cursor, tag_name)
+                               for tag_name in {tag_name for _, tag_name, _ in tags}}
+                    cursor.executemany("""
+                        INSERT IGNORE INTO transaction_tags (transaction_id, tag_id, assigned_by)
+                        VALUES (%s, %s, %s)
+                    """, [(row_id, tag_ids[tag_name], assigned_by) for row_id, tag_name, assigned_by in tags])
+        
+        if singles:
+            for offset, transaction_id in zip(singles, self._insert_rows(
+                    cursor, [(batch_start + offset, batch[offset]) for offset in singles], existing)):
+                transaction_ids[offset] = transaction_id
+        
+        for offset, first in repeats:
+            transaction_ids[offset] = transaction_ids[first]
+        return transaction_ids
+    
+    def _consecutive_id_step(self, cursor) -> Optional[int]:
+        """
+        Distance between the ids InnoDB gives the rows of one multi-row INSERT,
+        or None in interleaved lock mode, where they need not be consecutive.
+        """
+        if not self._id_step_checked:
+            cursor.execute("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")
+            row = cursor.fetchone()
+            lock_mode, increment = row if row else (2, 1)
+            self._id_step = int(increment or 1) if int(lock_mode) in (0, 1) else None
+            self._id_step_checked = True
+            if self._id_step is None:
+                logger.info("innodb_autoinc_lock_mode is interleaved, reading inserted ids back by external id")
+        return self._id_step
+    
+    def _record_load_error(self, index: int, transaction: TransactionRow, error: Exception):
+        """Count a transaction that could not be loaded and dead-letter its SMS."""
+        self.error_count += 1
+        error_msg = f"Transaction {index}: {str(error)}"
+        self.errors.append(error_msg)
+        logger.error(error_msg)
+        
+        if self.dead_letter is not None:
+            self.dead_letter.write(
+                'load', 'insert_failed',
+                body=transaction.original_message,
+                timestamp=transaction.date,
+                address=transaction.address or '',
+                parser_version=PARSER_VERSION,
+                sms_date=transaction.sms_date,
+                error=str(error)
+            )
+    
+    def _save_checkpoint(self, cursor, checkpoint: Dict[str, Any], position: int):
+        """Persist the SMS position up to which a file has been loaded."""
+        cursor.execute("""
+            INSERT INTO etl_checkpoints (file_path, file_hash, last_position, records_loaded)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            file_hash = VALUES(file_hash),
+            last_position = VALUES(last_position),
+            records_loaded = VALUES(records_loaded)
+        """, (checkpoint['file_path'], checkpoint['file_hash'], position,
+              checkpoint.get('records_loaded', 0) + self.loaded_count))
+    
+    @staticmethod
+    def _dedup_key(financial_transaction_id: Optional[str], body: str) -> str:
+        """Dedup filter key: the financial transaction id and a hash of the SMS body."""
+        body_hash = hashlib.blake2b(body.encode('utf-8'), digest_size=16).hexdigest()
+        return f"{financial_transaction_id or ''}:{body_hash}"
+    
+    def _open_dedup_filter(self, cursor):
+        """
+        Load the saved dedup filter and add any rows loaded since it was saved.
+        
+        The filter records the highest transaction_id it has seen, so rows
+        inserted by other loaders or by the API are picked up here. With no
+        saved filter, this builds it from the whole table once. Rows a
+        concurrent loader inserts below that watermark are missed; inserting
+        one again hits the unique key and falls back to a lookup.
+        """
+        bloom = ScalableBloomFilter.load_or_create(
+            DEDUP_FILTER_FILE, initial_capacity=DEDUP_FILTER_CAPACITY, error_rate=DEDUP_FILTER_ERROR_RATE
+        )
+        watermark = bloom.metadata.get('watermark', 0)
+        
+        cursor.execute("""
+            SELECT transaction_id, financial_transaction_id, original_message FROM transactions
+            WHERE transaction_id > %s AND external_transaction_id IS NOT NULL
+            ORDER BY transaction_id
+        """, (watermark,))
+        added = 0
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for _, financial_transaction_id, body in rows:
+                bloom.add(self._dedup_key(financial_transaction_id, body or ''))
+            watermark = rows[-1][0]
+            added += len(rows)
+        
+        bloom.metadata['watermark'] = watermark
+        self.dedup_filter = bloom
+        self._dedup_filter_changed = added > 0
+        logger.info(f"Dedup filter holds {len(bloom)} keys ({bloom.size_bytes} bytes), "
+                    f"{added} added from the database")
+    
+    def _check_dedup_filter(self, cursor, batch: List[TransactionRow]) -> Tuple[Optional[Dict[str, int]], List[Optional[str]]]:
+        """
+        Split a batch into definitely new and probably loaded transactions.
+        
+        Probable duplicates are verified with one SELECT for the whole batch.
+        Returns the existing transaction ids by external_transaction_id (None
+        when the filter is off) and each row's filter key (None for rows
+        without an external_transaction_id, which are never deduplicated).
+        """
+        if self.dedup_filter is None:
+            return None, []
+        
+        keys = [
+            self._dedup_key(transaction.financial_transaction_id, transaction.original_message)
+            if transaction.external_transaction_id else None
+            for transaction in batch
+        ]
+        candidates = list({
+            transaction.external_transaction_id
+            for transaction, key in zip(batch, keys)
+            if key is not None and key in self.dedup_filter
+        })
+        return self._find_transaction_ids(cursor, candidates), keys
+    
+    def _find_transaction_ids(self, cursor, external_transaction_ids) -> Dict[str, int]:
+        """Ids of the loaded transactions among external_transaction_ids, in one query."""
+        external_transaction_ids = list(external_transaction_ids)
+        if not external_transaction_ids:
+            return {}
+        
+        placeholders = ', '.join(['%s'] * len(external_transaction_ids))
+        cursor.execute(f"""
+            SELECT external_transaction_id, transaction_id FROM transactions
+            WHERE external_transaction_id IN ({placeholders})
+        """, tuple(external_transaction_ids))
+        return dict(cursor.fetchall())
+    
+    def save_dedup_filter(self):
+        """
+        Persist the dedup filter if this loader added anything to it.
+        
+        Loaders running in parallel each extend their own copy, so under a
+        file lock the saved filter is merged in first: the keys of both are
+        kept and the lower watermark, so the next loader catches up on
+        whatever either copy may have missed.
+        """
+        if self.dedup_filter is None or not self._dedup_filter_changed:
+            return
+        try:
+            DEDUP_FILTER_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(DEDUP_FILTER_FILE.with_name(DEDUP_FILTER_FILE.name + '.lock'), 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                
+                if DEDUP_FILTER_FILE.exists():
+                    try:
+                        saved = ScalableBloomFilter.load(DEDUP_FILTER_FILE)
+                        self.dedup_filter.update(saved)
+                        self.dedup_filter.metadata['watermark'] = min(
+                            self.dedup_filter.metadata.get('watermark', 0),
+                            saved.metadata.get('watermark', 0)
+                        )
+                    except (ValueError, KeyError, struct.error) as e:
+                        logger.warning(f"Replacing unreadable or incompatible dedup filter: {e}")
+                
+                # save() writes a temporary file and renames it over the old one
+                self.dedup_filter.save(DEDUP_FILTER_FILE)
+            self._dedup_filter_changed = False
+        except OSError as e:
+            # Next run catches up from the last saved watermark
+            logger.warning(f"Could not save dedup filter: {e}")
+    
+    def _process_transaction(self, cursor, transaction: TransactionRow,
+                             existing: Optional[Dict[str, int]] = None) -> Optional[int]:
+        """
+        Process a single transaction with normalized schema.
+        
+        existing maps external_transaction_ids already in the database to
+        their ids. When given, it replaces the per-row existence check, so
+        transactions not in it are inserted straight away.
+        """
+        if existing is not None and transaction.external_transaction_id in existing:
+            return existing[transaction.external_transaction_id]
+        
         try:
             # Get or create users
-            sender_user_id = self._get_or_create_user(cursor, transaction.get('phone'))
-            receiver_user_id = self._get_or_create_user(cursor, transaction.get('recipient_phone'))
+            sender_user_id = self._get_or_create_user(cursor, transaction.phone)
+            receiver_user_id = self._get_or_create_user(cursor, transaction.recipient_phone)
             
             # Get or create category
-            category_id = self._get_or_create_category(cursor, transaction.get('category'))
+            category_id = self._get_or_create_category(cursor, transaction.category)
             
             # Insert transaction
-            transaction_id = self._insert_transaction(cursor, transaction, sender_user_id, receiver_user_id, category_id)
+            transaction_id = self._insert_transaction(cursor, transaction, sender_user_id, receiver_user_id,
+                                                      category_id, check_existing=existing is None)
             
             # Add tags if specified and transaction was successfully inserted
-            if transaction_id and transaction.get('tags'):
-                self._add_transaction_tags(cursor, transaction_id, transaction['tags'], sender_user_id)
+            if transaction_id and transaction.tags:
+                self._add_transaction_tags(cursor, transaction_id, transaction.tags, sender_user_id)
             
             return transaction_id
             
@@ -127,11 +834,37 @@ class MySQLDatabaseLoader:
             logger.error(f"Error processing transaction: {e}")
             raise
     
+    def clear_caches(self):
+        """Forget cached user and category ids."""
+        self._user_cache.clear()
+        self._category_cache.clear()
+    
+    def _prefetch_users(self, cursor, phones: List[Optional[str]]):
+        """Cache the ids of the users among phones that already exist, in one query."""
+        missing = list({phone for phone in phones if phone and phone not in self._user_cache})
+        if not missing:
+            return
+        
+        placeholders = ', '.join(['%s'] * len(missing))
+        cursor.execute(f"SELECT phone_number, user_id FROM users WHERE phone_number IN ({placeholders})",
+                       tuple(missing))
+        self._user_cache.update(cursor.fetchall())
+    
     def _get_or_create_user(self, cursor, phone: str) -> Optional[int]:
         """Get or create user by phone number."""
         if not phone:
             return None
         
+        if phone in self._user_cache:
+            return self._user_cache[phone]
+        
+        user_id = self._fetch_or_insert_user(cursor, phone)
+        if user_id:
+            self._user_cache[phone] = user_id
+        return user_id
+    
+    def _fetch_or_insert_user(self, cursor, phone: str) -> Optional[int]:
+        """Look up a user by phone number, inserting it if missing."""
         # Try to get existing user
         cursor.execute("SELECT user_id FROM users WHERE phone_number = %s", (phone,))
         result = cursor.fetchone()
@@ -164,6 +897,16 @@ class MySQLDatabaseLoader:
         if not category_name:
             return None
         
+        if category_name in self._category_cache:
+            return self._category_cache[category_name]
+        
+        category_id = self._fetch_or_insert_category(cursor, category_name)
+        if category_id:
+            self._category_cache[category_name] = category_id
+        return category_id
+    
+    def _fetch_or_insert_category(self, cursor, category_name: str) -> Optional[int]:
+        """Look up a category by name, inserting it if missing."""
         # Try to get existing category
         cursor.execute("SELECT category_id FROM transaction_categories WHERE category_name = %s", (category_name,))
         result = cursor.fetchone()
@@ -194,101 +937,105 @@ class MySQLDatabaseLoader:
         else:
             return cursor.lastrowid
     
-    def _insert_transaction(self, cursor, transaction: Dict[str, Any], 
+    def _insert_transaction(self, cursor, transaction: TransactionRow, 
                           sender_user_id: Optional[int], receiver_user_id: Optional[int], 
-                          category_id: Optional[int]) -> int:
-        """Insert transaction into database."""
+                          category_id: Optional[int], check_existing: bool = True) -> int:
+        """
+        Insert transaction into database.
         
-        external_transaction_id = transaction.get('external_transaction_id')
+        With check_existing False the caller has already ruled the transaction
+        out as a duplicate; if the unique key says otherwise (a row the dedup
+        filter has not seen yet), the existing id is returned as before.
+        """
+        
+        external_transaction_id = transaction.external_transaction_id
         
         # Check if transaction already exists
-        if external_transaction_id:
-            cursor.execute("""
-                SELECT transaction_id FROM transactions 
-                WHERE external_transaction_id = %s
-            """, (external_transaction_id,))
-            result = cursor.fetchone()
-            if result:
+        if external_transaction_id and check_existing:
+            existing_id = self._find_transaction_id(cursor, external_transaction_id)
+            if existing_id:
                 # Transaction already exists, return existing ID
-                return result[0]
-        
-        # Parse transaction date
-        transaction_date = self._parse_transaction_date(transaction.get('date'))
-        
-        # Determine status
-        status = self._determine_transaction_status(transaction)
-        
-        transaction_data = {
-            'external_transaction_id': transaction.get('external_transaction_id'),
-            'financial_transaction_id': transaction.get('financial_transaction_id'),
-            'sender_user_id': sender_user_id,
-            'receiver_user_id': receiver_user_id,
-            'amount': float(transaction.get('amount', 0)),
-            'fee': float(transaction.get('fee', 0.0)),
-            'currency': transaction.get('currency', 'RWF'),
-            'transaction_date': transaction_date,
-            'category_id': category_id,
-            'transaction_type': transaction.get('transaction_type', ''),
-            'direction': transaction.get('direction', ''),
-            'status': status,
-            'reference_number': transaction.get('reference'),
-            'description': transaction.get('type', ''),
-            
-            # Enhanced parser fields
-            'sender_name': transaction.get('sender_name'),
-            'sender_phone': transaction.get('sender_phone'),
-            'recipient_name': transaction.get('recipient_name'),
-            'recipient_phone': transaction.get('recipient_phone'),
-            'momo_code': transaction.get('momo_code'),
-            'sender_momo_id': transaction.get('sender_momo_id'),
-            'agent_momo_number': transaction.get('agent_momo_number'),
-            'business_name': transaction.get('business_name'),
-            'new_balance': transaction.get('new_balance'),
-            'confidence_score': transaction.get('confidence', 0.0),
-            
-            # Original data
-            'raw_sms_data': transaction.get('original_data', ''),
-            'original_message': transaction.get('original_message', ''),
-            'xml_attributes': json.dumps(transaction.get('xml_attributes', {})),
-            'processing_metadata': json.dumps({
-                'cleaned_at': transaction.get('cleaned_at'),
-                'categorized_at': transaction.get('categorized_at'),
-                'confidence_score': transaction.get('confidence', 0.0),
-                'processing_version': '2.0'
-            })
-        }
+                return existing_id
         
-        cursor.execute("""
-            INSERT INTO transactions (
-                external_transaction_id, financial_transaction_id, sender_user_id, receiver_user_id, 
-                amount, fee, currency, transaction_date, category_id, transaction_type, direction, 
-                status, reference_number, description, sender_name, sender_phone, recipient_name, 
-                recipient_phone, momo_code, sender_momo_id, agent_momo_number, business_name, 
-                new_balance, confidence_score, raw_sms_data, original_message, xml_attributes, 
-                processing_metadata
-            ) VALUES (
-                %(external_transaction_id)s, %(financial_transaction_id)s, %(sender_user_id)s, 
-                %(receiver_user_id)s, %(amount)s, %(fee)s, %(currency)s, %(transaction_date)s, 
-                %(category_id)s, %(transaction_type)s, %(direction)s, %(status)s, 
-                %(reference_number)s, %(description)s, %(sender_name)s, %(sender_phone)s, 
-                %(recipient_name)s, %(recipient_phone)s, %(momo_code)s, %(sender_momo_id)s, 
-                %(agent_momo_number)s, %(business_name)s, %(new_balance)s, %(confidence_score)s, 
-                %(raw_sms_data)s, %(original_message)s, %(xml_attributes)s, %(processing_metadata)s
-            )
-        """, transaction_data)
+        params = self._transaction_params(transaction, sender_user_id, receiver_user_id, category_id)
+        try:
+            cursor.execute(INSERT_TRANSACTION_SQL, params)
+        except mysql.connector.IntegrityError as e:
+            if e.errno != errorcode.ER_DUP_ENTRY or not external_transaction_id:
+                raise
+            return self._find_transaction_id(cursor, external_transaction_id)
         
         # Check if the insert was successful (not ignored due to duplicate)
         if cursor.lastrowid == 0:
             # Row was ignored due to duplicate, get the existing transaction ID
-            cursor.execute("""
-                SELECT transaction_id FROM transactions 
-                WHERE external_transaction_id = %s
-            """, (transaction_data['external_transaction_id'],))
-            result = cursor.fetchone()
-            return result[0] if result else None
+            return self._find_transaction_id(cursor, external_transaction_id)
         else:
+            if self._inserted_rows is not None:
+                self._inserted_rows.append((transaction, params))
             return cursor.lastrowid
     
+    def _find_transaction_id(self, cursor, external_transaction_id: str) -> Optional[int]:
+        """Id of the transaction with the given external_transaction_id, if loaded."""
+        cursor.execute("""
+            SELECT transaction_id FROM transactions 
+            WHERE external_transaction_id = %s
+        """, (external_transaction_id,))
+        result = cursor.fetchone()
+        return result[0] if result else None
+    
+    def _transaction_params(self, transaction: TransactionRow, sender_user_id: Optional[int],
+                            receiver_user_id: Optional[int], category_id: Optional[int]) -> tuple:
+        """Positional parameters for INSERT_TRANSACTION_SQL."""
+        xml_attributes = json.dumps({
+            'transaction_type': transaction.transaction_type,
+            'category': transaction.category,
+            'direction': transaction.direction,
+            'fee': transaction.fee,
+            'new_balance': transaction.new_balance,
+            'business_name': transaction.business_name,
+            'agent_momo_number': transaction.agent_momo_number,
+            'financial_transaction_id': transaction.financial_transaction_id,
+            'external_transaction_id': transaction.external_transaction_id,
+            'transaction_id': transaction.transaction_id
+        })
+        processing_metadata = json.dumps({
+            'cleaned_at': transaction.processed_at,
+            'categorized_at': transaction.processed_at,
+            'confidence_score': transaction.confidence,
+            'processing_version': PARSER_VERSION
+        })
+        
+        return (
+            transaction.external_transaction_id,
+            transaction.financial_transaction_id,
+            sender_user_id,
+            receiver_user_id,
+            float(transaction.amount),
+            float(transaction.fee),
+            transaction.currency,
+            self._parse_transaction_date(transaction.date),
+            category_id,
+            transaction.transaction_type,
+            transaction.direction,
+            self._determine_transaction_status(transaction),
+            transaction.reference,
+            transaction.transaction_type,
+            transaction.sender_name,
+            transaction.sender_phone,
+            transaction.recipient_name,
+            transaction.recipient_phone,
+            transaction.momo_code,
+            transaction.sender_momo_id,
+            transaction.agent_momo_number,
+            transaction.business_name,
+            transaction.new_balance,
+            transaction.confidence,
+            transaction.original_message,
+            transaction.original_message,
+            xml_attributes,
+            processing_metadata
+        )
+    
     def _add_transaction_tags(self, cursor, transaction_id: int, tags: List[str], assigned_by: int):
         """Add tags to transaction."""
         for tag_name in tags:
@@ -361,10 +1108,10 @@ class MySQLDatabaseLoader:
         logger.warning(f"Could not parse date: {date_str}, using current time")
         return datetime.now()
     
-    def _determine_transaction_status(self, transaction: Dict[str, Any]) -> str:
+    def _determine_transaction_status(self, transaction: TransactionRow) -> str:
         """Determine transaction status based on available data."""
         # Check if transaction has success indicators
-        original_data = transaction.get('original_data', '').lower()
+        original_data = transaction.original_message.lower()
         
         if any(word in original_data for word in ['success', 'completed', 'successful']):
             return 'SUCCESS'
@@ -375,17 +1122,20 @@ class MySQLDatabaseLoader:
         else:
             return 'SUCCESS'  # Default to success for processed transactions
     
-    def _log_etl_process(self, cursor, total_records: int):
-        """Log ETL process info."""
+    def _log_etl_process(self, cursor, total_records: int, execution_time: float = 0.0,
+                         loaded: Optional[int] = None, failed: Optional[int] = None):
+        """Log ETL process info (loaded and failed default to the loader's totals)."""
+        loaded = self.loaded_count if loaded is None else loaded
+        failed = self.error_count if failed is None else failed
         try:
             log_data = {
                 'process_name': 'mysql_load_transactions',
                 'log_level': 'INFO',
-                'message': f'ETL process completed: {self.loaded_count} successful, {self.error_count} failed',
+                'message': f'ETL process completed: {loaded} successful, {failed} failed',
                 'records_processed': total_records,
-                'records_successful': self.loaded_count,
-                'records_failed': self.error_count,
-                'execution_time_seconds': 0.0,  # Could be calculated if needed
+                'records_successful': loaded,
+                'records_failed': failed,
+                'execution_time_seconds': round(execution_time, 3),
                 'details': json.dumps({
                     'errors': self.errors[:5] if self.errors else [],
                     'database': self.database,
@@ -393,24 +1143,96 @@ class MySQLDatabaseLoader:
                 })
             }
             
-            cursor.execute("""
-                INSERT INTO system_logs (
-                    process_name, log_level, message, records_processed, records_successful,
-                    records_failed, execution_time_seconds, details
-                ) VALUES (
-                    %(process_name)s, %(log_level)s, %(message)s, %(records_processed)s,
-                    %(records_successful)s, %(records_failed)s, %(execution_time_seconds)s, %(details)s
-                )
-            """, log_data)
+            self._write_system_log(cursor, log_data)
             
         except Exception as e:
             logger.error(f"Error logging ETL process: {e}")
     
+    def log_load_summary(self, total_records: int, loaded: int, failed: int, execution_time: float):
+        """Write one mysql_load_transactions row for loads made with log_loads off."""
+        cursor = None
+        try:
+            if not self.connection or not self.connection.is_connected():
+                self.connect()
+            cursor = self.connection.cursor()
+            self._log_etl_process(cursor, total_records, execution_time, loaded, failed)
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f"Error logging load summary: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+    
+    def log_pipeline_metrics(self, metrics, records_processed: int, records_successful: int,
+                             records_failed: int):
+        """Persist the per-stage performance of a pipeline run to system_logs."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            self._write_system_log(cursor, {
+                'process_name': metrics.name,
+                'log_level': 'INFO',
+                'message': f'Pipeline stage metrics: {len(metrics.stages)} stages in '
+                           f'{metrics.total_wall_seconds:.3f}s',
+                'records_processed': records_processed,
+                'records_successful': records_successful,
+                'records_failed': records_failed,
+                'execution_time_seconds': round(metrics.total_wall_seconds, 3),
+                'details': json.dumps(metrics.as_dict())
+            })
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f"Error logging pipeline metrics: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+    
+    def _write_system_log(self, cursor, log_data: Dict[str, Any]):
+        """Insert one row into system_logs."""
+        cursor.execute("""
+            INSERT INTO system_logs (
+                process_name, log_level, message, records_processed, records_successful,
+                records_failed, execution_time_seconds, details
+            ) VALUES (
+                %(process_name)s, %(log_level)s, %(message)s, %(records_processed)s,
+                %(records_successful)s, %(records_failed)s, %(execution_time_seconds)s, %(details)s
+            )
+        """, log_data)
+    
+    def _publish_dashboard_snapshot(self, rows_done: int, rows_total: int):
+        """Add the rows inserted by the committed batch to the running dashboard and publish it."""
+        for transaction, params in self._inserted_rows or ():
+            # transaction_date and status as inserted (INSERT_TRANSACTION_SQL column order)
+            self.running_dashboard.add(
+                params[7], transaction.amount, params[11], transaction.transaction_type,
+                transaction.phone, transaction.recipient_phone, transaction.category, transaction.tags
+            )
+        self._inserted_rows = []
+        self.running_dashboard.publish({
+            'in_progress': True,
+            'rows_done': rows_done,
+            'rows_total': rows_total,
+            'loaded': self.loaded_count,
+            'errors': self.error_count,
+            'updated_at': datetime.now().isoformat()
+        }, force=rows_done == rows_total)
+    
     def export_dashboard_json(self) -> Dict[str, Any]:
         """Export data for dashboard visualization."""
+        dashboard_data = self._query_dashboard_data()
+        
+        # Save to JSON file
+        write_dashboard_json(dashboard_data, DASHBOARD_JSON_FILE)
+        
+        logger.info(f"Dashboard data exported to {DASHBOARD_JSON_FILE}")
+        return dashboard_data
+    
+    def _query_dashboard_data(self) -> Dict[str, Any]:
+        """Run the dashboard summary queries."""
         if not self.connection or not self.connection.is_connected():
             self.connect()
         
+        cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
             
@@ -508,13 +1330,6 @@ class MySQLDatabaseLoader:
                 },
                 'exported_at': datetime.now().isoformat()
             }
-            
-            # Save to JSON file
-            DASHBOARD_JSON_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(DASHBOARD_JSON_FILE, 'w') as f:
-                json.dump(dashboard_data, f, indent=2, default=str)
-            
-            logger.info(f"Dashboard data exported to {DASHBOARD_JSON_FILE}")
             return dashboard_data
             
         except Exception as e:
@@ -529,6 +1344,7 @@ class MySQLDatabaseLoader:
         return {
             'total_processed': self.loaded_count + self.error_count,
             'successfully_loaded': self.loaded_count,
+            'duplicates_skipped': self.duplicate_count,
             'loading_errors': self.error_count,
             'error_rate': self.error_count / (self.loaded_count + self.error_count) if (self.loaded_count + self.error_count) > 0 else 0,
             'errors': self.errors[:10],  # First 10 errors
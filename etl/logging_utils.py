@@ -0,0 +1,168 @@
+"""
+Queued Logging
+Moves log I/O to a background thread and folds repeated errors into summaries
+"""
+
+import atexit
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import util as multiprocessing_util
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .config import LOG_FORMAT, LOG_AGGREGATE_WINDOW, LOG_AGGREGATE_BURST
+
+# Numbers and quoted values differ between otherwise identical errors
+_VARIABLE_PARTS = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:\.\d+)?")
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional['AggregatingQueueHandler'] = None
+
+
+class _ErrorWindow:
+    __slots__ = ('name', 'levelno', 'template', 'started', 'count', 'suppressed')
+
+    def __init__(self, record: logging.LogRecord, template: str, started: float):
+        self.name = record.name
+        self.levelno = record.levelno
+        self.template = template
+        self.started = started
+        self.count = 0
+        self.suppressed = 0
+
+
+class AggregatingQueueHandler(QueueHandler):
+    """
+    QueueHandler that rate-limits repeated warnings and errors.
+
+    Records are grouped by logger, level and message with numbers and quoted
+    values masked. The first `burst` records of a group are queued as usual
+    within each `window` seconds; the rest are only counted, and one
+    "N similar errors" summary is queued when the window closes. Expired
+    windows are closed whenever a record passes through and on close().
+    """
+
+    def __init__(self, log_queue: queue.Queue, window: float = LOG_AGGREGATE_WINDOW,
+                 burst: int = LOG_AGGREGATE_BURST):
+        super().__init__(log_queue)
+        self.window = window
+        self.burst = burst
+        self._windows: Dict[Tuple[str, int, str], _ErrorWindow] = {}
+        self._windows_lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+
+        if record.levelno >= logging.WARNING:
+            template = _VARIABLE_PARTS.sub('*', record.getMessage())[:200]
+            key = (record.name, record.levelno, template)
+
+            with self._windows_lock:
+                window = self._windows.get(key)
+                if window is None or now - window.started >= self.window:
+                    if window is not None:
+                        self._emit_summary(window)
+                    window = self._windows[key] = _ErrorWindow(record, template, now)
+
+                window.count += 1
+                suppress = window.count > self.burst
+                if suppress:
+                    window.suppressed += 1
+
+            if suppress:
+                self._sweep(now)
+                return False
+
+        self._sweep(now)
+        return super().handle(record)
+
+    def _sweep(self, now: float):
+        """Close windows that expired, at most once per second."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + 1.0
+        self.flush_summaries(now)
+
+    def flush_summaries(self, now: Optional[float] = None):
+        """Queue summaries for closed windows (all windows when now is None)."""
+        with self._windows_lock:
+            for key, window in list(self._windows.items()):
+                if now is None or now - window.started >= self.window:
+                    self._emit_summary(window)
+                    del self._windows[key]
+
+    def _emit_summary(self, window: _ErrorWindow):
+        if not window.suppressed:
+            return
+        summary = logging.LogRecord(
+            window.name, window.levelno, __file__, 0,
+            f"{window.suppressed} similar errors suppressed in the last "
+            f"{self.window:g}s: {window.template}",
+            None, None
+        )
+        self.enqueue(self.prepare(summary))
+
+    def close(self):
+        self.flush_summaries()
+        super().close()
+
+
+def setup_queued_logging(log_file: Path, level: str, window: float = LOG_AGGREGATE_WINDOW,
+                         burst: int = LOG_AGGREGATE_BURST) -> logging.Logger:
+    """
+    Route the root logger through a queue to a background writer thread.
+
+    The file and console handlers run on the listener thread, so the
+    calling code only pays for putting a record on the queue. Any handlers
+    inherited from a parent process are replaced.
+    """
+    global _listener, _queue_handler
+
+    stop_queued_logging()
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler(log_file)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _queue_handler = AggregatingQueueHandler(log_queue, window, burst)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(getattr(logging, level.upper()))
+
+    _listener.start()
+    # Pool workers leave through os._exit, which skips atexit but runs these
+    multiprocessing_util.Finalize(None, stop_queued_logging, exitpriority=100)
+    return root
+
+
+def stop_queued_logging():
+    """Flush pending summaries and records and stop the writer thread."""
+    global _listener, _queue_handler
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler.close()
+        _queue_handler = None
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_queued_logging)
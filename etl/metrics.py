@@ -0,0 +1,249 @@
+"""
+Pipeline Performance Metrics
+Per-stage wall time, CPU time, throughput and peak memory of an ETL run
+"""
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+@dataclass
+class StageMetrics:
+    """Accumulated cost of one pipeline stage."""
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    records: int = 0
+    peak_rss_mb: Optional[float] = None
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'wall_seconds': round(self.wall_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'records': self.records,
+            'records_per_second': round(self.records_per_second, 1),
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None
+        }
+
+
+class MemoryProfiler:
+    """
+    Takes tracemalloc snapshots at stage boundaries and reports where memory went.
+
+    For every stage the report shows traced memory at its end, the peak
+    reached while it ran, the top allocation sites still alive and the
+    sites that grew most since the previous boundary. Allocations made in
+    generated code (NamedTuple and dataclass constructors) are charged to
+    the nearest real source line that called it.
+    """
+
+    def __init__(self, top: int = 10, frames: int = 5):
+        self.top = top
+        self.frames = frames
+        self.snapshots: List[Tuple[str, tracemalloc.Snapshot, int, int]] = []
+        self._filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>')
+        ]
+
+    def start(self):
+        """Start tracing and take the baseline snapshot."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.snapshot('start')
+
+    def snapshot(self, label: str):
+        """Snapshot allocations at the end of stage label."""
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._filters)
+        self.snapshots.append((label, snapshot, current, peak))
+
+    def stop(self):
+        tracemalloc.stop()
+
+    @staticmethod
+    def _sites(snapshot: tracemalloc.Snapshot) -> Dict[str, List[int]]:
+        """Total [size, blocks] per allocation site."""
+        sites: Dict[str, List[int]] = {}
+        for stat in snapshot.statistics('traceback'):
+            # Frames run from oldest to most recent
+            frame = next((f for f in reversed(stat.traceback) if not f.filename.startswith('<')),
+                         stat.traceback[-1])
+            site = sites.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+            site[0] += stat.size
+            site[1] += stat.count
+        return sites
+
+    def format_report(self) -> str:
+        """Render all snapshots as a text report."""
+        mb = 1024 * 1024
+        lines = [f"Memory profile ({datetime.now().isoformat(timespec='seconds')})", '']
+        lines.append(f"{'Boundary':<20}{'Traced MB':>12}{'Stage peak MB':>15}{'Growth MB':>12}")
+        previous_current = None
+        for label, _, current, peak in self.snapshots:
+            growth = (current - previous_current) / mb if previous_current is not None else 0.0
+            lines.append(f"{label:<20}{current / mb:>12.1f}{peak / mb:>15.1f}{growth:>+12.1f}")
+            previous_current = current
+
+        previous = None
+        for label, snapshot, _, _ in self.snapshots:
+            sites = self._sites(snapshot)
+            lines += ['', f"== After {label}: top {self.top} allocation sites =="]
+            for site, (size, count) in sorted(sites.items(), key=lambda item: item[1][0],
+                                              reverse=True)[:self.top]:
+                lines.append(f"  {size / mb:>8.2f} MB {count:>9} blocks  {site}")
+
+            if previous is not None:
+                lines.append("-- Growth since previous boundary --")
+                growth = [
+                    (site, size - previous.get(site, (0, 0))[0], count - previous.get(site, (0, 0))[1])
+                    for site, (size, count) in sites.items()
+                ]
+                growth.sort(key=lambda item: item[1], reverse=True)
+                for site, size_diff, count_diff in growth[:self.top]:
+                    if size_diff <= 0:
+                        break
+                    lines.append(f"  {size_diff / mb:>+8.2f} MB {count_diff:>+9} blocks  {site}")
+            previous = sites
+
+        return '\n'.join(lines)
+
+    def write_report(self, directory: Path) -> Path:
+        """Write the report to a timestamped file in directory."""
+        directory.mkdir(parents=True, exist_ok=True)
+        report_file = directory / f"memory_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        report_file.write_text(self.format_report() + '\n', encoding='utf-8')
+        return report_file
+
+
+class PipelineMetrics:
+    """
+    Collects StageMetrics for the stages of one run, in execution order.
+
+    Whole stages are measured with the stage() context manager. Stages that
+    are interleaved per record (read, filter and parse share one streaming
+    loop) are measured with lap(), which charges the time since the previous
+    lap to the named stage. Reading the process CPU clock costs a system
+    call, so laps only take wall time and the CPU time of the whole loop is
+    split between its stages in proportion to their wall time. Peak RSS is
+    the process high-water mark when the stage finished, so it only grows
+    from one stage to the next.
+
+    With a MemoryProfiler attached, a tracemalloc snapshot is taken at the
+    end of every stage.
+    """
+
+    def __init__(self, name: str = 'etl_pipeline', profiler: Optional[MemoryProfiler] = None):
+        self.name = name
+        self.profiler = profiler
+        self.stages: Dict[str, StageMetrics] = {}
+        self._lap_wall = 0.0
+        self._laps_started_cpu = 0.0
+        self._lap_walls: Dict[str, float] = {}
+
+    def _stage(self, name: str) -> StageMetrics:
+        if name not in self.stages:
+            self.stages[name] = StageMetrics(name)
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str, records: int = 0) -> Iterator[StageMetrics]:
+        """Measure a block as one stage; the block may update records."""
+        stage = self._stage(name)
+        stage.records += records
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall_seconds += time.perf_counter() - wall
+            stage.cpu_seconds += time.process_time() - cpu
+            stage.peak_rss_mb = peak_rss_mb()
+            if self.profiler:
+                self.profiler.snapshot(name)
+
+    def start_laps(self):
+        """Start the clock for lap()."""
+        self._lap_walls = {}
+        self._laps_started_cpu = time.process_time()
+        self._lap_wall = time.perf_counter()
+
+    def lap(self, name: str):
+        """Charge the wall time since the previous lap to stage name."""
+        wall = time.perf_counter()
+        self._lap_walls[name] = self._lap_walls.get(name, 0.0) + wall - self._lap_wall
+        self._lap_wall = wall
+
+    def finish_laps(self, records: Dict[str, int]):
+        """Close the lapped stages and record their record counts and memory."""
+        cpu = time.process_time() - self._laps_started_cpu
+        total_wall = sum(self._lap_walls.values())
+        peak = peak_rss_mb()
+
+        for name in dict.fromkeys(list(self._lap_walls) + list(records)):
+            stage = self._stage(name)
+            wall = self._lap_walls.get(name, 0.0)
+            stage.wall_seconds += wall
+            stage.cpu_seconds += cpu * wall / total_wall if total_wall > 0 else 0.0
+            stage.records += records.get(name, 0)
+            stage.peak_rss_mb = peak
+
+        if self.profiler:
+            self.profiler.snapshot('+'.join(self._lap_walls) or 'parse')
+
+    @property
+    def total_wall_seconds(self) -> float:
+        return sum(stage.wall_seconds for stage in self.stages.values())
+
+    @property
+    def total_cpu_seconds(self) -> float:
+        return sum(stage.cpu_seconds for stage in self.stages.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'pipeline': self.name,
+            'total_wall_seconds': round(self.total_wall_seconds, 4),
+            'total_cpu_seconds': round(self.total_cpu_seconds, 4),
+            'stages': {name: stage.as_dict() for name, stage in self.stages.items()}
+        }
+
+    def format_table(self) -> str:
+        """Render the stages as a fixed-width text table."""
+        lines = [
+            f"{'Stage':<10}{'Wall s':>10}{'CPU s':>10}{'Records':>10}{'Rec/s':>12}{'Peak RSS MB':>13}",
+            '-' * 65
+        ]
+        for stage in self.stages.values():
+            rss = f"{stage.peak_rss_mb:.1f}" if stage.peak_rss_mb is not None else 'n/a'
+            lines.append(f"{stage.name:<10}{stage.wall_seconds:>10.3f}{stage.cpu_seconds:>10.3f}"
+                         f"{stage.records:>10}{stage.records_per_second:>12.1f}{rss:>13}")
+        lines.append('-' * 65)
+        lines.append(f"{'total':<10}{self.total_wall_seconds:>10.3f}{self.total_cpu_seconds:>10.3f}")
+        return '\n'.join(lines)
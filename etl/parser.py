@@ -11,6 +11,9 @@ from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Recorded with dead-lettered SMS so replays can tell which parser rejected them
+PARSER_VERSION = "2.0"
+
 @dataclass
 class ParsedTransaction:
     """Structured transaction data."""
@@ -36,6 +39,9 @@ class ParsedTransaction:
     date: Optional[str] = None
     original_message: str = ""
     confidence: float = 0.0
+    sms_index: Optional[int] = None  # position of the SMS in its source file
+    address: Optional[str] = None  # sender of the SMS, kept for dead-lettering
+    sms_date: Optional[str] = None  # raw SMS date (epoch milliseconds)
 
 class MTNParser:
     """Parser for MTN MobileMoney messages with transaction categorization."""
@@ -0,0 +1,63 @@
+"""
+MoMo SMS Prefilter
+Cheap checks that decide whether an SMS is worth handing to the parser
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable
+
+MOMO_SENDERS = ('M-Money', 'MTN', 'MoMo', 'Mobile Money')
+
+MOMO_KEYWORDS = (
+    'RWF', 'UGX', 'deposit', 'withdraw', 'transfer', 'payment',
+    'balance', 'mobile money', 'momo', 'transaction', 'TxId',
+    'received', 'sent', 'completed', 'fee', 'new balance'
+)
+
+_SENDERS_LOWER = tuple(sender.lower() for sender in MOMO_SENDERS)
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> str:
+    """
+    Build one regex alternation for the keywords, factored as a prefix trie.
+
+    Keywords containing another keyword never change the verdict and are
+    dropped; shared prefixes are only tried once per body position.
+    """
+    words = {keyword.lower() for keyword in keywords}
+    words = {word for word in words if not any(other != word and other in word for other in words)}
+
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return emit(trie)
+
+
+# Matched against the lowercased body: case-insensitive regexes are several
+# times slower than lowercasing once
+_KEYWORD_RE = re.compile(_keyword_pattern(MOMO_KEYWORDS))
+
+
+@lru_cache(maxsize=4096)
+def is_momo_sender(address: str) -> bool:
+    """Check if an SMS sender address belongs to MoMo (cached per address)."""
+    address = address.lower()
+    return any(sender in address for sender in _SENDERS_LOWER)
+
+
+def is_momo_sms(body: str, address: str) -> bool:
+    """Check if SMS is a MoMo transaction."""
+    if is_momo_sender(address):
+        return True
+    return _KEYWORD_RE.search(body.lower()) is not None
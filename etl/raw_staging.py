@@ -0,0 +1,323 @@
+"""
+Raw SMS Staging
+Stores SMS as received in raw_sms within seconds; background parser workers claim them in chunks later
+"""
+
+import itertools
+import logging
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from api.db import MySQLDatabaseManager
+from .config import (
+    XML_FILE_PATTERN, QUEUE_MAX_ATTEMPTS, QUEUE_POLL_INTERVAL, RAW_STAGE_BATCH, RAW_CLAIM_SMS,
+    RAW_CLAIM_SECONDS, RAW_PARSE_IDLE_SECONDS
+)
+from .dead_letter import DeadLetterSpool
+from .file_tracker import FileTracker
+from .loader import MySQLDatabaseLoader
+from .parser import MTNParser
+from .prefilter import is_momo_sms
+from .sources import SmsRecord, iter_xml_sms
+from .stream import convert_to_database_format, iter_parse
+from .validation import REJECT_PREFIX, validate_transactions
+from .work_queue import default_owner
+
+logger = logging.getLogger(__name__)
+
+
+class RawSms(NamedTuple):
+    """One staged SMS claimed by a parser."""
+    id: int
+    source: str
+    sms_index: int
+    address: Optional[str]
+    sms_date: Optional[int]
+    readable_date: Optional[str]
+    body: str
+    attempts: int
+
+    def record(self) -> SmsRecord:
+        return SmsRecord(
+            address=self.address or '',
+            date='' if self.sms_date is None else str(self.sms_date),
+            body=self.body,
+            readable_date=self.readable_date or ''
+        )
+
+
+class RawStaging:
+    """
+    The raw_sms staging table.
+
+    Staging only runs the keyword prefilter (personal SMS are never stored)
+    and commits every batch_size SMS, so a backup is durable long before it
+    could be parsed and loaded. Rows are unique per source hash and SMS
+    position: staging a file again, or resuming an interrupted staging run,
+    never duplicates rows.
+
+    Parsers claim chunks of pending rows with SELECT ... FOR UPDATE SKIP
+    LOCKED, so concurrent claims never block on or return the same rows.
+    A claim expires claim_seconds after it was taken and the rows are
+    claimed again by any parser; after max_attempts claims they are marked
+    FAILED. Expiry times come from the database clock.
+    """
+
+    def __init__(self, owner: Optional[str] = None, claim_seconds: int = RAW_CLAIM_SECONDS,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.db = MySQLDatabaseManager()
+        self.file_tracker = FileTracker()
+        self.owner = owner or default_owner()
+        self.claim_seconds = claim_seconds
+        self.max_attempts = max_attempts
+
+    def stage_records(self, records: Iterable[SmsRecord], source: str, source_hash: str,
+                      batch_size: int = RAW_STAGE_BATCH) -> int:
+        """
+        Insert the MoMo SMS of a stream into raw_sms; returns the number staged.
+
+        Batches are committed in stream order, so a rerun skips every SMS
+        before the highest position already staged for source_hash.
+        """
+        staged = 0
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(sms_index) FROM raw_sms WHERE source_hash = %s", (source_hash,))
+            last = cursor.fetchone()[0]
+            start = 0 if last is None else last + 1
+            if start:
+                logger.info(f"{source}: SMS before {start} are already staged")
+
+            rows = (
+                (source, source_hash, i, sms.address or None, int(sms.date) if (sms.date or '').isdigit() else None,
+                 sms.readable_date or None, sms.body)
+                for i, sms in enumerate(itertools.islice(records, start, None), start=start)
+                if is_momo_sms(sms.body, sms.address)
+            )
+            while True:
+                batch = list(itertools.islice(rows, max(1, batch_size)))
+                if not batch:
+                    break
+                cursor.executemany("""
+                    INSERT IGNORE INTO raw_sms
+                    (source, source_hash, sms_index, address, sms_date, readable_date, body)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, batch)
+                conn.commit()
+                staged += len(batch)
+            cursor.close()
+
+        logger.info(f"Staged {staged} SMS from {source}")
+        return staged
+
+    def stage_file(self, xml_file: Path, batch_size: int = RAW_STAGE_BATCH) -> int:
+        """Stage an XML backup and mark it processed; unchanged files are skipped."""
+        if not self.file_tracker.should_process_file(xml_file):
+            logger.info(f"File {xml_file.name} has already been processed and hasn't changed. Skipping...")
+            return 0
+
+        file_hash = self.file_tracker.calculate_file_hash(xml_file)
+        staged = self.stage_records(iter_xml_sms(xml_file), xml_file.name, file_hash, batch_size)
+        self.file_tracker.mark_file_processed(xml_file, staged, 'SUCCESS')
+        return staged
+
+    def stage_directory(self, directory: Path, pattern: str = XML_FILE_PATTERN,
+                        batch_size: int = RAW_STAGE_BATCH) -> int:
+        """Stage every new or changed file in a directory."""
+        return sum(
+            self.stage_file(file_path, batch_size)
+            for file_path in self.file_tracker.get_pending_files(directory, pattern)
+        )
+
+    def claim(self, limit: int = RAW_CLAIM_SMS) -> List[RawSms]:
+        """Claim up to limit of the oldest pending or expired rows (empty when there are none)."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    SELECT id, source, sms_index, address, sms_date, readable_date, body, attempts
+                    FROM raw_sms
+                    WHERE status = 'PENDING' OR (status = 'CLAIMED' AND claim_expires_at < NOW())
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (limit,))
+                rows = [RawSms(*row) for row in cursor.fetchall()]
+
+                # Rows whose parser died or hung every time are given up on
+                exhausted = [row.id for row in rows if row.attempts >= self.max_attempts]
+                if exhausted:
+                    cursor.execute(f"""
+                        UPDATE raw_sms SET status = 'FAILED', owner = NULL, claim_expires_at = NULL,
+                            error_message = 'Claim expired after {self.max_attempts} attempts'
+                        WHERE id IN ({', '.join(['%s'] * len(exhausted))})
+                    """, exhausted)
+                    logger.error(f"Giving up on {len(exhausted)} staged SMS after {self.max_attempts} attempts")
+
+                rows = [row._replace(attempts=row.attempts + 1) for row in rows if row.attempts < self.max_attempts]
+                if rows:
+                    cursor.execute(f"""
+                        UPDATE raw_sms
+                        SET status = 'CLAIMED', owner = %s, attempts = attempts + 1,
+                            claim_expires_at = NOW() + INTERVAL %s SECOND
+                        WHERE id IN ({', '.join(['%s'] * len(rows))})
+                    """, [self.owner, self.claim_seconds] + [row.id for row in rows])
+                conn.commit()
+                return rows
+            finally:
+                cursor.close()
+
+    def _finish(self, ids: List[int], status: str, error: Optional[str] = None) -> int:
+        """Set the status of rows this owner still holds; returns how many it held."""
+        if not ids:
+            return 0
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE raw_sms
+                SET status = %s, owner = NULL, claim_expires_at = NULL, error_message = %s,
+                    parsed_at = IF(%s = 'PARSED', NOW(), parsed_at)
+                WHERE id IN ({', '.join(['%s'] * len(ids))}) AND owner = %s AND status = 'CLAIMED'
+            """, [status, error, status] + list(ids) + [self.owner])
+            updated = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return updated
+
+    def mark_parsed(self, ids: List[int]) -> int:
+        """Mark claimed rows parsed (loaded, dead-lettered or rejected)."""
+        return self._finish(ids, 'PARSED')
+
+    def release(self, ids: List[int], error: str):
+        """Return claimed rows to the pending pool after an error."""
+        self._finish(ids, 'PENDING', error[:65535])
+
+    def has_open_rows(self) -> bool:
+        """True while any row is pending or claimed by a parser (which may still expire)."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM raw_sms WHERE status IN ('PENDING', 'CLAIMED'))")
+            open_rows = cursor.fetchone()[0]
+            cursor.close()
+            return bool(open_rows)
+
+    def progress(self) -> Dict[str, int]:
+        """Staged SMS per status."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) FROM raw_sms GROUP BY status")
+            progress = {status: int(count) for status, count in cursor.fetchall()}
+            cursor.close()
+            return progress
+
+
+class RawParseWorker:
+    """
+    Claims chunks of staged SMS and parses and loads them into transactions.
+
+    The worker polls while rows are pending or claimed elsewhere, so it can
+    take over expired claims, and exits once there has been nothing to
+    claim for idle_seconds (0 exits as soon as the table is drained).
+    Parsing throughput scales with the number of workers, on any host.
+    """
+
+    def __init__(self, owner: Optional[str] = None, chunk_size: int = RAW_CLAIM_SMS,
+                 idle_seconds: float = RAW_PARSE_IDLE_SECONDS, poll_interval: float = QUEUE_POLL_INTERVAL):
+        self.staging = RawStaging(owner)
+        self.chunk_size = chunk_size
+        self.idle_seconds = idle_seconds
+        self.poll_interval = poll_interval
+
+        self.parser = MTNParser()
+        self.dead_letter = DeadLetterSpool()
+        self.rejects = DeadLetterSpool(prefix=REJECT_PREFIX)
+        self.loader = MySQLDatabaseLoader(dead_letter=self.dead_letter)
+        self.running = False
+
+        self.chunks_parsed = 0
+        self.sms_parsed = 0
+        self.total_loaded = 0
+
+    def stop(self, *args):
+        """Ask the loop to exit after the current chunk."""
+        self.running = False
+
+    def run(self) -> Dict[str, Any]:
+        """Parse staged SMS until idle for idle_seconds or stopped."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+
+        self.loader.connect()
+        self.running = True
+        idle_since = time.monotonic()
+        logger.info(f"Raw parse worker {self.staging.owner} started")
+
+        try:
+            while self.running:
+                rows = self.staging.claim(self.chunk_size)
+                if rows:
+                    self.process_chunk(rows)
+                    idle_since = time.monotonic()
+                    continue
+                if not self.staging.has_open_rows() and time.monotonic() - idle_since >= self.idle_seconds:
+                    break
+                time.sleep(self.poll_interval)
+        finally:
+            self.loader.close()
+            self.dead_letter.close()
+            self.rejects.close()
+
+        logger.info(f"Raw parse worker {self.staging.owner} finished: {self.chunks_parsed} chunks, "
+                    f"{self.sms_parsed} SMS, {self.total_loaded} transactions loaded")
+        return {
+            'owner': self.staging.owner,
+            'chunks_parsed': self.chunks_parsed,
+            'sms_parsed': self.sms_parsed,
+            'final_loaded': self.total_loaded
+        }
+
+    def process_chunk(self, rows: List[RawSms]):
+        """Parse, validate and load one claimed chunk, then mark it parsed."""
+        ids = [row.id for row in rows]
+        try:
+            transactions = []
+            # A chunk may span sources; dead letters and rejects keep the SMS's own
+            for source, group in itertools.groupby(rows, key=lambda row: row.source):
+                group = list(group)
+                parsed = list(iter_parse((row.record() for row in group), self.parser,
+                                         dead_letter=self.dead_letter, source_name=source))
+                for transaction in parsed:
+                    transaction.sms_index = group[transaction.sms_index].sms_index
+                valid, _ = validate_transactions(parsed, self.rejects, source)
+                transactions.extend(valid)
+
+            loaded_before = self.loader.loaded_count
+            if transactions:
+                self.loader.load_transactions(convert_to_database_format(transactions))
+            loaded = self.loader.loaded_count - loaded_before
+
+            self.dead_letter.flush()
+            self.rejects.flush()
+            self.parser.errors.clear()
+            self.loader.errors.clear()
+
+        except Exception as e:
+            logger.error(f"Chunk of {len(rows)} staged SMS from id {ids[0]} failed: {e}")
+            self.staging.release(ids, str(e))
+            try:
+                self.loader.close()
+                self.loader.connect()
+            except Exception as reconnect_error:
+                logger.error(f"Reconnect failed: {reconnect_error}")
+            return
+
+        if self.staging.mark_parsed(ids) < len(ids):
+            # The claim expired and another parser has the rows; the loader skips its duplicates
+            logger.warning(f"Claim on staged SMS from id {ids[0]} expired before the chunk was done")
+        self.chunks_parsed += 1
+        self.sms_parsed += len(rows)
+        self.total_loaded += loaded
+        logger.debug(f"Parsed {len(rows)} staged SMS, {loaded} transactions loaded")
@@ -6,239 +6,173 @@ Uses the new enhanced parser with detailed message type categorization
 
 import argparse
 import logging
+import multiprocessing
+import random
 import sys
-import json
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from etl.config import XML_INPUT_FILE, ETL_LOG_FILE, LOG_LEVEL
-from etl.parser import MTNParser, ParsedTransaction
+from etl.config import (
+    XML_INPUT_FILE, ETL_LOG_FILE, LOG_LEVEL, RAW_DIR, XML_FILE_PATTERN, ETL_MAX_WORKERS,
+    DAEMON_FLUSH_INTERVAL, DAEMON_BATCH_RECORDS, LATEST_FIRST_WINDOW_DAYS, LATEST_FIRST_CHUNK_SMS,
+    PARSE_CHUNK_SMS, PARSE_TRANSPORT
+)
+from etl.parser import MTNParser, ParsedTransaction, PARSER_VERSION
 from etl.loader import MySQLDatabaseLoader
 from etl.file_tracker import FileTracker
+from etl.sources import (
+    SmsRecord, iter_xml_sms, merge_sms_sources, build_sms_index, iter_xml_sms_at, iter_xml_sms_range,
+    iter_sqlite_sms, sqlite_sms_max_id, SQLITE_ORDERS
+)
+from etl.dead_letter import DeadLetterSpool, read_segment
+from etl.prefilter import is_momo_sms
+from etl.metrics import MemoryProfiler, PipelineMetrics
+from etl.logging_utils import setup_queued_logging
+from etl.sampling import reservoir_sample, bernoulli_sample, estimate_distribution
+from etl.validation import REJECT_PREFIX, validate_transactions
+from etl.stream import convert_to_database_format, iter_parse
+from etl.shm_transport import pack_rows, unpack_rows, discard_rows
+
+# etl_checkpoints rows holding a SQLite high watermark carry this instead of a file hash
+SQLITE_WATERMARK = 'sqlite-watermark'
 
 def setup_logging(log_file: Path = ETL_LOG_FILE, level: str = LOG_LEVEL):
-    """Setup logging configuration."""
-    # Create logs directory
-    log_file.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    """
+    Setup logging configuration.
+    
+    File and console output are written by a background thread, and bursts
+    of similar errors are folded into periodic summaries.
+    """
+    setup_queued_logging(log_file, level)
     
     logger = logging.getLogger(__name__)
     logger.info(f"ETL process started - Log level: {level}")
     return logger
 
+def parse_sms_records(records: Iterable[SmsRecord], parser: Optional[MTNParser] = None,
+                      start_index: int = 0, dead_letter: Optional[DeadLetterSpool] = None,
+                      source: str = '', metrics: Optional[PipelineMetrics] = None,
+                      first_index: int = 0) -> List[ParsedTransaction]:
+    """
+    Filter and parse a stream of SMS records using the MTN parser.
+    
+    Collects etl.stream.iter_parse into a list; see there for how
+    start_index, first_index, dead_letter and metrics are used.
+    """
+    logger = logging.getLogger(__name__)
+    stats = {}
+    transactions = list(iter_parse(records, parser, start_index, dead_letter, source, metrics,
+                                   first_index, stats))
+    
+    logger.info(f"Read {stats['total_sms']} SMS elements")
+    if start_index:
+        logger.info(f"Skipped {min(start_index, stats['total_sms'])} SMS already loaded before the checkpoint")
+    logger.info(f"Successfully parsed {len(transactions)} transactions")
+    return transactions
+
 def parse_xml_with_parser(xml_file: Path) -> List[ParsedTransaction]:
     """Parse XML file using the MTN parser."""
-    import xml.etree.ElementTree as ET
-    
     logger = logging.getLogger(__name__)
-    parser = MTNParser()
-    transactions = []
     
     try:
-        # Parse XML file
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        
-        # Extract SMS elements
-        sms_elements = root.findall('.//sms')
-        logger.info(f"Found {len(sms_elements)} SMS elements")
-        
-        # Process each SMS
-        for i, sms in enumerate(sms_elements):
-            try:
-                body = sms.get('body', '')
-                date = sms.get('date', '')
-                readable_date = sms.get('readable_date', '')
-                
-                # Skip if not a MoMo SMS
-                if not _is_momo_sms(body, sms.get('address', '')):
-                    continue
-                
-                # Parse timestamp
-                timestamp = None
-                if date:
-                    try:
-                        timestamp_int = int(date)
-                        dt = datetime.fromtimestamp(timestamp_int / 1000)
-                        timestamp = dt.isoformat()
-                    except:
-                        pass
-                elif readable_date:
-                    timestamp = readable_date
-                
-                # Parse message with enhanced parser
-                transaction = parser.parse_message(body, timestamp)
-                if transaction:
-                    transactions.append(transaction)
-                    
-            except Exception as e:
-                logger.error(f"Error processing SMS {i}: {e}")
-                continue
-        
-        logger.info(f"Successfully parsed {len(transactions)} transactions")
-        return transactions
-        
+        return parse_sms_records(iter_xml_sms(xml_file))
     except Exception as e:
         logger.error(f"Error parsing XML file: {e}")
         raise
 
-def _is_momo_sms(body: str, address: str) -> bool:
-    """Check if SMS is a MoMo transaction."""
-    # Check address
-    momo_addresses = ['M-Money', 'MTN', 'MoMo', 'Mobile Money']
-    if any(addr.lower() in address.lower() for addr in momo_addresses):
-        return True
-    
-    # Check body content
-    momo_keywords = [
-        'RWF', 'UGX', 'deposit', 'withdraw', 'transfer', 'payment',
-        'balance', 'mobile money', 'momo', 'transaction', 'TxId',
-        'received', 'sent', 'completed', 'fee', 'new balance'
-    ]
-    
-    body_lower = body.lower()
-    return any(keyword.lower() in body_lower for keyword in momo_keywords)
-
-def convert_to_database_format(transactions: List[ParsedTransaction]) -> List[Dict[str, Any]]:
-    """Convert ParsedTransaction objects to database format."""
-    db_transactions = []
-    
-    for transaction in transactions:
-        db_transaction = {
-            'amount': transaction.amount,
-            'phone': transaction.recipient_phone or transaction.sender_phone,
-            'date': transaction.date,
-            'reference': transaction.transaction_id or transaction.financial_transaction_id or transaction.external_transaction_id,
-            'type': transaction.transaction_type,
-            'transaction_type': transaction.transaction_type,
-            'direction': transaction.direction,
-            'status': transaction.status,  # Use the status from parsed transaction
-            'category': transaction.category,
-            'category_confidence': transaction.confidence,
-            'confidence': transaction.confidence,
-            'recipient_name': transaction.recipient_name,
-            'sender_name': transaction.sender_name,
-            'sender_phone': transaction.sender_phone,
-            'recipient_phone': transaction.recipient_phone,
-            'momo_code': transaction.momo_code,
-            'sender_momo_id': transaction.sender_momo_id,
-            'agent_momo_number': transaction.agent_momo_number,
-            'business_name': transaction.business_name,
-            'fee': transaction.fee,
-            'new_balance': transaction.new_balance,
-            'financial_transaction_id': transaction.financial_transaction_id,
-            'external_transaction_id': transaction.external_transaction_id,
-            'personal_id': transaction.sender_momo_id or transaction.momo_code,
-            'original_data': transaction.original_message,
-            'original_message': transaction.original_message,
-            'raw_data': transaction.original_message,
-            'xml_tag': 'sms',
-            'xml_attributes': {
-                'transaction_type': transaction.transaction_type,
-                'category': transaction.category,
-                'direction': transaction.direction,
-                'fee': transaction.fee,
-                'new_balance': transaction.new_balance,
-                'business_name': transaction.business_name,
-                'agent_momo_number': transaction.agent_momo_number,
-                'financial_transaction_id': transaction.financial_transaction_id,
-                'external_transaction_id': transaction.external_transaction_id,
-                'transaction_id': transaction.transaction_id
-            },
-            'parsed_at': datetime.now().isoformat(),
-            'cleaned_at': datetime.now().isoformat(),
-            'categorized_at': datetime.now().isoformat()
-        }
-        
-        db_transactions.append(db_transaction)
-    
-    return db_transactions
-
-def run_enhanced_etl_pipeline(xml_file: Path, export_json: bool = True) -> dict:
+def _run_pipeline_stages(records: Iterable[SmsRecord], export_json: bool = True,
+                         start_index: int = 0, checkpoint: Optional[Dict[str, Any]] = None,
+                         source: str = '', profile_memory: bool = False,
+                         parquet: bool = False, event_log: bool = False) -> dict:
     """
-    Run the enhanced ETL pipeline with detailed message type parsing.
+    Parse, convert, load and optionally export one stream of SMS records.
     
     Args:
-        xml_file: Path to XML input file
+        records: SMS records to process
         export_json: Whether to export dashboard JSON
+        start_index: Position of the first SMS to process (resume point)
+        checkpoint: File identity to save batch checkpoints under
+        source: Name recorded with SMS written to the dead-letter spool
+        profile_memory: Write a tracemalloc report of every stage next to the ETL log
+        parquet: Also write the parsed transactions to month-partitioned Parquet
+        event_log: Also append the parsed transactions to the event log
         
     Returns:
-        Summary of ETL process
+        Summary of the run ('success' or 'warning' when nothing was parsed)
     """
     logger = logging.getLogger(__name__)
     start_time = datetime.now()
     
-    # Initialize file tracker
-    file_tracker = FileTracker()
-    
-    try:
-        logger.info("=" * 60)
-        logger.info("Starting Enhanced MTN MobileMoney ETL Pipeline")
-        logger.info("=" * 60)
-        
-        # Check if file should be processed
-        if not file_tracker.should_process_file(xml_file):
-            logger.info(f"File {xml_file.name} has already been processed and hasn't changed. Skipping...")
-            return {'status': 'skipped', 'message': 'File already processed and unchanged'}
-        
-        logger.info(f"Processing file: {xml_file.name}")
+    with _memory_profile(profile_memory) as profiler, DeadLetterSpool() as dead_letter, \
+            DeadLetterSpool(prefix=REJECT_PREFIX) as rejects:
+        metrics = PipelineMetrics(profiler=profiler)
         
         # Step 1: Parse XML with parser
         logger.info("Step 1: Parsing XML with message type detection...")
-        parsed_transactions = parse_xml_with_parser(xml_file)
+        parsed_transactions = parse_sms_records(records, start_index=start_index,
+                                                dead_letter=dead_letter, source=source,
+                                                metrics=metrics)
         
+        with metrics.stage('validate', len(parsed_transactions)):
+            parsed_transactions, rejected = validate_transactions(parsed_transactions, rejects, source)
+    
         if not parsed_transactions:
             logger.warning("No transactions found in XML file")
             return {'status': 'warning', 'message': 'No transactions found'}
-        
+    
         # Analyze transaction types
         type_stats = {}
         category_stats = {}
         for transaction in parsed_transactions:
             type_stats[transaction.transaction_type] = type_stats.get(transaction.transaction_type, 0) + 1
             category_stats[transaction.category] = category_stats.get(transaction.category, 0) + 1
-        
+    
         logger.info(f"Transaction Types: {type_stats}")
         logger.info(f"Transaction Categories: {category_stats}")
         
+        if parquet:
+            _write_parquet_stage(parsed_transactions, source, start_index, metrics)
+        if event_log:
+            _append_events_stage(parsed_transactions, source, metrics)
+    
         # Step 2: Convert to database format
         logger.info("Step 2: Converting to database format...")
-        db_transactions = convert_to_database_format(parsed_transactions)
+        with metrics.stage('convert', len(parsed_transactions)):
+            db_transactions = convert_to_database_format(parsed_transactions)
         logger.info(f"Converted {len(db_transactions)} transactions to database format")
-        
+    
         # Step 3: Load to database
         logger.info("Step 3: Loading to MySQL database...")
-        with MySQLDatabaseLoader() as db_loader:
-            loading_summary = db_loader.load_transactions(db_transactions)
+        with MySQLDatabaseLoader(dead_letter=dead_letter, live_dashboard=export_json) as db_loader:
+            with metrics.stage('load', len(db_transactions)):
+                loading_summary = db_loader.load_transactions(db_transactions, checkpoint=checkpoint)
             logger.info(f"Loaded {loading_summary['successfully_loaded']} transactions to database")
-            
+        
             # Step 4: Export dashboard JSON
             if export_json:
                 logger.info("Step 4: Exporting dashboard data...")
-                dashboard_data = db_loader.export_dashboard_json()
+                with metrics.stage('export', 1):
+                    db_loader.export_dashboard_json()
                 logger.info("Dashboard data exported successfully")
-            
+        
             # Get final database stats
             db_stats = db_loader.get_database_stats()
-        
+            db_loader.log_pipeline_metrics(metrics, len(parsed_transactions),
+                                           loading_summary['successfully_loaded'],
+                                           loading_summary['loading_errors'])
+    
         # Compile final summary
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
-        
-        final_summary = {
+    
+        return {
             'status': 'success',
             'duration_seconds': duration,
             'start_time': start_time.isoformat(),
@@ -250,34 +184,201 @@ def run_enhanced_etl_pipeline(xml_file: Path, export_json: bool = True) -> dict:
             },
             'loading': loading_summary,
             'database_stats': db_stats,
+            'dead_lettered': dead_letter.written,
+            'rejected': rejected,
+            'stage_metrics': metrics.as_dict(),
+            'metrics_table': metrics.format_table(),
             'total_processed': len(parsed_transactions),
             'final_loaded': loading_summary['successfully_loaded']
         }
+
+def _write_parquet_stage(transactions: List[ParsedTransaction], source: str, start_index: int,
+                         metrics: Optional[PipelineMetrics] = None):
+    """Write parsed transactions to the Parquet dataset."""
+    logger = logging.getLogger(__name__)
+    
+    # Parquet is written before loading, so the run that left the checkpoint
+    # already wrote every transaction of this source
+    if start_index:
+        logger.info("Resumed run: Parquet output was written by the interrupted run, skipping")
+        return
+    
+    # Imported here so pandas and pyarrow are only needed with --parquet
+    from etl.columnar import write_parquet
+    
+    logger.info("Writing parsed transactions to Parquet...")
+    if metrics:
+        with metrics.stage('parquet', len(transactions)):
+            write_parquet(transactions, source or 'transactions')
+    else:
+        write_parquet(transactions, source or 'transactions')
+
+def _append_events_stage(transactions: List[ParsedTransaction], source: str,
+                         metrics: Optional[PipelineMetrics] = None):
+    """Append parsed transactions to the event log."""
+    from etl.event_log import EventLog
+    
+    # SMS already in the log are skipped, so resumed runs need no special case
+    logging.getLogger(__name__).info("Appending parsed transactions to the event log...")
+    if metrics:
+        with metrics.stage('events', len(transactions)):
+            EventLog().append(transactions, source)
+    else:
+        EventLog().append(transactions, source)
+
+def update_event_views(rebuild: bool = False, export_json: bool = True) -> dict:
+    """
+    Catch up (or rebuild) the event log views in one pass and export the dashboard.
+    
+    Args:
+        rebuild: Replay the whole log instead of only the new events
+        export_json: Write the dashboard JSON file from the dashboard view
+        
+    Returns:
+        Summary with the events read and the events applied per view
+    """
+    from etl.event_log import EventLog, DashboardView, VIEWS, update_views
+    
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    
+    views = [view_class() for view_class in VIEWS]
+    read = update_views(EventLog(), views, rebuild=rebuild)
+    
+    if export_json:
+        next(view for view in views if isinstance(view, DashboardView)).export()
+    
+    duration = (datetime.now() - start_time).total_seconds()
+    logger.info(f"{'Rebuilt' if rebuild else 'Caught up'} {len(views)} views from "
+                f"{read} events in {duration:.2f} seconds")
+    
+    return {
+        'status': 'success',
+        'duration_seconds': duration,
+        'events_read': read,
+        'views': {view.name: view.events_applied for view in views}
+    }
+
+@contextmanager
+def _memory_profile(enabled: bool):
+    """Trace allocations for the duration of the block and write the report."""
+    if not enabled:
+        yield None
+        return
+    
+    logger = logging.getLogger(__name__)
+    profiler = MemoryProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        report_file = profiler.write_report(ETL_LOG_FILE.parent)
+        profiler.stop()
+        logger.info(f"Memory profile written to {report_file}")
+
+def _log_pipeline_completion(summary: dict):
+    """Log the closing banner of a successful pipeline run."""
+    logger = logging.getLogger(__name__)
+    logger.info("=" * 60)
+    logger.info("Enhanced ETL Pipeline Completed Successfully")
+    logger.info(f"Duration: {summary['duration_seconds']:.2f} seconds")
+    logger.info(f"Total processed: {summary['total_processed']}")
+    logger.info(f"Final loaded: {summary['final_loaded']}")
+    if summary.get('metrics_table'):
+        logger.info("Stage performance:\n" + summary['metrics_table'])
+    logger.info("=" * 60)
+
+def run_enhanced_etl_pipeline(xml_file: Path, export_json: bool = True,
+                              profile_memory: bool = False, parquet: bool = False,
+                              event_log: bool = False) -> dict:
+    """
+    Run the enhanced ETL pipeline with detailed message type parsing.
+    
+    Args:
+        xml_file: Path to XML input file
+        export_json: Whether to export dashboard JSON
+        profile_memory: Write a per-stage tracemalloc report next to the ETL log
+        parquet: Also write the parsed transactions to month-partitioned Parquet
+        event_log: Also append the parsed transactions to the event log
+        
+    Returns:
+        Summary of ETL process
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    
+    # Initialize file tracker
+    file_tracker = FileTracker()
+    file_hash = None
+    
+    try:
+        logger.info("=" * 60)
+        logger.info("Starting Enhanced MTN MobileMoney ETL Pipeline")
+        logger.info("=" * 60)
+        
+        # Check if file should be processed
+        if not file_tracker.should_process_file(xml_file):
+            logger.info(f"File {xml_file.name} has already been processed and hasn't changed. Skipping...")
+            return {'status': 'skipped', 'message': 'File already processed and unchanged'}
+        
+        logger.info(f"Processing file: {xml_file.name}")
+        
+        # Resume from the last committed batch of an interrupted run
+        file_hash = file_tracker.calculate_file_hash(xml_file)
+        resume = file_tracker.get_checkpoint(xml_file, file_hash)
+        if resume['last_position']:
+            logger.info(f"Resuming {xml_file.name} from SMS {resume['last_position']} "
+                        f"({resume['records_loaded']} transactions already loaded)")
+        
+        checkpoint = {
+            'file_path': str(xml_file.resolve()),
+            'file_hash': file_hash,
+            'records_loaded': resume['records_loaded']
+        }
+        
+        final_summary = _run_pipeline_stages(
+            iter_xml_sms(xml_file), export_json,
+            start_index=resume['last_position'], checkpoint=checkpoint, source=xml_file.name,
+            profile_memory=profile_memory, parquet=parquet, event_log=event_log
+        )
+        if final_summary['status'] == 'warning' and resume['last_position']:
+            # Everything after the checkpoint was already loaded or had no transactions
+            final_summary.update({
+                'status': 'success',
+                'duration_seconds': (datetime.now() - start_time).total_seconds(),
+                'total_processed': 0,
+                'final_loaded': 0
+            })
+        elif final_summary['status'] != 'success':
+            return final_summary
+        
+        final_summary['resumed_from'] = resume['last_position']
         
         # Mark file as processed
         file_tracker.mark_file_processed(
             xml_file, 
-            loading_summary['successfully_loaded'], 
+            resume['records_loaded'] + final_summary['final_loaded'], 
             'SUCCESS'
         )
+        file_tracker.clear_checkpoint(xml_file)
         
-        logger.info("=" * 60)
-        logger.info("Enhanced ETL Pipeline Completed Successfully")
-        logger.info(f"Duration: {duration:.2f} seconds")
-        logger.info(f"Total processed: {final_summary['total_processed']}")
-        logger.info(f"Final loaded: {final_summary['final_loaded']}")
-        logger.info("=" * 60)
+        _log_pipeline_completion(final_summary)
         
         return final_summary
         
     except Exception as e:
         logger.error(f"Enhanced ETL pipeline failed: {e}")
         
+        # Committed batches survive the failure and the next run resumes after them
+        progress = {'last_position': 0, 'records_loaded': 0}
+        if file_hash:
+            progress = file_tracker.get_checkpoint(xml_file, file_hash)
+        
         # Mark file as failed
         file_tracker.mark_file_processed(
             xml_file, 
-            0, 
-            'FAILED', 
+            progress['records_loaded'], 
+            'PARTIAL' if progress['last_position'] else 'FAILED', 
             str(e)
         )
         
@@ -289,6 +390,870 @@ def run_enhanced_etl_pipeline(xml_file: Path, export_json: bool = True) -> dict:
             'end_time': datetime.now().isoformat()
         }
 
+def _latest_first_chunks(total: int, recent: int, chunk_size: int) -> List[tuple]:
+    """Newest-first position ranges: the recent window, then back-fill chunks."""
+    chunks = [(0, recent)] if recent else []
+    for start in range(recent, total, max(1, chunk_size)):
+        chunks.append((start, min(start + chunk_size, total)))
+    return chunks
+
+def run_latest_first_pipeline(xml_file: Path, export_json: bool = True,
+                              window_days: float = LATEST_FIRST_WINDOW_DAYS,
+                              chunk_size: int = LATEST_FIRST_CHUNK_SMS) -> dict:
+    """
+    Load one backup newest SMS first, so recent data is queryable early.
+    
+    The file is indexed by SMS offset and date, then read in reverse date
+    order. SMS from the last window_days of the backup are loaded (and the
+    dashboard exported) first; the older tail is back-filled in chunks of
+    chunk_size SMS. Checkpoints count SMS in newest-first order and are
+    kept apart from those of a normal run of the same file.
+    
+    Args:
+        xml_file: Path to XML input file
+        export_json: Whether to export dashboard JSON after the recent window and at the end
+        window_days: Days before the newest SMS that are loaded first
+        chunk_size: SMS per back-fill chunk
+        
+    Returns:
+        Summary of ETL process
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    file_tracker = FileTracker()
+    checkpoint_path = xml_file.with_name(xml_file.name + '#latest-first')
+    file_hash = None
+    
+    try:
+        if not file_tracker.should_process_file(xml_file):
+            logger.info(f"File {xml_file.name} has already been processed and hasn't changed. Skipping...")
+            return {'status': 'skipped', 'message': 'File already processed and unchanged'}
+        
+        logger.info(f"Processing file newest first: {xml_file.name}")
+        file_hash = file_tracker.calculate_file_hash(xml_file)
+        resume = file_tracker.get_checkpoint(checkpoint_path, file_hash)
+        checkpoint = {
+            'file_path': str(checkpoint_path.resolve()),
+            'file_hash': file_hash,
+            'records_loaded': resume['records_loaded']
+        }
+        
+        metrics = PipelineMetrics()
+        with metrics.stage('index') as stage:
+            index = build_sms_index(xml_file)
+            order = index.latest_first()
+            stage.records = len(index)
+        
+        if not len(index):
+            logger.warning("No SMS found in XML file")
+            return {'status': 'warning', 'message': 'No transactions found'}
+        
+        newest = int(index.timestamps[order[0]])
+        recent = index.count_since(newest - int(window_days * 86400 * 1000)) if newest else 0
+        chunks = _latest_first_chunks(len(index), recent, chunk_size)
+        logger.info(f"Indexed {len(index)} SMS; {recent} from the last {window_days:g} days are loaded first")
+        if resume['last_position']:
+            logger.info(f"Resuming from SMS {resume['last_position']} in newest-first order "
+                        f"({resume['records_loaded']} transactions already loaded)")
+        
+        total_parsed = 0
+        rejected = 0
+        recent_window = None
+        
+        with DeadLetterSpool() as dead_letter, DeadLetterSpool(prefix=REJECT_PREFIX) as rejects, \
+                MySQLDatabaseLoader(dead_letter=dead_letter, live_dashboard=export_json) as db_loader:
+            for chunk_number, (chunk_start, chunk_end) in enumerate(chunks):
+                first = max(chunk_start, resume['last_position'])
+                if first < chunk_end:
+                    records = iter_xml_sms_at(xml_file, index, order[first:chunk_end])
+                    parsed_transactions = parse_sms_records(records, dead_letter=dead_letter,
+                                                            source=xml_file.name, metrics=metrics,
+                                                            first_index=first)
+                    with metrics.stage('validate', len(parsed_transactions)):
+                        parsed_transactions, chunk_rejected = validate_transactions(
+                            parsed_transactions, rejects, xml_file.name
+                        )
+                    with metrics.stage('convert', len(parsed_transactions)):
+                        db_transactions = convert_to_database_format(parsed_transactions)
+                    if db_transactions:
+                        with metrics.stage('load', len(db_transactions)):
+                            db_loader.load_transactions(db_transactions, checkpoint=checkpoint)
+                    total_parsed += len(parsed_transactions)
+                    rejected += chunk_rejected
+                
+                if chunk_number == 0:
+                    recent_window = {
+                        'sms': chunk_end,
+                        'loaded': db_loader.loaded_count,
+                        'seconds': (datetime.now() - start_time).total_seconds()
+                    }
+                    logger.info(f"Recent window loaded: {db_loader.loaded_count} transactions "
+                                f"in {recent_window['seconds']:.2f}s; back-filling {len(index) - chunk_end} older SMS")
+                
+                if export_json and (chunk_number == 0 or chunk_number == len(chunks) - 1):
+                    with metrics.stage('export', 1):
+                        db_loader.export_dashboard_json()
+            
+            loading_summary = db_loader.get_loading_summary()
+            db_stats = db_loader.get_database_stats()
+            db_loader.log_pipeline_metrics(metrics, total_parsed, loading_summary['successfully_loaded'],
+                                           loading_summary['loading_errors'])
+        
+        file_tracker.mark_file_processed(xml_file, resume['records_loaded'] + loading_summary['successfully_loaded'],
+                                         'SUCCESS')
+        file_tracker.clear_checkpoint(checkpoint_path)
+        
+        end_time = datetime.now()
+        summary = {
+            'status': 'success',
+            'duration_seconds': (end_time - start_time).total_seconds(),
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'resumed_from': resume['last_position'],
+            'recent_window': recent_window,
+            'loading': loading_summary,
+            'database_stats': db_stats,
+            'dead_lettered': dead_letter.written,
+            'rejected': rejected,
+            'stage_metrics': metrics.as_dict(),
+            'metrics_table': metrics.format_table(),
+            'total_processed': total_parsed,
+            'final_loaded': loading_summary['successfully_loaded']
+        }
+        _log_pipeline_completion(summary)
+        return summary
+        
+    except Exception as e:
+        logger.error(f"Latest-first ETL pipeline failed: {e}")
+        
+        progress = {'last_position': 0, 'records_loaded': 0}
+        if file_hash:
+            progress = file_tracker.get_checkpoint(checkpoint_path, file_hash)
+        file_tracker.mark_file_processed(
+            xml_file,
+            progress['records_loaded'],
+            'PARTIAL' if progress['last_position'] else 'FAILED',
+            str(e)
+        )
+        
+        return {
+            'status': 'error',
+            'message': str(e),
+            'duration_seconds': (datetime.now() - start_time).total_seconds(),
+            'start_time': start_time.isoformat(),
+            'end_time': datetime.now().isoformat()
+        }
+
+_range_parser = None
+
+def _parse_range_task(xml_file: str, range_start: int, range_end: int, first_index: int,
+                      start_index: int, transport: str) -> dict:
+    """
+    Parse, validate and convert the SMS of one byte range in a parse worker.
+    
+    The rows go back through the given transport (see etl.shm_transport);
+    SMS before start_index were loaded by an earlier run and are skipped.
+    """
+    global _range_parser
+    _range_parser = _range_parser or MTNParser()
+    source = Path(xml_file).name
+    started = datetime.now()
+    stats = {}
+    
+    with DeadLetterSpool() as dead_letter, DeadLetterSpool(prefix=REJECT_PREFIX) as rejects:
+        records = iter_xml_sms_range(Path(xml_file), range_start, range_end)
+        transactions = list(iter_parse(records, _range_parser, start_index, dead_letter, source,
+                                       first_index=first_index, stats=stats))
+        transactions, rejected = validate_transactions(transactions, rejects, source)
+        rows = convert_to_database_format(transactions)
+    _range_parser.errors.clear()
+    
+    return {
+        'parsed': len(transactions),
+        'rejected': rejected,
+        'dead_lettered': dead_letter.written,
+        'seconds': (datetime.now() - started).total_seconds(),
+        'rows': pack_rows(rows, transport)
+    }
+
+def run_parallel_parse_pipeline(xml_file: Path, workers: int = ETL_MAX_WORKERS,
+                                export_json: bool = True, transport: str = PARSE_TRANSPORT,
+                                chunk_size: int = PARSE_CHUNK_SMS) -> dict:
+    """
+    Parse one backup in worker processes and load it from this one.
+    
+    The file is split at SMS boundaries into tasks of chunk_size SMS. Workers
+    hand converted rows back through shared memory (transport 'shm') or by
+    pickling them ('pickle'); this process loads the results in file order
+    over a single connection, so SMS numbering and checkpoints are those of
+    a normal run of the file. At most two tasks per worker are in flight,
+    which bounds the rows waiting to be loaded.
+    
+    Args:
+        xml_file: Path to XML input file
+        workers: Number of parse worker processes
+        export_json: Whether to export dashboard JSON
+        transport: How workers return rows, 'shm' or 'pickle'
+        chunk_size: SMS per worker task
+        
+    Returns:
+        Summary of ETL process
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    file_tracker = FileTracker()
+    file_hash = None
+    
+    try:
+        if not file_tracker.should_process_file(xml_file):
+            logger.info(f"File {xml_file.name} has already been processed and hasn't changed. Skipping...")
+            return {'status': 'skipped', 'message': 'File already processed and unchanged'}
+        
+        logger.info(f"Processing file with {workers} parse workers ({transport} transport): {xml_file.name}")
+        file_hash = file_tracker.calculate_file_hash(xml_file)
+        resume = file_tracker.get_checkpoint(xml_file, file_hash)
+        if resume['last_position']:
+            logger.info(f"Resuming {xml_file.name} from SMS {resume['last_position']} "
+                        f"({resume['records_loaded']} transactions already loaded)")
+        checkpoint = {
+            'file_path': str(xml_file.resolve()),
+            'file_hash': file_hash,
+            'records_loaded': resume['records_loaded']
+        }
+        
+        metrics = PipelineMetrics()
+        with metrics.stage('index') as stage:
+            index = build_sms_index(xml_file)
+            stage.records = len(index)
+        
+        # Tasks wholly before the checkpoint are not submitted at all
+        starts = index.starts.tolist() + [index.data_end]
+        tasks = [
+            (first, starts[first], starts[min(first + chunk_size, len(index))])
+            for first in range(0, len(index), max(1, chunk_size))
+            if min(first + chunk_size, len(index)) > resume['last_position']
+        ]
+        
+        totals = Counter()
+        log_level = logging.getLevelName(logging.getLogger().getEffectiveLevel())
+        
+        with DeadLetterSpool() as dead_letter, \
+                MySQLDatabaseLoader(dead_letter=dead_letter, live_dashboard=export_json) as db_loader, \
+                ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_worker,
+                                    initargs=(log_level,)) as executor:
+            
+            def load_next():
+                with metrics.stage('wait'):
+                    result = pending.popleft().result()
+                with metrics.stage('receive', result['parsed']):
+                    rows = unpack_rows(result['rows'])
+                if rows:
+                    with metrics.stage('load', len(rows)):
+                        db_loader.load_transactions(rows, checkpoint=checkpoint)
+                totals.update({key: result[key] for key in ('parsed', 'rejected', 'dead_lettered', 'seconds')})
+            
+            pending = deque()
+            try:
+                for first, range_start, range_end in tasks:
+                    pending.append(executor.submit(_parse_range_task, str(xml_file), range_start, range_end,
+                                                   first, resume['last_position'], transport))
+                    if len(pending) >= 2 * workers:
+                        load_next()
+                while pending:
+                    load_next()
+            finally:
+                # Shared memory of tasks that were never loaded would outlive the run
+                for future in pending:
+                    if not future.cancel() and future.exception() is None:
+                        discard_rows(future.result()['rows'])
+            
+            if export_json:
+                with metrics.stage('export', 1):
+                    db_loader.export_dashboard_json()
+            
+            loading_summary = db_loader.get_loading_summary()
+            db_stats = db_loader.get_database_stats()
+            db_loader.log_pipeline_metrics(metrics, totals['parsed'], loading_summary['successfully_loaded'],
+                                           loading_summary['loading_errors'])
+        
+        file_tracker.mark_file_processed(xml_file, resume['records_loaded'] + loading_summary['successfully_loaded'],
+                                         'SUCCESS')
+        file_tracker.clear_checkpoint(xml_file)
+        
+        end_time = datetime.now()
+        summary = {
+            'status': 'success',
+            'duration_seconds': (end_time - start_time).total_seconds(),
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'resumed_from': resume['last_position'],
+            'transport': transport,
+            'parse_workers': workers,
+            'worker_parse_seconds': totals['seconds'],
+            'loading': loading_summary,
+            'database_stats': db_stats,
+            'dead_lettered': totals['dead_lettered'],
+            'rejected': totals['rejected'],
+            'stage_metrics': metrics.as_dict(),
+            'metrics_table': metrics.format_table(),
+            'total_processed': totals['parsed'],
+            'final_loaded': loading_summary['successfully_loaded']
+        }
+        _log_pipeline_completion(summary)
+        return summary
+        
+    except Exception as e:
+        logger.error(f"Parallel parse ETL pipeline failed: {e}")
+        
+        progress = {'last_position': 0, 'records_loaded': 0}
+        if file_hash:
+            progress = file_tracker.get_checkpoint(xml_file, file_hash)
+        file_tracker.mark_file_processed(
+            xml_file,
+            progress['records_loaded'],
+            'PARTIAL' if progress['last_position'] else 'FAILED',
+            str(e)
+        )
+        
+        return {
+            'status': 'error',
+            'message': str(e),
+            'duration_seconds': (datetime.now() - start_time).total_seconds(),
+            'start_time': start_time.isoformat(),
+            'end_time': datetime.now().isoformat()
+        }
+
+def run_sqlite_pipeline(db_file: Path, export_json: bool = True, order: str = 'id',
+                        parquet: bool = False, event_log: bool = False) -> dict:
+    """
+    Load the SMS added to an Android mmssms.db since the previous run.
+    
+    The `sms` table is read directly, without an XML export. The highest
+    _id of every successful run is kept as a high watermark in
+    etl_checkpoints, and the next run only reads SMS above it. SMS added
+    while a run is in progress are left for the next one. A failed run
+    leaves the watermark alone; rows it loaded are skipped as duplicates
+    when they are read again.
+    
+    Args:
+        db_file: Path to the SQLite database pulled from the phone
+        export_json: Whether to export dashboard JSON
+        order: Read new SMS in 'id' or 'date' order
+        parquet: Also write the parsed transactions to month-partitioned Parquet
+        event_log: Also append the parsed transactions to the event log
+        
+    Returns:
+        Summary of ETL process, with the SMS _id range that was read
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    file_tracker = FileTracker()
+    watermark_key = db_file.with_name(db_file.name + '#sqlite')
+    
+    try:
+        previous = file_tracker.get_checkpoint(watermark_key, SQLITE_WATERMARK)
+        after_id = previous['last_position']
+        until_id = sqlite_sms_max_id(db_file)
+        if until_id <= after_id:
+            logger.info(f"No new SMS in {db_file.name} after _id {after_id}. Skipping...")
+            return {'status': 'skipped', 'message': f'No SMS after _id {after_id}'}
+        
+        logger.info(f"Reading SMS {after_id + 1}..{until_id} from {db_file.name} in {order} order")
+        # Each run only reads the new SMS, so its Parquet files must not replace earlier runs'
+        summary = _run_pipeline_stages(
+            iter_sqlite_sms(db_file, after_id, until_id, order), export_json,
+            source=f"{db_file.name}@{after_id + 1}-{until_id}", parquet=parquet, event_log=event_log
+        )
+        if summary['status'] == 'warning':
+            # Nothing to load among the new SMS, but they have been read
+            summary.update({
+                'status': 'success',
+                'duration_seconds': (datetime.now() - start_time).total_seconds(),
+                'total_processed': 0,
+                'final_loaded': 0
+            })
+        elif summary['status'] != 'success':
+            return summary
+        
+        file_tracker.save_checkpoint(watermark_key, SQLITE_WATERMARK, until_id,
+                                     previous['records_loaded'] + summary['final_loaded'])
+        summary.update({'after_id': after_id, 'until_id': until_id})
+        _log_pipeline_completion(summary)
+        return summary
+        
+    except Exception as e:
+        logger.error(f"SQLite ETL pipeline failed: {e}")
+        return {
+            'status': 'error',
+            'message': str(e),
+            'duration_seconds': (datetime.now() - start_time).total_seconds(),
+            'start_time': start_time.isoformat(),
+            'end_time': datetime.now().isoformat()
+        }
+
+def run_merged_etl_pipeline(xml_files: List[Path], export_json: bool = True,
+                            profile_memory: bool = False, parquet: bool = False,
+                            event_log: bool = False) -> dict:
+    """
+    Run the ETL pipeline over several overlapping backups as one ordered stream.
+    
+    The backups are heap-merged by SMS date and exact duplicates are dropped
+    on the fly before parsing, so an SMS present in several backups is parsed
+    and loaded once.
+    
+    Args:
+        xml_files: XML backups to merge
+        export_json: Whether to export dashboard JSON
+        profile_memory: Write a per-stage tracemalloc report next to the ETL log
+        parquet: Also write the parsed transactions to month-partitioned Parquet
+        event_log: Also append the parsed transactions to the event log
+        
+    Returns:
+        Summary of ETL process
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    
+    file_tracker = FileTracker()
+    pending_files = []
+    
+    try:
+        logger.info("=" * 60)
+        logger.info("Starting Enhanced MTN MobileMoney ETL Pipeline (merged backups)")
+        logger.info("=" * 60)
+        
+        for xml_file in xml_files:
+            if file_tracker.should_process_file(xml_file):
+                pending_files.append(xml_file)
+            else:
+                logger.info(f"File {xml_file.name} has already been processed and hasn't changed. Skipping...")
+        
+        if not pending_files:
+            return {'status': 'skipped', 'message': 'All files already processed and unchanged'}
+        
+        logger.info(f"Merging {len(pending_files)} files: {', '.join(f.name for f in pending_files)}")
+        
+        merge_stats = {}
+        final_summary = _run_pipeline_stages(
+            merge_sms_sources(pending_files, stats=merge_stats), export_json,
+            source='+'.join(f.name for f in pending_files), profile_memory=profile_memory,
+            parquet=parquet, event_log=event_log
+        )
+        
+        logger.info(f"Merge dropped {merge_stats['duplicates_dropped']} duplicate SMS")
+        if final_summary['status'] != 'success':
+            return final_summary
+        
+        final_summary['merge_stats'] = merge_stats
+        
+        # Each file records how many SMS it contributed to the merged stream
+        for xml_file in pending_files:
+            file_tracker.mark_file_processed(
+                xml_file,
+                merge_stats['records_read'].get(str(xml_file), 0),
+                'SUCCESS'
+            )
+        
+        _log_pipeline_completion(final_summary)
+        
+        return final_summary
+        
+    except Exception as e:
+        logger.error(f"Merged ETL pipeline failed: {e}")
+        
+        for xml_file in pending_files:
+            file_tracker.mark_file_processed(xml_file, 0, 'FAILED', str(e))
+        
+        return {
+            'status': 'error',
+            'message': str(e),
+            'duration_seconds': (datetime.now() - start_time).total_seconds(),
+            'start_time': start_time.isoformat(),
+            'end_time': datetime.now().isoformat()
+        }
+
+def replay_dead_letters(export_json: bool = True) -> dict:
+    """
+    Re-parse and load only the SMS held in the dead-letter spool.
+    
+    Segments are replayed oldest first. SMS that fail again go to a new
+    segment, and a replayed segment is deleted only after its batch has
+    been committed and the SMS that failed again have been flushed to the
+    new segment, so an interrupted replay can simply be run again. Segments
+    that running pipelines are still writing are left for a later replay.
+    
+    Returns:
+        Summary with the number of segments, SMS, loaded and re-failed records
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    
+    # Segments written during this replay must not be picked up again; they
+    # stay open until it ends anyway
+    segments = DeadLetterSpool().segments()
+    if not segments:
+        logger.info("Dead-letter spool is empty, nothing to replay")
+        return {'status': 'skipped', 'message': 'Dead-letter spool is empty'}
+    
+    logger.info(f"Replaying {len(segments)} dead-letter segments with parser {PARSER_VERSION}")
+    parser = MTNParser()
+    replayed = 0
+    loaded = 0
+    
+    with DeadLetterSpool() as dead_letter, DeadLetterSpool(prefix=REJECT_PREFIX) as rejects, \
+            MySQLDatabaseLoader(dead_letter=dead_letter) as db_loader:
+        for segment in segments:
+            records = [
+                SmsRecord(
+                    address=entry.get('address', ''),
+                    date=entry.get('sms_date') or '',
+                    body=entry.get('body', ''),
+                    readable_date=entry.get('timestamp') or ''
+                )
+                for entry in read_segment(segment)
+            ]
+            
+            transactions = parse_sms_records(records, parser, dead_letter=dead_letter,
+                                             source=f"replay:{segment.name}")
+            transactions, _ = validate_transactions(transactions, rejects, f"replay:{segment.name}")
+            if transactions:
+                loading_summary = db_loader.load_transactions(convert_to_database_format(transactions))
+                loaded += loading_summary['successfully_loaded']
+            
+            # What failed again must be on disk before its only other copy goes
+            dead_letter.flush()
+            rejects.flush()
+            segment.unlink()
+            replayed += len(records)
+            logger.info(f"Replayed {segment.name}: {len(records)} SMS, {len(transactions)} parsed")
+        
+        if export_json and loaded:
+            db_loader.export_dashboard_json()
+    
+    duration = (datetime.now() - start_time).total_seconds()
+    logger.info(f"Dead-letter replay finished in {duration:.2f}s: {replayed} SMS, "
+                f"{loaded} loaded, {dead_letter.written} still failing")
+    
+    return {
+        'status': 'success',
+        'duration_seconds': duration,
+        'segments': len(segments),
+        'replayed': replayed,
+        'final_loaded': loaded,
+        'dead_lettered': dead_letter.written
+    }
+
+def run_sampled_analysis(records: Iterable[SmsRecord], sample_size: Optional[int] = None,
+                         sample_rate: Optional[float] = None, seed: Optional[int] = None) -> dict:
+    """
+    Estimate type, category and direction distributions from a random sample.
+    
+    Every SMS is still read and prefiltered, but only a uniform sample of the
+    MoMo SMS is parsed: a reservoir of sample_size SMS, or each SMS with
+    probability sample_rate. SMS in the sample the parser rejects are
+    counted as UNPARSED, so shares are of all MoMo SMS.
+    
+    Returns:
+        Counts and, per label, share with 95% confidence interval and the
+        estimated number of MoMo SMS
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    rng = random.Random(seed)
+    counts = {'sms': 0, 'momo': 0}
+    
+    def momo_records():
+        for sms in records:
+            counts['sms'] += 1
+            if is_momo_sms(sms.body, sms.address):
+                counts['momo'] += 1
+                yield sms
+    
+    if sample_size:
+        sample = reservoir_sample(momo_records(), sample_size, rng)
+        method = f"reservoir of {sample_size}"
+    else:
+        sample = list(bernoulli_sample(momo_records(), sample_rate, rng))
+        method = f"Bernoulli at rate {sample_rate}"
+    
+    transactions = parse_sms_records(sample)
+    n = len(sample)
+    population = counts['momo']
+    
+    distributions = {}
+    for name, attribute in (('types', 'transaction_type'), ('categories', 'category'),
+                            ('directions', 'direction')):
+        label_counts = Counter(getattr(transaction, attribute) for transaction in transactions)
+        if n > len(transactions):
+            label_counts['UNPARSED'] = n - len(transactions)
+        distributions[name] = estimate_distribution(label_counts, n, population)
+    
+    duration = (datetime.now() - start_time).total_seconds()
+    logger.info(f"Sampled Analysis Results ({method}, {duration:.2f}s):")
+    logger.info(f"  SMS read: {counts['sms']}, MoMo SMS: {population}, sampled: {n}, parsed: {len(transactions)}")
+    for name, estimates in distributions.items():
+        logger.info(f"  {name.capitalize()} (share of MoMo SMS, 95% CI, estimated count):")
+        for label, estimate in estimates.items():
+            logger.info(f"    {label:<28} {estimate['share']:7.2%} "
+                        f"[{estimate['share_low']:6.2%}, {estimate['share_high']:6.2%}]  "
+                        f"~{estimate['estimated_count']:.0f} "
+                        f"({estimate['estimated_low']:.0f}-{estimate['estimated_high']:.0f})")
+    
+    return {
+        'method': method,
+        'duration_seconds': duration,
+        'sms_read': counts['sms'],
+        'momo_sms': population,
+        'sample_size': n,
+        'parsed': len(transactions),
+        'distributions': distributions,
+        'transactions': transactions
+    }
+
+def _init_worker(log_level: str):
+    """Configure logging in a directory-mode worker process."""
+    # Forked workers inherit a queue handler whose writer thread only
+    # exists in the parent, so every worker starts its own
+    setup_queued_logging(ETL_LOG_FILE, log_level)
+
+def run_directory_pipeline(directory: Path, max_workers: int = ETL_MAX_WORKERS,
+                           export_json: bool = True, parquet: bool = False,
+                           event_log: bool = False) -> dict:
+    """
+    Ingest every pending XML file in a directory concurrently.
+    
+    Each file runs through run_enhanced_etl_pipeline in its own worker process
+    and is marked processed (or failed) on its own, so one bad file does not
+    stop the others.
+    
+    Args:
+        directory: Directory containing XML backups
+        max_workers: Maximum number of files processed at the same time
+        export_json: Whether to export dashboard JSON once all files are done
+        parquet: Also write each file's transactions to month-partitioned Parquet
+        event_log: Also append each file's transactions to the event log
+        
+    Returns:
+        Summary of the directory run with one entry per file
+    """
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    
+    file_tracker = FileTracker()
+    pending_files = file_tracker.get_pending_files(directory, XML_FILE_PATTERN)
+    
+    if not pending_files:
+        logger.info(f"No new or changed files found in {directory}. Skipping...")
+        return {'status': 'skipped', 'message': f'No pending files in {directory}'}
+    
+    workers = max(1, min(max_workers, len(pending_files)))
+    logger.info(f"Found {len(pending_files)} pending files in {directory}, using {workers} workers")
+    
+    file_results = {}
+    log_level = logging.getLevelName(logging.getLogger().getEffectiveLevel())
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(log_level,)) as executor:
+        # Dashboard export is done once at the end instead of once per file
+        futures = {
+            executor.submit(run_enhanced_etl_pipeline, xml_file, False, False, parquet,
+                            event_log): xml_file
+            for xml_file in pending_files
+        }
+        
+        for future in as_completed(futures):
+            xml_file = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                # The worker itself died; ordinary failures are tracked by the pipeline
+                logger.error(f"Worker processing {xml_file.name} crashed: {e}")
+                file_tracker.mark_file_processed(xml_file, 0, 'FAILED', str(e))
+                summary = {'status': 'error', 'message': str(e)}
+            
+            file_results[str(xml_file)] = summary
+            logger.info(f"{xml_file.name}: {summary['status']} "
+                        f"({summary.get('final_loaded', 0)} loaded)")
+    
+    succeeded = [name for name, result in file_results.items() if result['status'] == 'success']
+    failed = [name for name, result in file_results.items() if result['status'] == 'error']
+    
+    if export_json and succeeded:
+        try:
+            with MySQLDatabaseLoader() as db_loader:
+                db_loader.export_dashboard_json()
+        except Exception as e:
+            logger.error(f"Error exporting dashboard data: {e}")
+    
+    if not failed:
+        status = 'success'
+    elif succeeded:
+        status = 'partial'
+    else:
+        status = 'error'
+    
+    end_time = datetime.now()
+    duration = (end_time - start_time).total_seconds()
+    
+    logger.info("=" * 60)
+    logger.info(f"Directory ingestion finished: {len(succeeded)} succeeded, {len(failed)} failed")
+    logger.info(f"Duration: {duration:.2f} seconds")
+    logger.info("=" * 60)
+    
+    return {
+        'status': status,
+        'message': f"{len(failed)} of {len(file_results)} files failed" if failed else None,
+        'duration_seconds': duration,
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'files': file_results,
+        'final_loaded': sum(result.get('final_loaded', 0) for result in file_results.values())
+    }
+
+def _queue_worker_main(log_level: str):
+    """Entry point of a local work-queue worker process."""
+    from etl.work_queue import QueueWorker
+    
+    _init_worker(log_level)
+    QueueWorker().run()
+
+def run_queue_workers(workers: int = ETL_MAX_WORKERS, export_json: bool = True) -> dict:
+    """
+    Work the lease queue with local worker processes until it is drained.
+    
+    The workers are independent processes rather than a pool, so one that
+    dies only loses its current lease, which expires and is claimed by
+    another worker. Workers on other hosts can drain the same queue at the
+    same time; each process claims its own leases from MySQL.
+    
+    Args:
+        workers: Number of worker processes on this host
+        export_json: Whether to export dashboard JSON once the queue is drained
+        
+    Returns:
+        Summary with the worker exit codes and the lease counts per status
+    """
+    from etl.work_queue import WorkQueue
+    
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    workers = max(1, workers)
+    logger.info(f"Working the lease queue with {workers} workers")
+    
+    log_level = logging.getLevelName(logging.getLogger().getEffectiveLevel())
+    processes = [
+        multiprocessing.Process(target=_queue_worker_main, args=(log_level,), name=f"queue-worker-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        if process.exitcode:
+            logger.error(f"{process.name} exited with code {process.exitcode}")
+    
+    progress = WorkQueue().progress()
+    failed = progress.get('FAILED', {}).get('leases', 0)
+    loaded = progress.get('DONE', {}).get('records_loaded', 0)
+    
+    if export_json and loaded:
+        try:
+            with MySQLDatabaseLoader() as db_loader:
+                db_loader.export_dashboard_json()
+        except Exception as e:
+            logger.error(f"Error exporting dashboard data: {e}")
+    
+    end_time = datetime.now()
+    duration = (end_time - start_time).total_seconds()
+    
+    logger.info("=" * 60)
+    logger.info(f"Lease queue drained: {progress}")
+    logger.info(f"Duration: {duration:.2f} seconds")
+    logger.info("=" * 60)
+    
+    return {
+        'status': 'partial' if failed else 'success',
+        'message': f"{failed} leases failed" if failed else None,
+        'duration_seconds': duration,
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'worker_exit_codes': [process.exitcode for process in processes],
+        'leases': progress,
+        'final_loaded': loaded
+    }
+
+def _raw_parser_main(log_level: str):
+    """Entry point of a local raw-staging parser process."""
+    from etl.raw_staging import RawParseWorker
+    
+    _init_worker(log_level)
+    RawParseWorker().run()
+
+def run_raw_parse_workers(workers: int = ETL_MAX_WORKERS, export_json: bool = True) -> dict:
+    """
+    Parse the SMS staged with --stage-raw with local parser processes.
+    
+    Like run_queue_workers, the parsers are independent processes that
+    claim chunks of staged SMS from MySQL, so parsers on other hosts can
+    share the backlog and a parser that dies only delays its current chunk.
+    They return once nothing has been left to claim for
+    RAW_PARSE_IDLE_SECONDS, which lets them keep up with a stager that is
+    still running.
+    
+    Args:
+        workers: Number of parser processes on this host
+        export_json: Whether to export dashboard JSON once parsing is done
+        
+    Returns:
+        Summary with the parser exit codes and the staged SMS per status
+    """
+    from etl.raw_staging import RawStaging
+    
+    logger = logging.getLogger(__name__)
+    start_time = datetime.now()
+    workers = max(1, workers)
+    logger.info(f"Parsing staged SMS with {workers} parsers")
+    
+    log_level = logging.getLevelName(logging.getLogger().getEffectiveLevel())
+    processes = [
+        multiprocessing.Process(target=_raw_parser_main, args=(log_level,), name=f"raw-parser-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        if process.exitcode:
+            logger.error(f"{process.name} exited with code {process.exitcode}")
+    
+    progress = RawStaging().progress()
+    failed = progress.get('FAILED', 0)
+    
+    if export_json and progress.get('PARSED'):
+        try:
+            with MySQLDatabaseLoader() as db_loader:
+                db_loader.export_dashboard_json()
+        except Exception as e:
+            logger.error(f"Error exporting dashboard data: {e}")
+    
+    end_time = datetime.now()
+    duration = (end_time - start_time).total_seconds()
+    
+    logger.info("=" * 60)
+    logger.info(f"Staged SMS parsed: {progress}")
+    logger.info(f"Duration: {duration:.2f} seconds")
+    logger.info("=" * 60)
+    
+    return {
+        'status': 'partial' if failed else 'success',
+        'message': f"{failed} staged SMS failed" if failed else None,
+        'duration_seconds': duration,
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'worker_exit_codes': [process.exitcode for process in processes],
+        'staged': progress
+    }
+
 def main():
     """Main entry point for enhanced ETL script."""
     parser = argparse.ArgumentParser(description='Enhanced MTN MobileMoney Data ETL Pipeline')
@@ -298,6 +1263,99 @@ def main():
         default=XML_INPUT_FILE,
         help='Path to XML input file'
     )
+    parser.add_argument(
+        '--dir',
+        type=Path,
+        nargs='?',
+        const=RAW_DIR,
+        default=None,
+        help=f'Ingest all new or changed XML files in a directory (default: {RAW_DIR})'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=ETL_MAX_WORKERS,
+        help='Number of files ingested in parallel in directory mode, or of local --work-queue workers'
+    )
+    parser.add_argument(
+        '--merge',
+        type=Path,
+        nargs='+',
+        metavar='XML',
+        help='Merge several overlapping XML backups by SMS date, dropping duplicates'
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Keep running and micro-batch new SMS from the --dir directory (default: raw data dir)'
+    )
+    parser.add_argument(
+        '--flush-interval',
+        type=float,
+        default=DAEMON_FLUSH_INTERVAL,
+        help='Daemon mode: maximum seconds an SMS waits before its batch is loaded'
+    )
+    parser.add_argument(
+        '--batch-records',
+        type=int,
+        default=DAEMON_BATCH_RECORDS,
+        help='Daemon mode: load a batch as soon as it holds this many SMS'
+    )
+    parser.add_argument(
+        '--replay-dead-letters',
+        action='store_true',
+        help='Re-parse and load only the SMS held in the dead-letter spool'
+    )
+    parser.add_argument(
+        '--enqueue',
+        action='store_true',
+        help='Split the --xml file or --dir directory into leases in the shared work queue and exit'
+    )
+    parser.add_argument(
+        '--work-queue',
+        action='store_true',
+        help='Claim and load leases from the shared work queue with --workers processes until it is drained'
+    )
+    parser.add_argument(
+        '--stage-raw',
+        action='store_true',
+        help='Store the MoMo SMS of the --xml file or --dir directory unparsed in raw_sms and exit'
+    )
+    parser.add_argument(
+        '--parse-staged',
+        action='store_true',
+        help='Parse and load SMS stored with --stage-raw using --workers processes'
+    )
+    parser.add_argument(
+        '--latest-first',
+        action='store_true',
+        help='Load the --xml file newest SMS first: recent days are loaded and exported before the older tail'
+    )
+    parser.add_argument(
+        '--sqlite',
+        type=Path,
+        metavar='DB',
+        help='Load new SMS straight from an Android mmssms.db instead of an XML backup'
+    )
+    parser.add_argument(
+        '--order',
+        choices=sorted(SQLITE_ORDERS),
+        default='id',
+        help='Order in which --sqlite reads new SMS (default: id)'
+    )
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Parse the --xml file in N worker processes and load it from the main process'
+    )
+    parser.add_argument(
+        '--transport',
+        choices=['shm', 'pickle'],
+        default=PARSE_TRANSPORT,
+        help=f'How --parse-workers hand rows to the loader (default: {PARSE_TRANSPORT})'
+    )
     parser.add_argument(
         '--no-export', 
         action='store_true',
@@ -309,6 +1367,31 @@ def main():
         default=LOG_LEVEL,
         help='Logging level'
     )
+    parser.add_argument(
+        '--parquet',
+        action='store_true',
+        help='Also write parsed transactions to month-partitioned Parquet under data/processed/parquet'
+    )
+    parser.add_argument(
+        '--event-log',
+        action='store_true',
+        help='Also append parsed transactions to the event log under data/processed/events'
+    )
+    parser.add_argument(
+        '--update-views',
+        action='store_true',
+        help='Apply new event log entries to the derived views and export the dashboard from them'
+    )
+    parser.add_argument(
+        '--rebuild-views',
+        action='store_true',
+        help='Rebuild the derived views by replaying the whole event log'
+    )
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help='Trace allocations per stage and write a report next to the ETL log (slows the run)'
+    )
     parser.add_argument(
         '--dry-run', 
         action='store_true',
@@ -319,27 +1402,181 @@ def main():
         action='store_true',
         help='Analyze message types and show statistics'
     )
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument(
+        '--sample',
+        type=int,
+        metavar='N',
+        help='Analysis mode: parse a uniform reservoir sample of N MoMo SMS and estimate distributions'
+    )
+    sampling.add_argument(
+        '--sample-rate',
+        type=float,
+        metavar='RATE',
+        help='Analysis mode: parse each MoMo SMS with probability RATE and estimate distributions'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='Random seed for --sample/--sample-rate (reproducible estimates)'
+    )
     
     args = parser.parse_args()
     
+    if args.sample is not None and args.sample < 1:
+        parser.error("--sample must be at least 1")
+    if args.sample_rate is not None and not 0 < args.sample_rate <= 1:
+        parser.error("--sample-rate must be in (0, 1]")
+    if (args.sample or args.sample_rate) and not (args.dry_run or args.analyze):
+        parser.error("--sample and --sample-rate only apply to --analyze and --dry-run")
+    
+    # Each of these runs its own pipeline, so only one of them can be given
+    # (--daemon watches the --dir directory)
+    modes = [flag for flag, given in (('--daemon', args.daemon), ('--dir', args.dir is not None and not args.daemon),
+                                      ('--sqlite', args.sqlite is not None), ('--merge', args.merge),
+                                      ('--latest-first', args.latest_first),
+                                      ('--parse-workers', args.parse_workers)) if given]
+    if len(modes) > 1:
+        parser.error(f"{', '.join(modes[:-1])} and {modes[-1]} cannot be combined")
+    # Optional stages the pipeline of a mode does not have
+    missing_stages = {
+        '--daemon': ('--parquet', '--event-log', '--profile-memory'),
+        '--sqlite': ('--profile-memory',),
+        '--latest-first': ('--parquet', '--event-log', '--profile-memory'),
+        '--parse-workers': ('--parquet', '--event-log', '--profile-memory'),
+        '--dir': ('--profile-memory',)
+    }
+    stages = {'--parquet': args.parquet, '--event-log': args.event_log, '--profile-memory': args.profile_memory}
+    mode = modes[0] if modes else None
+    unsupported = [flag for flag in missing_stages.get(mode, ()) if stages[flag]]
+    if unsupported:
+        parser.error(f"{mode} cannot be combined with {', '.join(unsupported)}")
+    
     # Setup logging
     logger = setup_logging(level=args.log_level)
     
     # Validate input file
-    if not args.xml.exists():
+    if (args.daemon or args.replay_dead_letters or args.work_queue or args.parse_staged
+            or args.update_views or args.rebuild_views):
+        pass
+    elif args.dir is not None:
+        if not args.dir.is_dir():
+            logger.error(f"Directory not found: {args.dir}")
+            sys.exit(1)
+    elif args.sqlite is not None:
+        if not args.sqlite.is_file():
+            logger.error(f"SQLite database not found: {args.sqlite}")
+            sys.exit(1)
+    elif args.merge:
+        missing = [str(xml_file) for xml_file in args.merge if not xml_file.exists()]
+        if missing:
+            logger.error(f"XML files not found: {', '.join(missing)}")
+            sys.exit(1)
+    elif not args.xml.exists():
         logger.error(f"XML file not found: {args.xml}")
         sys.exit(1)
     
     try:
-        if args.dry_run or args.analyze:
+        if args.daemon:
+            from etl.daemon import IngestDaemon
+            
+            daemon = IngestDaemon(
+                watch_dir=args.dir or RAW_DIR,
+                flush_interval=args.flush_interval,
+                batch_records=args.batch_records,
+                export_json=not args.no_export
+            )
+            daemon.run()
+            sys.exit(0)
+        elif args.enqueue:
+            from etl.work_queue import WorkQueue
+            
+            queue = WorkQueue()
+            if args.dir is not None:
+                created = queue.enqueue_directory(args.dir)
+            else:
+                created = queue.enqueue_file(args.xml)
+            logger.info(f"Created {created} leases")
+            sys.exit(0)
+        elif args.stage_raw:
+            from etl.raw_staging import RawStaging
+            
+            staging = RawStaging()
+            if args.dir is not None:
+                staged = staging.stage_directory(args.dir)
+            else:
+                staged = staging.stage_file(args.xml)
+            logger.info(f"Staged {staged} SMS")
+            sys.exit(0)
+        elif args.parse_staged:
+            summary = run_raw_parse_workers(args.workers, export_json=not args.no_export)
+            
+            if summary['status'] == 'success':
+                logger.info("Staged SMS parsed")
+                sys.exit(0)
+            else:
+                logger.error(f"Staged SMS parsed with errors: {summary['message']}")
+                sys.exit(1)
+        elif args.work_queue:
+            summary = run_queue_workers(args.workers, export_json=not args.no_export)
+            
+            if summary['status'] == 'success':
+                logger.info("Work queue drained")
+                sys.exit(0)
+            else:
+                logger.error(f"Work queue drained with errors: {summary['message']}")
+                sys.exit(1)
+        elif args.update_views or args.rebuild_views:
+            update_event_views(rebuild=args.rebuild_views, export_json=not args.no_export)
+            sys.exit(0)
+        elif args.replay_dead_letters:
+            summary = replay_dead_letters(export_json=not args.no_export)
+            logger.info(f"Dead-letter replay {summary['status']}")
+            sys.exit(0)
+        elif args.dir is not None:
+            summary = run_directory_pipeline(args.dir, args.workers, export_json=not args.no_export,
+                                             parquet=args.parquet, event_log=args.event_log)
+            
+            if summary['status'] in ('success', 'skipped'):
+                logger.info(f"Directory ingestion {summary['status']}")
+                sys.exit(0)
+            else:
+                logger.error(f"Directory ingestion {summary['status']}: {summary.get('message')}")
+                sys.exit(1)
+        elif (args.dry_run or args.analyze) and (args.sample or args.sample_rate):
+            if args.sqlite is not None:
+                records = iter_sqlite_sms(args.sqlite, order=args.order)
+            else:
+                records = merge_sms_sources(args.merge) if args.merge else iter_xml_sms(args.xml)
+            result = run_sampled_analysis(records, args.sample, args.sample_rate, args.seed)
+            
+            if args.analyze:
+                logger.info("\nRandom sample transactions:")
+                for i, transaction in enumerate(result['transactions'][:5]):
+                    logger.info(f"  {i+1}. {transaction.transaction_type} - {transaction.category} - {transaction.amount} RWF")
+        elif args.dry_run or args.analyze:
             logger.info("Running in analysis mode...")
             # Parse and analyze without loading to database
-            parsed_transactions = parse_xml_with_parser(args.xml)
+            if args.sqlite is not None:
+                parsed_transactions = parse_sms_records(iter_sqlite_sms(args.sqlite, order=args.order))
+            elif args.merge:
+                parsed_transactions = parse_sms_records(merge_sms_sources(args.merge))
+            else:
+                parsed_transactions = parse_xml_with_parser(args.xml)
             
             if not parsed_transactions:
                 logger.warning("No transactions found")
                 sys.exit(0)
             
+            if args.sqlite is not None:
+                source = args.sqlite.name
+            else:
+                source = '+'.join(f.name for f in args.merge) if args.merge else args.xml.name
+            if args.parquet:
+                _write_parquet_stage(parsed_transactions, source, 0)
+            if args.event_log:
+                _append_events_stage(parsed_transactions, source)
+            
             # Analyze transaction types
             type_stats = {}
             category_stats = {}
@@ -350,7 +1587,7 @@ def main():
                 category_stats[transaction.category] = category_stats.get(transaction.category, 0) + 1
                 direction_stats[transaction.direction] = direction_stats.get(transaction.direction, 0) + 1
             
-            logger.info(f"Analysis Results:")
+            logger.info("Analysis Results:")
             logger.info(f"  Total transactions: {len(parsed_transactions)}")
             logger.info(f"  Transaction types: {type_stats}")
             logger.info(f"  Categories: {category_stats}")
@@ -370,7 +1607,22 @@ def main():
                     logger.info("")
         else:
             # Run full enhanced ETL pipeline
-            summary = run_enhanced_etl_pipeline(args.xml, export_json=not args.no_export)
+            if args.sqlite is not None:
+                summary = run_sqlite_pipeline(args.sqlite, export_json=not args.no_export, order=args.order,
+                                              parquet=args.parquet, event_log=args.event_log)
+            elif args.merge:
+                summary = run_merged_etl_pipeline(args.merge, export_json=not args.no_export,
+                                                  profile_memory=args.profile_memory,
+                                                  parquet=args.parquet, event_log=args.event_log)
+            elif args.latest_first:
+                summary = run_latest_first_pipeline(args.xml, export_json=not args.no_export)
+            elif args.parse_workers:
+                summary = run_parallel_parse_pipeline(args.xml, args.parse_workers,
+                                                      export_json=not args.no_export, transport=args.transport)
+            else:
+                summary = run_enhanced_etl_pipeline(args.xml, export_json=not args.no_export,
+                                                    profile_memory=args.profile_memory,
+                                                    parquet=args.parquet, event_log=args.event_log)
             
             if summary['status'] == 'success':
                 logger.info("Enhanced ETL pipeline completed successfully")
@@ -0,0 +1,126 @@
+"""
+Streaming Sampling
+Reservoir and Bernoulli sampling with confidence intervals for quick analysis of huge backups
+"""
+
+import math
+import random
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+def _uniform(rng: random.Random) -> float:
+    """Uniform random number in the open interval (0, 1)."""
+    value = rng.random()
+    while value == 0.0:
+        value = rng.random()
+    return value
+
+
+def reservoir_sample(items: Iterable[T], k: int, rng: Optional[random.Random] = None) -> List[T]:
+    """
+    Uniform random sample of k items from a stream of unknown length (Algorithm L).
+
+    Only k items are kept in memory. Instead of drawing a random number per
+    item, the number of items to skip before the next replacement is drawn
+    directly, so the cost per skipped item is one loop iteration.
+    """
+    if k <= 0:
+        return []
+    rng = rng or random.Random()
+    iterator = iter(items)
+    reservoir: List[T] = []
+
+    for item in iterator:
+        reservoir.append(item)
+        if len(reservoir) == k:
+            break
+    if len(reservoir) < k:
+        return reservoir
+
+    w = math.exp(math.log(_uniform(rng)) / k)
+    while True:
+        skip = math.floor(math.log(_uniform(rng)) / math.log(1 - w))
+        try:
+            for _ in range(skip):
+                next(iterator)
+            item = next(iterator)
+        except StopIteration:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(_uniform(rng)) / k)
+
+
+def bernoulli_sample(items: Iterable[T], rate: float, rng: Optional[random.Random] = None) -> Iterator[T]:
+    """Yield each item independently with probability rate."""
+    rng = rng or random.Random()
+    if rate >= 1:
+        yield from items
+        return
+    if rate <= 0:
+        return
+
+    # Geometric gaps between selected items, one random number per selection
+    log_keep = math.log(1 - rate)
+    skip = math.floor(math.log(_uniform(rng)) / log_keep)
+    for item in items:
+        if skip:
+            skip -= 1
+            continue
+        yield item
+        skip = math.floor(math.log(_uniform(rng)) / log_keep)
+
+
+def wilson_interval(successes: int, n: int, population: Optional[int] = None,
+                    z: float = Z_95) -> Tuple[float, float]:
+    """
+    Wilson score interval for a proportion.
+
+    When the population size is known (sampling without replacement), the
+    finite population correction is applied through the effective sample
+    size, so a sample of the whole population gives a zero-width interval.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    p = successes / n
+
+    if population is not None:
+        if n >= population:
+            return p, p
+        if population > 1:
+            n = n * (population - 1) / (population - n)
+
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def estimate_distribution(counts: Counter, n: int, population: int) -> Dict[str, Dict[str, float]]:
+    """
+    Estimate population shares and counts from sample counts.
+
+    Given its size, a Bernoulli sample is a simple random sample too, so the
+    same interval applies to both samplers. Returns, per label, the sample
+    share with its 95% Wilson interval and the implied number of items in
+    the population.
+    """
+    estimates = {}
+    for label, count in counts.most_common():
+        low, high = wilson_interval(count, n, population)
+        share = count / n if n else 0.0
+        estimates[label] = {
+            'sample_count': count,
+            'share': share,
+            'share_low': low,
+            'share_high': high,
+            'estimated_count': share * population,
+            'estimated_low': low * population,
+            'estimated_high': high * population
+        }
+    return estimates
@@ -0,0 +1,243 @@
+"""
+Shared-Memory Batch Transport
+Columnar handoff of converted transactions from parse workers to the loading process
+"""
+
+import functools
+import logging
+import math
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .loader import TransactionRow
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width columns; None is stored as NaN (floats) or -1 (sms_index)
+FLOAT_FIELDS = ('amount', 'confidence', 'fee', 'new_balance')
+INT_FIELDS = ('sms_index',)
+# Everything else except processed_at, which is shared by the whole batch.
+# String columns hold codes into one table of the distinct strings of the
+# batch (-1 for None); tags are joined with TAG_SEPARATOR
+STRING_FIELDS = tuple(name for name in TransactionRow._fields
+                      if name not in FLOAT_FIELDS + INT_FIELDS + ('processed_at',))
+TAG_SEPARATOR = '\x1f'
+
+
+class SharedBatchHandle(NamedTuple):
+    """What crosses the process boundary: the segment name and enough to lay it out."""
+    name: str
+    count: int
+    strings: int
+    heap_bytes: int
+    processed_at: str
+
+
+class _Layout:
+    """Byte offsets of the arrays of a batch; every array is aligned to its item size."""
+
+    def __init__(self, count: int, strings: int, heap_bytes: int):
+        self.count = count
+        self.strings = strings
+        self.floats = 0
+        self.ints = self.floats + len(FLOAT_FIELDS) * count * 8
+        self.offsets = self.ints + len(INT_FIELDS) * count * 8
+        self.codes = self.offsets + (strings + 1) * 8
+        self.heap = self.codes + len(STRING_FIELDS) * count * 4
+        self.size = self.heap + heap_bytes
+
+    def views(self, buf):
+        """numpy views over a segment buffer: floats, ints, string offsets, string codes."""
+        n = self.count
+        return (
+            np.ndarray((len(FLOAT_FIELDS), n), np.float64, buf, self.floats),
+            np.ndarray((len(INT_FIELDS), n), np.int64, buf, self.ints),
+            np.ndarray((self.strings + 1,), np.int64, buf, self.offsets),
+            np.ndarray((len(STRING_FIELDS), n), np.int32, buf, self.codes)
+        )
+
+
+def _numbers(values: Sequence, missing: float, dtype) -> np.ndarray:
+    if None in values:
+        values = [missing if value is None else value for value in values]
+    return np.array(values, dtype=dtype)
+
+
+def write_shared_batch(rows: Sequence[TransactionRow]) -> SharedBatchHandle:
+    """
+    Copy rows into a new shared memory segment and return its handle.
+
+    The segment outlives this process; whoever receives the handle owns it
+    and must close it with unlink (SharedBatch does this).
+    """
+    count = len(rows)
+    columns = dict(zip(TransactionRow._fields, zip(*rows))) if rows else {}
+    if 'tags' in columns:
+        columns['tags'] = [TAG_SEPARATOR.join(tags) if tags is not None else None for tags in columns['tags']]
+
+    # Categories, phone numbers and names repeat a lot, so each distinct
+    # string is stored once and columns only hold its position
+    table = {}
+    codes = np.empty((len(STRING_FIELDS), count), dtype=np.int32)
+    for i, field in enumerate(STRING_FIELDS):
+        codes[i] = [-1 if value is None else table.setdefault(value, len(table))
+                    for value in columns.get(field, ())]
+    strings = list(table)
+    text = ''.join(strings)
+    if text.isascii():
+        # One encode for the whole table; byte lengths equal character lengths
+        heap, lengths = text.encode('ascii'), list(map(len, strings))
+    else:
+        encoded = [value.encode('utf-8') for value in strings]
+        heap, lengths = b''.join(encoded), list(map(len, encoded))
+
+    layout = _Layout(count, len(strings), len(heap))
+    segment = shared_memory.SharedMemory(create=True, size=max(1, layout.size))
+    try:
+        floats, ints, offsets, code_view = layout.views(segment.buf)
+        for i, field in enumerate(FLOAT_FIELDS):
+            floats[i] = _numbers(columns.get(field, ()), math.nan, np.float64)
+        for i, field in enumerate(INT_FIELDS):
+            ints[i] = _numbers(columns.get(field, ()), -1, np.int64)
+        offsets[0] = 0
+        np.cumsum(lengths, out=offsets[1:])
+        code_view[:] = codes
+        segment.buf[layout.heap:layout.size] = heap
+        del floats, ints, offsets, code_view
+        handle = SharedBatchHandle(segment.name, count, len(strings), len(heap),
+                                   rows[0].processed_at if rows else '')
+    except BaseException:
+        segment.close()
+        segment.unlink()
+        raise
+    # The reader unlinks the segment, so this process's resource tracker must
+    # not remove it when the worker exits before the batch is read
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    segment.close()
+    return handle
+
+
+class SharedBatch:
+    """
+    Read side of a shared batch.
+
+    Numeric columns are numpy views straight into the segment and the
+    string table is decoded from the heap in place, so nothing is copied or
+    unpickled on the way in. Closing releases the views and unlinks the
+    segment.
+    """
+
+    def __init__(self, handle: SharedBatchHandle):
+        self.handle = handle
+        self._segment = shared_memory.SharedMemory(name=handle.name)
+        self._layout = _Layout(handle.count, handle.strings, handle.heap_bytes)
+        self._floats, self._ints, self._offsets, self._codes = self._layout.views(self._segment.buf)
+        self._table = None
+
+    def __len__(self) -> int:
+        return self.handle.count
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the batch in shared memory."""
+        return self._layout.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def column(self, field: str) -> np.ndarray:
+        """Writable view of a numeric column (NaN or -1 where the value is None)."""
+        if field in FLOAT_FIELDS:
+            return self._floats[FLOAT_FIELDS.index(field)]
+        return self._ints[INT_FIELDS.index(field)]
+
+    def _string_table(self) -> List[Optional[str]]:
+        """Distinct strings of the batch, with None last so that code -1 maps to it."""
+        if self._table is None:
+            bounds = self._offsets.tolist()
+            heap = self._segment.buf[self._layout.heap:self._layout.size]
+            try:
+                # An ASCII heap is decoded once and sliced; offsets are then character offsets
+                text = str(heap, 'ascii')
+                self._table = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+            except UnicodeDecodeError:
+                self._table = [str(heap[start:end], 'utf-8') for start, end in zip(bounds, bounds[1:])]
+            finally:
+                heap.release()
+            self._table.append(None)
+        return self._table
+
+    def strings(self, field: str) -> List[Optional[str]]:
+        """Values of one string column (tags as tuples)."""
+        values = list(map(self._string_table().__getitem__, self._codes[STRING_FIELDS.index(field)].tolist()))
+        if field == 'tags':
+            # An empty tuple was stored as the empty string
+            values = [None if value is None else tuple(value.split(TAG_SEPARATOR)) if value else ()
+                      for value in values]
+        return values
+
+    def rows(self) -> List[TransactionRow]:
+        """Rebuild the TransactionRows for the loader."""
+        columns = {field: self.strings(field) for field in STRING_FIELDS}
+        for field in FLOAT_FIELDS:
+            values = self.column(field)
+            columns[field] = values.tolist()
+            missing = np.isnan(values)
+            if missing.any():
+                columns[field] = [None if m else value for value, m in zip(columns[field], missing.tolist())]
+        for field in INT_FIELDS:
+            values = self.column(field)
+            columns[field] = values.tolist()
+            if (values < 0).any():
+                columns[field] = [None if value < 0 else value for value in columns[field]]
+        columns['processed_at'] = [self.handle.processed_at] * self.handle.count
+        make_row = functools.partial(tuple.__new__, TransactionRow)
+        return list(map(make_row, zip(*(columns[field] for field in TransactionRow._fields))))
+
+    def close(self, unlink: bool = True):
+        """Release the segment; unlink removes it for good (the reader owns it)."""
+        if self._segment is None:
+            return
+        self._floats = self._ints = self._offsets = self._codes = None
+        self._segment.close()
+        if unlink:
+            self._segment.unlink()
+        self._segment = None
+
+
+def discard_shared_batch(handle: SharedBatchHandle):
+    """Unlink a segment that will never be read, e.g. after a failed load."""
+    try:
+        segment = shared_memory.SharedMemory(name=handle.name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def pack_rows(rows: Sequence[TransactionRow], transport: str = 'shm'):
+    """What a worker returns for rows: a shared batch handle, or the rows themselves to be pickled."""
+    if transport == 'shm':
+        return write_shared_batch(rows)
+    if transport == 'pickle':
+        return list(rows)
+    raise ValueError(f"Unknown transport: {transport}")
+
+
+def unpack_rows(payload) -> List[TransactionRow]:
+    """Rows from what pack_rows returned; a shared batch is unlinked once read."""
+    if isinstance(payload, SharedBatchHandle):
+        with SharedBatch(payload) as batch:
+            return batch.rows()
+    return payload
+
+
+def discard_rows(payload):
+    """Free what pack_rows returned without reading it."""
+    if isinstance(payload, SharedBatchHandle):
+        discard_shared_batch(payload)
@@ -0,0 +1,371 @@
+"""
+SMS Input Sources
+Streams SMS records out of phone backup files
+"""
+
+import heapq
+import logging
+import mmap
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+from array import array
+from contextlib import closing
+from xml.parsers import expat
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SmsRecord(NamedTuple):
+    """A single SMS as read from a backup."""
+    address: str
+    date: str
+    body: str
+    readable_date: str = ''
+
+    @property
+    def timestamp_ms(self) -> int:
+        """SMS `date` attribute as epoch milliseconds (0 if missing or invalid)."""
+        try:
+            return int(self.date)
+        except (TypeError, ValueError):
+            return 0
+
+
+def iter_xml_sms(xml_file: Union[Path, BinaryIO]) -> Iterator[SmsRecord]:
+    """
+    Stream SMS records from an XML backup without building the whole tree.
+
+    xml_file is a path or an open binary file. Elements are cleared as soon
+    as they are read, so memory stays flat regardless of file size.
+    """
+    root = None
+    source = xml_file if hasattr(xml_file, 'read') else str(xml_file)
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+
+        if elem.tag != 'sms':
+            continue
+
+        yield SmsRecord(
+            address=elem.get('address', ''),
+            date=elem.get('date', ''),
+            body=elem.get('body', ''),
+            readable_date=elem.get('readable_date', '')
+        )
+
+        # Drop everything read so far
+        elem.clear()
+        root.clear()
+
+
+def iter_xml_sms_chunks(chunks: Iterable[bytes]) -> Iterator[SmsRecord]:
+    """
+    Stream SMS records from XML arriving in arbitrary byte chunks.
+
+    Chunks may split elements anywhere, as when reading from a socket; each
+    record is yielded as soon as its element is complete.
+    """
+    pull = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+
+    def drain():
+        nonlocal root
+        for event, elem in pull.read_events():
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag != 'sms':
+                continue
+            yield SmsRecord(
+                address=elem.get('address', ''),
+                date=elem.get('date', ''),
+                body=elem.get('body', ''),
+                readable_date=elem.get('readable_date', '')
+            )
+            elem.clear()
+            root.clear()
+
+    for chunk in chunks:
+        pull.feed(chunk)
+        yield from drain()
+    pull.close()
+    yield from drain()
+
+
+# '<' cannot appear unescaped inside attribute values, so this only matches tags
+_SMS_TAG = re.compile(rb'<sms[\s/>]')
+_READ_CHUNK = 1024 * 1024
+
+
+class _RangeEnd(Exception):
+    """Raised from the expat handler once an SMS starts past the byte range."""
+
+
+def iter_xml_sms_range(xml_file: Path, start: int, end: int) -> Iterator[SmsRecord]:
+    """
+    Stream the SMS records whose <sms> tag starts in the byte range [start, end).
+
+    Scanning begins at the first <sms> tag at or after start, so consecutive
+    ranges of one file yield every SMS exactly once wherever the boundaries
+    fall. The SMS that starts last in the range is read to its end even when
+    that lies past end.
+    """
+    with open(xml_file, 'rb') as f:
+        f.seek(start)
+        position = start
+        tail = b''
+        while True:
+            chunk = f.read(_READ_CHUNK)
+            if not chunk:
+                return
+            data = tail + chunk
+            match = _SMS_TAG.search(data)
+            if match:
+                position += match.start() - len(tail)
+                break
+            # Keep enough of the chunk to match a tag split across reads
+            tail = data[-4:]
+            position += len(chunk)
+            if position >= end:
+                return
+
+        if position >= end:
+            return
+        data = data[match.start():]
+
+        # Parse the remainder as the children of a synthetic root element
+        prefix = b'<smses>'
+        records: List[SmsRecord] = []
+
+        def start_element(name, attrs):
+            if name != 'sms':
+                return
+            if parser.CurrentByteIndex - len(prefix) + position >= end:
+                raise _RangeEnd
+            records.append(SmsRecord(
+                address=attrs.get('address', ''),
+                date=attrs.get('date', ''),
+                body=attrs.get('body', ''),
+                readable_date=attrs.get('readable_date', '')
+            ))
+
+        parser = expat.ParserCreate('utf-8')
+        parser.StartElementHandler = start_element
+        try:
+            parser.Parse(prefix)
+            while data:
+                parser.Parse(data)
+                yield from records
+                records.clear()
+                data = f.read(_READ_CHUNK)
+        except _RangeEnd:
+            pass
+        except expat.ExpatError as e:
+            # The closing tag of the real root element also closes the
+            # synthetic one; anything after it is not needed
+            if e.code != expat.errors.codes[expat.errors.XML_ERROR_JUNK_AFTER_DOC_ELEMENT]:
+                raise
+        yield from records
+
+
+# An <sms> tag and, if it has one, its date attribute. '<' cannot appear in
+# attribute values, so the lazy scan never runs into the next element.
+_SMS_TAG_DATE = re.compile(rb'<sms[\s/>](?:[^<]*?\sdate="(\d*)")?')
+
+
+class SmsIndex(NamedTuple):
+    """Byte offset and date of every SMS in an XML backup, in file order."""
+    starts: np.ndarray  # offset of each <sms> tag
+    timestamps: np.ndarray  # epoch milliseconds (0 if missing)
+    data_end: int  # offset of the closing root tag
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def latest_first(self) -> np.ndarray:
+        """Index positions from the newest SMS to the oldest (later in the file first on ties)."""
+        return np.lexsort((-self.starts, -self.timestamps))
+
+    def count_since(self, timestamp_ms: int) -> int:
+        """Number of SMS dated at or after timestamp_ms."""
+        return int(np.count_nonzero(self.timestamps >= timestamp_ms))
+
+
+def build_sms_index(xml_file: Path) -> SmsIndex:
+    """
+    Index the SMS of an XML backup by scanning the raw bytes for <sms> tags.
+
+    Nothing is parsed apart from the date attribute, so this costs a fraction
+    of a full read. Each SMS spans from its tag to the next one, which lets
+    iter_xml_sms_at() read them back in any order.
+    """
+    starts = array('q')
+    timestamps = array('q')
+
+    with open(xml_file, 'rb') as f:
+        if not f.seek(0, 2):
+            return SmsIndex(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in _SMS_TAG_DATE.finditer(data):
+                starts.append(match.start())
+                date = match.group(1)
+                timestamps.append(int(date) if date else 0)
+
+            data_end = len(data)
+            if starts:
+                closing = data.rfind(b'</smses', starts[-1])
+                if closing != -1:
+                    data_end = closing
+
+    return SmsIndex(np.frombuffer(starts, dtype=np.int64), np.frombuffer(timestamps, dtype=np.int64),
+                    data_end)
+
+
+def iter_xml_sms_at(xml_file: Path, index: SmsIndex, positions: Iterable[int]) -> Iterator[SmsRecord]:
+    """
+    Stream the SMS at the given index positions, in the order given.
+
+    The file is memory-mapped and every SMS is fed to one expat parser as
+    a child of a synthetic root element, so records can be read in any
+    order without re-scanning the file.
+    """
+    starts = index.starts.tolist()
+    count = len(starts)
+    records: List[SmsRecord] = []
+
+    def start_element(name, attrs):
+        if name == 'sms':
+            records.append(SmsRecord(
+                address=attrs.get('address', ''),
+                date=attrs.get('date', ''),
+                body=attrs.get('body', ''),
+                readable_date=attrs.get('readable_date', '')
+            ))
+
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        parser = expat.ParserCreate('utf-8')
+        parser.StartElementHandler = start_element
+        parser.Parse(b'<smses>')
+        for position in positions:
+            position = int(position)
+            end = starts[position + 1] if position + 1 < count else index.data_end
+            parser.Parse(data[starts[position]:end])
+            yield from records
+            records.clear()
+
+
+def _ordered_stream(records: Iterable[SmsRecord], source: str,
+                    counts: Dict[str, int]) -> Iterator[SmsRecord]:
+    """Pass records through while counting them and checking date order."""
+    last_timestamp = None
+    warned = False
+
+    for record in records:
+        timestamp = record.timestamp_ms
+        if last_timestamp is not None and timestamp < last_timestamp and not warned:
+            logger.warning(f"{source} is not in ascending date order; "
+                           f"merged output and duplicate detection may be incomplete")
+            warned = True
+        last_timestamp = timestamp
+        counts[source] = counts.get(source, 0) + 1
+        yield record
+
+
+def merge_sms_sources(xml_files: List[Path], dedup: bool = True,
+                      stats: Optional[Dict[str, Any]] = None) -> Iterator[SmsRecord]:
+    """
+    K-way merge several XML backups into one stream ordered by SMS date.
+
+    Each backup is streamed and only the head record of every file is kept
+    on the heap. Exact duplicates (same address, date and body) always share
+    a timestamp, so only records of the current timestamp are remembered for
+    deduplication and memory stays bounded.
+
+    Args:
+        xml_files: Backups to merge, each in ascending date order
+        dedup: Whether to drop exact duplicates
+        stats: Optional dict filled with per-file record counts and duplicates dropped
+
+    Yields:
+        SMS records in ascending date order
+    """
+    stats = stats if stats is not None else {}
+    counts = stats.setdefault('records_read', {})
+    stats.setdefault('duplicates_dropped', 0)
+
+    streams = [
+        _ordered_stream(iter_xml_sms(xml_file), str(xml_file), counts)
+        for xml_file in xml_files
+    ]
+
+    current_timestamp = None
+    seen = set()
+
+    for record in heapq.merge(*streams, key=lambda r: r.timestamp_ms):
+        if dedup:
+            timestamp = record.timestamp_ms
+            if timestamp != current_timestamp:
+                current_timestamp = timestamp
+                seen.clear()
+
+            key = (record.address, record.body)
+            if key in seen:
+                stats['duplicates_dropped'] += 1
+                continue
+            seen.add(key)
+
+        yield record
+
+
+SQLITE_ORDERS = {'id': '_id', 'date': 'date, _id'}
+
+
+def _open_sqlite(db_file: Path) -> sqlite3.Connection:
+    # Read-only, so a database pulled from a phone is never modified
+    return sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def sqlite_sms_max_id(db_file: Path) -> int:
+    """Highest `_id` in the `sms` table of an Android SMS database (0 when empty)."""
+    with closing(_open_sqlite(db_file)) as connection:
+        return connection.execute("SELECT COALESCE(MAX(_id), 0) FROM sms").fetchone()[0]
+
+
+def iter_sqlite_sms(db_file: Path, after_id: int = 0, until_id: Optional[int] = None,
+                    order: str = 'id') -> Iterator[SmsRecord]:
+    """
+    Stream SMS records straight from the `sms` table of an Android mmssms.db.
+
+    Only SMS with after_id < _id <= until_id are read, so an incremental run
+    passes the highest _id of the previous run as after_id. Rows come in
+    _id order, or by date with order='date'. SQLite hands the rows over as
+    they are stepped, so memory stays flat however large the table.
+    """
+    if order not in SQLITE_ORDERS:
+        raise ValueError(f"Unknown SMS order: {order}")
+
+    query = "SELECT address, date, body FROM sms WHERE _id > ?"
+    params = [after_id]
+    if until_id is not None:
+        query += " AND _id <= ?"
+        params.append(until_id)
+    query += f" ORDER BY {SQLITE_ORDERS[order]}"
+
+    with closing(_open_sqlite(db_file)) as connection:
+        for address, date, body in connection.execute(query, params):
+            yield SmsRecord(
+                address=address or '',
+                date='' if date is None else str(date),
+                body=body or '',
+                readable_date=''
+            )
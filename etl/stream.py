@@ -0,0 +1,274 @@
+"""
+Streaming Pipeline API
+Generator stages for embedding the ETL in other services: SMS in, transactions out, loads as they go
+"""
+
+import io
+import itertools
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar, Union
+
+from .config import ETL_BATCH_SIZE
+from .dead_letter import DeadLetterSpool
+from .loader import MySQLDatabaseLoader, TransactionRow
+from .metrics import PipelineMetrics
+from .parser import MTNParser, ParsedTransaction, PARSER_VERSION
+from .prefilter import is_momo_sender, is_momo_sms
+from .sources import SmsRecord, iter_sqlite_sms, iter_xml_sms, iter_xml_sms_chunks
+from .validation import validate_transactions
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# A backup or Android SMS database path, XML bytes or file object, an iterable
+# of XML byte chunks (e.g. read from a socket), or an iterable of SmsRecords /
+# SMS attribute dicts
+SmsSource = Union[str, Path, bytes, io.IOBase, Iterable[Any]]
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+
+def _batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Consecutive lists of up to size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, max(1, size)))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_sms(source: SmsSource) -> Iterator[SmsRecord]:
+    """
+    Stream SmsRecords out of any supported source.
+
+    XML is parsed incrementally whatever form it arrives in: chunks are fed
+    to a pull parser as they come, so a record is yielded as soon as its
+    element is complete. Dicts need at least a body; other keys default to
+    empty strings.
+    """
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        yield from iter_sqlite_sms(path) if path.suffix in SQLITE_SUFFIXES else iter_xml_sms(path)
+        return
+    if isinstance(source, (bytes, bytearray)):
+        yield from iter_xml_sms(io.BytesIO(source))
+        return
+    if hasattr(source, 'read'):
+        yield from iter_xml_sms(source)
+        return
+
+    iterator = iter(source)
+    first = next(iterator, None)
+    if first is None:
+        return
+    items = itertools.chain((first,), iterator)
+
+    if isinstance(first, (bytes, bytearray)):
+        yield from iter_xml_sms_chunks(items)
+    elif isinstance(first, SmsRecord):
+        yield from items
+    elif isinstance(first, dict):
+        for item in items:
+            yield SmsRecord(
+                address=item.get('address') or '',
+                date=str(item.get('date') or ''),
+                body=item.get('body') or '',
+                readable_date=item.get('readable_date') or ''
+            )
+    else:
+        raise TypeError(f"Unsupported SMS source item: {type(first).__name__}")
+
+
+def _dead_letter_sms(dead_letter: DeadLetterSpool, sms: SmsRecord, timestamp: Optional[str],
+                     reason: str, source: str, **extra):
+    """Spool one SMS that did not make it through parsing."""
+    dead_letter.write('parse', reason, body=sms.body, timestamp=timestamp or sms.readable_date,
+                      address=sms.address, parser_version=PARSER_VERSION, source=source,
+                      sms_date=sms.date, **extra)
+
+
+def iter_parse(source: SmsSource, parser: Optional[MTNParser] = None,
+               start_index: int = 0, dead_letter: Optional[DeadLetterSpool] = None,
+               source_name: str = '', metrics: Optional[PipelineMetrics] = None,
+               first_index: int = 0, stats: Optional[Dict[str, int]] = None) -> Iterator[ParsedTransaction]:
+    """
+    Filter and parse SMS, yielding each transaction as soon as it is parsed.
+
+    SMS before start_index (a resume checkpoint) are skipped without parsing.
+    Each transaction remembers the position of its SMS in sms_index; the
+    first SMS is at first_index when the source is part of a longer stream.
+    MoMo SMS the parser cannot handle are written to dead_letter when given:
+    extraction failures always, unrecognised message types only when they
+    come from a MoMo sender (keyword matches from other senders are noise).
+
+    When metrics is given, time is split into read, filter and parse
+    stages; time the consumer spends between transactions counts as read.
+    stats, when given, is filled with the total, filtered, MoMo and parsed
+    SMS counts.
+    """
+    parser = parser or MTNParser()
+    stats = stats if stats is not None else {}
+    for key in ('total_sms', 'filtered_sms', 'momo_sms', 'parsed'):
+        stats.setdefault(key, 0)
+    lap = metrics.lap if metrics else None
+    if metrics:
+        metrics.start_laps()
+
+    try:
+        for i, sms in enumerate(iter_sms(source), start=first_index):
+            if lap:
+                lap('read')
+            stats['total_sms'] += 1
+            if i < start_index:
+                continue
+            try:
+                # Skip if not a MoMo SMS
+                stats['filtered_sms'] += 1
+                is_momo = is_momo_sms(sms.body, sms.address)
+                if lap:
+                    lap('filter')
+                if not is_momo:
+                    continue
+                stats['momo_sms'] += 1
+
+                # Parse timestamp
+                timestamp = None
+                if sms.date:
+                    try:
+                        timestamp = datetime.fromtimestamp(int(sms.date) / 1000).isoformat()
+                    except (ValueError, OverflowError, OSError):
+                        pass
+                elif sms.readable_date:
+                    timestamp = sms.readable_date
+
+                # Parse message with enhanced parser
+                errors_before = parser.error_count
+                transaction = parser.parse_message(sms.body, timestamp)
+                if lap:
+                    lap('parse')
+                if transaction:
+                    transaction.sms_index = i
+                    transaction.address = sms.address or None
+                    transaction.sms_date = sms.date or None
+                    stats['parsed'] += 1
+                    yield transaction
+                elif dead_letter is not None:
+                    if parser.error_count > errors_before:
+                        _dead_letter_sms(dead_letter, sms, timestamp, 'extraction_failed', source_name,
+                                         error=parser.errors[-1] if parser.errors else '')
+                    elif is_momo_sender(sms.address):
+                        _dead_letter_sms(dead_letter, sms, timestamp, 'unknown_type', source_name)
+
+            except Exception as e:
+                logger.error(f"Error processing SMS {i}: {e}")
+                if dead_letter is not None:
+                    _dead_letter_sms(dead_letter, sms, None, 'exception', source_name, error=str(e))
+                continue
+    finally:
+        if metrics:
+            metrics.finish_laps({'read': stats['total_sms'], 'filter': stats['filtered_sms'],
+                                 'parse': stats['momo_sms']})
+
+
+def iter_validate(transactions: Iterable[ParsedTransaction], rejects: Optional[DeadLetterSpool] = None,
+                  source_name: str = '', batch_size: int = ETL_BATCH_SIZE) -> Iterator[ParsedTransaction]:
+    """Yield the transactions that pass validation, checked batch_size at a time."""
+    for batch in _batched(transactions, batch_size):
+        valid, _ = validate_transactions(batch, rejects, source_name)
+        yield from valid
+
+
+def convert_to_database_format(transactions: List[ParsedTransaction],
+                               processed_at: Optional[str] = None) -> List[TransactionRow]:
+    """
+    Convert ParsedTransaction objects to rows for the database loader.
+
+    All rows of one call share a single processed_at timestamp.
+    """
+    processed_at = processed_at or datetime.now().isoformat()
+
+    return [
+        TransactionRow(
+            transaction.amount,
+            transaction.currency,
+            transaction.date,
+            transaction.transaction_type,
+            transaction.category,
+            transaction.direction,
+            transaction.confidence,
+            transaction.sender_name,
+            transaction.sender_phone,
+            transaction.recipient_name,
+            transaction.recipient_phone,
+            transaction.momo_code,
+            transaction.sender_momo_id,
+            transaction.agent_momo_number,
+            transaction.business_name,
+            transaction.fee,
+            transaction.new_balance,
+            transaction.transaction_id,
+            transaction.financial_transaction_id,
+            transaction.external_transaction_id,
+            transaction.original_message,
+            processed_at,
+            transaction.sms_index,
+            None,
+            transaction.address,
+            transaction.sms_date
+        )
+        for transaction in transactions
+    ]
+
+
+def iter_convert(transactions: Iterable[ParsedTransaction], processed_at: Optional[str] = None,
+                 batch_size: int = ETL_BATCH_SIZE) -> Iterator[TransactionRow]:
+    """Yield loader rows for a stream of transactions; the whole stream shares processed_at."""
+    processed_at = processed_at or datetime.now().isoformat()
+    for batch in _batched(transactions, batch_size):
+        yield from convert_to_database_format(batch, processed_at)
+
+
+def load_stream(rows: Iterable[TransactionRow], batch_size: int = ETL_BATCH_SIZE,
+                loader: Optional[MySQLDatabaseLoader] = None,
+                checkpoint: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Load a stream of rows batch_size at a time, yielding a summary after each commit.
+
+    Rows are pulled from the stream only as each batch is loaded, so the
+    whole pipeline runs in constant memory. Without a loader, one is opened
+    for the stream and closed when it ends. The batches are logged to
+    system_logs as one load when the stream ends, not one row per batch.
+    """
+    own_loader = loader is None
+    loader = loader or MySQLDatabaseLoader()
+    log_loads, loader.log_loads = loader.log_loads, False
+    start = time.perf_counter()
+    loaded_at_start = loader.loaded_count
+    errors_at_start = loader.error_count
+    total_rows = 0
+    try:
+        for number, batch in enumerate(_batched(rows, batch_size), start=1):
+            total_rows += len(batch)
+            loaded_before = loader.loaded_count
+            errors_before = loader.error_count
+            loader.load_transactions(batch, batch_size=batch_size, checkpoint=checkpoint)
+            yield {
+                'batch': number,
+                'rows': len(batch),
+                'loaded': loader.loaded_count - loaded_before,
+                'errors': loader.error_count - errors_before,
+                'total_loaded': loader.loaded_count,
+                'total_errors': loader.error_count,
+                'last_sms_index': batch[-1].sms_index
+            }
+    finally:
+        loader.log_loads = log_loads
+        if total_rows and log_loads:
+            loader.log_load_summary(total_rows, loader.loaded_count - loaded_at_start,
+                                    loader.error_count - errors_at_start, time.perf_counter() - start)
+        if own_loader:
+            loader.close()
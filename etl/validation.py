@@ -0,0 +1,126 @@
+"""
+Transaction Validation
+Batch checks of parsed transactions against the amount, phone and date rules in config
+"""
+
+import logging
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    MIN_AMOUNT, MAX_AMOUNT, PHONE_PATTERNS, MIN_PHONE_LENGTH, MAX_PHONE_LENGTH, DATE_FORMATS
+)
+from .parser import ParsedTransaction, PARSER_VERSION
+from .dead_letter import DeadLetterSpool
+
+logger = logging.getLogger(__name__)
+
+# Rejected transactions are spooled next to the dead letters, but under their
+# own prefix so a dead-letter replay does not pick them up
+REJECT_PREFIX = 'rejected'
+
+_PHONE_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in PHONE_PATTERNS))
+# MoMo masks most digits of the counterparty (*********013)
+_MASKED_PHONE_RE = re.compile(r'^\+?[\d*]+$')
+_PHONE_SEPARATORS = re.compile(r'[\s\-().]')
+
+
+@lru_cache(maxsize=65536)
+def is_valid_phone(phone: Optional[str]) -> bool:
+    """Check a phone number against PHONE_PATTERNS (masked numbers only by length)."""
+    if not phone:
+        return True
+    number = _PHONE_SEPARATORS.sub('', phone)
+    if not MIN_PHONE_LENGTH <= len(number.lstrip('+')) <= MAX_PHONE_LENGTH:
+        return False
+    if '*' in number:
+        return _MASKED_PHONE_RE.match(number) is not None
+    return _PHONE_RE.match(number) is not None
+
+
+def is_valid_date(value: Optional[str]) -> bool:
+    """
+    Check that a date is ISO 8601 or matches one of DATE_FORMATS.
+
+    A missing date passes: the loader stores the processing time instead.
+    """
+    if not value:
+        return True
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            datetime.strptime(value, date_format)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+def validate_transactions(transactions: List[ParsedTransaction],
+                          rejects: Optional[DeadLetterSpool] = None,
+                          source: str = '') -> Tuple[List[ParsedTransaction], int]:
+    """
+    Split a batch into valid transactions and rejects.
+
+    Amount bounds are checked on one NumPy array for the whole batch; phone
+    numbers go through one compiled regex and are cached per number. Each
+    reject is written to rejects (when given) with every rule it broke.
+
+    Returns:
+        Valid transactions in their original order, and the number rejected
+    """
+    count = len(transactions)
+    if not count:
+        return [], 0
+
+    amounts = np.fromiter(
+        (np.nan if transaction.amount is None else transaction.amount for transaction in transactions),
+        dtype=np.float64, count=count
+    )
+    missing_amount = np.isnan(amounts)
+    with np.errstate(invalid='ignore'):
+        below_minimum = amounts < MIN_AMOUNT
+        above_maximum = amounts > MAX_AMOUNT
+    bad_sender = np.fromiter((not is_valid_phone(t.sender_phone) for t in transactions),
+                             dtype=bool, count=count)
+    bad_recipient = np.fromiter((not is_valid_phone(t.recipient_phone) for t in transactions),
+                                dtype=bool, count=count)
+    bad_date = np.fromiter((not is_valid_date(t.date) for t in transactions), dtype=bool, count=count)
+
+    checks = (
+        ('missing_amount', missing_amount),
+        ('amount_below_minimum', below_minimum),
+        ('amount_above_maximum', above_maximum),
+        ('invalid_sender_phone', bad_sender),
+        ('invalid_recipient_phone', bad_recipient),
+        ('invalid_date', bad_date)
+    )
+    invalid = np.zeros(count, dtype=bool)
+    for _, failed in checks:
+        invalid |= failed
+
+    rejected = np.flatnonzero(invalid)
+    if not len(rejected):
+        return transactions, 0
+
+    for index in rejected:
+        transaction = transactions[index]
+        reasons = [reason for reason, failed in checks if failed[index]]
+        if rejects is not None:
+            rejects.write('validate', ','.join(reasons), body=transaction.original_message,
+                          timestamp=transaction.date, address=transaction.address or '',
+                          parser_version=PARSER_VERSION, source=source, sms_date=transaction.sms_date,
+                          transaction_type=transaction.transaction_type, amount=transaction.amount,
+                          sender_phone=transaction.sender_phone,
+                          recipient_phone=transaction.recipient_phone)
+
+    logger.warning(f"Rejected {len(rejected)} of {count} transactions that failed validation")
+    return [transactions[index] for index in np.flatnonzero(~invalid)], len(rejected)
@@ -0,0 +1,393 @@
+"""
+Distributed Work Queue
+Splits input files into byte-range leases that ETL workers on any host claim through MySQL
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from api.db import MySQLDatabaseManager
+from .config import (
+    XML_FILE_PATTERN, QUEUE_RANGE_BYTES, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_POLL_INTERVAL
+)
+from .parser import MTNParser
+from .loader import MySQLDatabaseLoader
+from .file_tracker import FileTracker
+from .sources import iter_xml_sms_range
+from .dead_letter import DeadLetterSpool
+from .validation import REJECT_PREFIX, validate_transactions
+
+logger = logging.getLogger(__name__)
+
+
+class Lease(NamedTuple):
+    """A byte range of an input file claimed by one worker."""
+    id: int
+    file_path: str
+    file_hash: str
+    range_start: int
+    range_end: int
+    attempts: int
+
+    @property
+    def name(self) -> str:
+        return f"{Path(self.file_path).name}[{self.range_start}:{self.range_end}]"
+
+
+def default_owner() -> str:
+    """Worker identity stored on claimed leases: host and process id."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    Lease table shared by ETL workers (etl_leases).
+
+    Files are split into fixed-size byte ranges; iter_xml_sms_range assigns
+    every SMS to the range its tag starts in, so the ranges need no
+    alignment. A worker claims one pending range at a time with
+    SELECT ... FOR UPDATE SKIP LOCKED, so concurrent claims never block on
+    or return the same row. A claimed lease expires lease_seconds after the
+    last heartbeat and is then claimed again by any worker; after
+    max_attempts claims it is marked FAILED. All expiry times come from the
+    database clock, so worker clocks do not need to agree.
+    """
+
+    def __init__(self, owner: Optional[str] = None, lease_seconds: int = QUEUE_LEASE_SECONDS,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.db = MySQLDatabaseManager()
+        self.file_tracker = FileTracker()
+        self.owner = owner or default_owner()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def enqueue_file(self, file_path: Path, range_bytes: int = QUEUE_RANGE_BYTES) -> int:
+        """
+        Split a file into leases of range_bytes.
+
+        A file whose current contents are already queued is left alone, so
+        enqueueing is idempotent. Returns the number of leases created.
+        """
+        abs_path = str(file_path.resolve())
+        file_hash = self.file_tracker.calculate_file_hash(file_path)
+        size = file_path.stat().st_size
+        ranges = [
+            (abs_path, file_hash, start, min(start + range_bytes, size))
+            for start in range(0, size, range_bytes)
+        ]
+
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*) FROM etl_leases WHERE file_path = %s AND file_hash = %s
+            """, (abs_path, file_hash))
+            if cursor.fetchone()[0]:
+                cursor.close()
+                logger.info(f"{file_path.name} is already queued")
+                return 0
+
+            cursor.executemany("""
+                INSERT IGNORE INTO etl_leases (file_path, file_hash, range_start, range_end)
+                VALUES (%s, %s, %s, %s)
+            """, ranges)
+            conn.commit()
+            cursor.close()
+
+        logger.info(f"Queued {file_path.name} as {len(ranges)} leases of up to {range_bytes} bytes")
+        return len(ranges)
+
+    def enqueue_directory(self, directory: Path, pattern: str = XML_FILE_PATTERN,
+                          range_bytes: int = QUEUE_RANGE_BYTES) -> int:
+        """Queue every new or changed file in a directory."""
+        return sum(
+            self.enqueue_file(file_path, range_bytes)
+            for file_path in self.file_tracker.get_pending_files(directory, pattern)
+        )
+
+    def claim(self) -> Optional[Lease]:
+        """Claim the oldest pending or expired lease, or return None if there is none."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                while True:
+                    cursor.execute("""
+                        SELECT id, file_path, file_hash, range_start, range_end, attempts
+                        FROM etl_leases
+                        WHERE status = 'PENDING' OR (status = 'LEASED' AND lease_expires_at < NOW())
+                        ORDER BY id
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    """)
+                    row = cursor.fetchone()
+                    if row is None:
+                        conn.rollback()
+                        return None
+
+                    lease = Lease(*row)
+                    if lease.attempts >= self.max_attempts:
+                        # Its last holder died or hung; give up on the range
+                        cursor.execute("""
+                            UPDATE etl_leases
+                            SET status = 'FAILED', owner = NULL, lease_expires_at = NULL,
+                                error_message = %s
+                            WHERE id = %s
+                        """, (f"Lease expired after {lease.attempts} attempts", lease.id))
+                        conn.commit()
+                        logger.error(f"Giving up on {lease.name} after {lease.attempts} attempts")
+                        continue
+
+                    cursor.execute("""
+                        UPDATE etl_leases
+                        SET status = 'LEASED', owner = %s, attempts = attempts + 1,
+                            lease_expires_at = NOW() + INTERVAL %s SECOND, heartbeat_at = NOW()
+                        WHERE id = %s
+                    """, (self.owner, self.lease_seconds, lease.id))
+                    conn.commit()
+                    return lease._replace(attempts=lease.attempts + 1)
+            finally:
+                cursor.close()
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """Extend a lease; False if it expired and another worker took it."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE etl_leases
+                SET lease_expires_at = NOW() + INTERVAL %s SECOND, heartbeat_at = NOW()
+                WHERE id = %s AND owner = %s AND status = 'LEASED'
+            """, (self.lease_seconds, lease.id, self.owner))
+            updated = cursor.rowcount
+            conn.commit()
+
+            if not updated:
+                # Affected rows are 0 when nothing changed within the same second
+                cursor.execute("SELECT owner, status FROM etl_leases WHERE id = %s", (lease.id,))
+                updated = cursor.fetchone() == (self.owner, 'LEASED')
+            cursor.close()
+            return bool(updated)
+
+    def complete(self, lease: Lease, records_loaded: int) -> bool:
+        """
+        Mark a lease done and, if it was the last one of its file, the file processed.
+
+        Returns False if the lease had been taken over by another worker,
+        which will load the same range again (duplicates are skipped by the
+        loader).
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE etl_leases
+                SET status = 'DONE', records_loaded = %s, lease_expires_at = NULL, error_message = NULL
+                WHERE id = %s AND owner = %s AND status = 'LEASED'
+            """, (records_loaded, lease.id, self.owner))
+            completed = cursor.rowcount == 1
+
+            cursor.execute("""
+                SELECT SUM(status <> 'DONE'), SUM(records_loaded) FROM etl_leases
+                WHERE file_path = %s AND file_hash = %s
+            """, (lease.file_path, lease.file_hash))
+            remaining, file_records = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+
+        if not completed:
+            logger.warning(f"Lease {lease.name} was taken over by another worker before it completed")
+        elif not remaining:
+            self.file_tracker.mark_file_processed(Path(lease.file_path), int(file_records or 0), 'SUCCESS')
+            logger.info(f"All leases of {Path(lease.file_path).name} are done")
+        return completed
+
+    def fail(self, lease: Lease, error: str, retry: bool = True):
+        """Release a lease after an error; it is retried until max_attempts."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE etl_leases
+                SET status = IF(%s AND attempts < %s, 'PENDING', 'FAILED'),
+                    owner = NULL, lease_expires_at = NULL, error_message = %s
+                WHERE id = %s AND owner = %s AND status = 'LEASED'
+            """, (retry, self.max_attempts, error[:65535], lease.id, self.owner))
+            conn.commit()
+            cursor.close()
+
+    def has_open_leases(self) -> bool:
+        """True while any lease is pending or held by a worker (which may still expire)."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM etl_leases WHERE status IN ('PENDING', 'LEASED')")
+            count = cursor.fetchone()[0]
+            cursor.close()
+            return count > 0
+
+    def progress(self) -> Dict[str, Dict[str, int]]:
+        """Lease and record counts per status."""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT status, COUNT(*), COALESCE(SUM(records_loaded), 0)
+                FROM etl_leases GROUP BY status
+            """)
+            progress = {
+                status: {'leases': int(leases), 'records_loaded': int(records)}
+                for status, leases, records in cursor.fetchall()
+            }
+            cursor.close()
+            return progress
+
+
+class LeaseHeartbeat:
+    """Background thread that keeps one lease alive while it is processed."""
+
+    def __init__(self, queue: WorkQueue, lease: Lease, interval: Optional[float] = None):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval or max(1.0, queue.lease_seconds / 3)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{lease.id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.lease):
+                    self.lost = True
+                    logger.warning(f"Lost lease {self.lease.name} to another worker")
+                    return
+            except Exception as e:
+                # Keep trying; the lease only expires if the database stays unreachable
+                logger.warning(f"Heartbeat for {self.lease.name} failed: {e}")
+
+
+class QueueWorker:
+    """
+    Claims leases until the queue is drained and loads their SMS.
+
+    The worker keeps polling while other workers still hold leases, so it
+    can take over any of them that expire. Several workers can run on one
+    host or on many; MySQL is the only coordination point.
+    """
+
+    def __init__(self, owner: Optional[str] = None, poll_interval: float = QUEUE_POLL_INTERVAL,
+                 lease_seconds: int = QUEUE_LEASE_SECONDS, max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.queue = WorkQueue(owner, lease_seconds, max_attempts)
+        self.poll_interval = poll_interval
+
+        self.parser = MTNParser()
+        self.dead_letter = DeadLetterSpool()
+        self.rejects = DeadLetterSpool(prefix=REJECT_PREFIX)
+        self.loader = MySQLDatabaseLoader(dead_letter=self.dead_letter)
+        self.file_hashes: Dict[Tuple[str, int, float], str] = {}
+        self.running = False
+
+        self.leases_completed = 0
+        self.leases_failed = 0
+        self.total_loaded = 0
+
+    def stop(self, *args):
+        """Ask the loop to exit after the current lease."""
+        self.running = False
+
+    def run(self) -> Dict[str, Any]:
+        """Work the queue until it is drained or the worker is stopped."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+
+        self.loader.connect()
+        self.running = True
+        logger.info(f"Queue worker {self.queue.owner} started")
+
+        try:
+            while self.running:
+                lease = self.queue.claim()
+                if lease is None:
+                    if not self.queue.has_open_leases():
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+
+                self.process_lease(lease)
+        finally:
+            self.loader.close()
+            self.dead_letter.close()
+            self.rejects.close()
+
+        logger.info(f"Queue worker {self.queue.owner} finished: {self.leases_completed} leases, "
+                    f"{self.leases_failed} failed, {self.total_loaded} transactions loaded")
+        return {
+            'owner': self.queue.owner,
+            'leases_completed': self.leases_completed,
+            'leases_failed': self.leases_failed,
+            'final_loaded': self.total_loaded
+        }
+
+    def _file_hash(self, file_path: Path) -> str:
+        """Hash of a file, computed once per size and mtime rather than once per lease."""
+        stat = file_path.stat()
+        key = (str(file_path), stat.st_size, stat.st_mtime)
+        if key not in self.file_hashes:
+            self.file_hashes[key] = self.queue.file_tracker.calculate_file_hash(file_path)
+        return self.file_hashes[key]
+
+    def process_lease(self, lease: Lease):
+        """Parse and load the SMS of one lease while heartbeating it."""
+        # Imported here because run.py imports this module for the queue modes
+        from etl.run import parse_sms_records, convert_to_database_format
+
+        file_path = Path(lease.file_path)
+        start = time.monotonic()
+
+        try:
+            if self._file_hash(file_path) != lease.file_hash:
+                self.queue.fail(lease, 'File changed since it was queued', retry=False)
+                self.leases_failed += 1
+                logger.error(f"{file_path.name} changed since it was queued, failing {lease.name}")
+                return
+
+            with LeaseHeartbeat(self.queue, lease):
+                transactions = parse_sms_records(
+                    iter_xml_sms_range(file_path, lease.range_start, lease.range_end),
+                    self.parser, dead_letter=self.dead_letter, source=lease.name
+                )
+                transactions, _ = validate_transactions(transactions, self.rejects, lease.name)
+                loaded_before = self.loader.loaded_count
+                if transactions:
+                    self.loader.load_transactions(convert_to_database_format(transactions))
+                loaded = self.loader.loaded_count - loaded_before
+
+            self.dead_letter.flush()
+            self.rejects.flush()
+            self.parser.errors.clear()
+            self.loader.errors.clear()
+
+        except Exception as e:
+            logger.error(f"Lease {lease.name} failed (attempt {lease.attempts}): {e}")
+            self.queue.fail(lease, str(e))
+            self.leases_failed += 1
+            try:
+                self.loader.close()
+                self.loader.connect()
+            except Exception as reconnect_error:
+                logger.error(f"Reconnect failed: {reconnect_error}")
+            return
+
+        if self.queue.complete(lease, loaded):
+            self.leases_completed += 1
+        self.total_loaded += loaded
+        logger.info(f"Lease {lease.name}: {len(transactions)} transactions, {loaded} loaded "
+                    f"in {time.monotonic() - start:.2f}s")
+
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+End-to-end ETL Benchmark
+Generates synthetic SMS backups at several scale factors, runs the enhanced
+ETL pipeline on each against the configured MySQL database and saves the
+per-stage throughput and peak memory as JSON.
+
+Every scale factor runs in a fresh process, so peak RSS is not carried
+over from the previous one. Generated transaction ids depend on the seed,
+so use a scratch database or a new seed to avoid measuring duplicate
+handling instead of inserts.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import quoteattr
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from etl.config import BENCHMARK_DIR
+from etl.metrics import peak_rss_mb
+from etl.parser import PARSER_VERSION
+
+DEFAULT_SCALES = '10k,100k,1M,10M'
+
+# One template per common MoMo message type, plus personal SMS the prefilter drops
+MOMO_TEMPLATES = [
+    "You have received {amount} RWF from {name} (*********{masked}) on your mobile money account at {date}. "
+    "Message from sender: . Your new balance:{balance} RWF. Financial Transaction Id: {tx_id}.",
+    "TxId: {tx_id}. Your payment of {amount} RWF to {name} {code} has been completed at {date}. "
+    "Your new balance: {balance} RWF. Fee was 0 RWF.",
+    "*165*S*{amount} RWF transferred to {name} (2507{phone}) from 36521838 at {date} . "
+    "Fee was: 100 RWF. New balance: {balance} RWF.",
+    "*164*S*Y'ello,A transaction of {amount} RWF by Data Bundle MTN on your MoMo account was successfully "
+    "completed at {date}. Your new balance:{balance} RWF. Fee was 0 RWF. Financial Transaction Id: {tx_id}. "
+    "External Transaction Id: {tx_id}.*EN#",
+    "You Abebe Chala (*********036) have via agent: Agent {name} (2507{phone}), withdrawn {amount} RWF "
+    "from your mobile money account: 36521838 at {date}. Your new balance: {balance} RWF. "
+    "Fee paid: 350 RWF. Financial Transaction Id: {tx_id}.",
+]
+OTHER_TEMPLATES = [
+    "Hi, are we still meeting tomorrow?",
+    "Your airtime balance is low. Dial *131# to buy a bundle.",
+]
+NAMES = ['Jane Smith', 'Samuel Carter', 'Sophia Mugisha', 'Eric Habimana', 'Alex Doe', 'Linda Green']
+OTHER_SMS_SHARE = 0.15
+
+
+def parse_scale(value: str) -> int:
+    """Parse a scale factor such as 10k, 1M or 2500."""
+    multipliers = {'k': 1000, 'm': 1000000}
+    value = value.strip().lower()
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def generate_backup(sms_count: int, output_file: Path, seed: int) -> Path:
+    """
+    Write an SMS Backup & Restore XML file with sms_count messages.
+
+    Transaction ids are unique within a file and derived from the seed, so
+    files generated with different seeds do not collide in the database.
+    """
+    rng = random.Random(seed)
+    timestamp = 1715350000000
+    tx_base = (seed % 900000 + 100000) * 10 ** 8
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\n")
+        f.write(f'<smses count="{sms_count}">\n')
+        lines = []
+        for i in range(sms_count):
+            timestamp += rng.randint(1000, 600000)
+            date = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp / 1000))
+            if rng.random() < OTHER_SMS_SHARE:
+                body = rng.choice(OTHER_TEMPLATES)
+                address = f'+250788{rng.randrange(1000000):06d}'
+            else:
+                body = rng.choice(MOMO_TEMPLATES).format(
+                    amount=rng.randint(1, 500) * 100, balance=rng.randint(1, 900) * 100,
+                    name=rng.choice(NAMES), masked=f'{rng.randrange(1000):03d}',
+                    phone=f'{rng.randrange(10000000):08d}', code=rng.randint(10000, 99999),
+                    date=date, tx_id=tx_base + i
+                )
+                address = 'M-Money'
+            lines.append(f'  <sms protocol="0" address={quoteattr(address)} date="{timestamp}" type="1" '
+                         f'body={quoteattr(body)} readable_date="{date}" contact_name="(Unknown)" />\n')
+            if len(lines) >= 10000:
+                f.writelines(lines)
+                lines.clear()
+        f.writelines(lines)
+        f.write('</smses>\n')
+    return output_file
+
+
+def _run_scale(xml_file: str, export_json: bool, log_level: str) -> Dict[str, Any]:
+    """Run the pipeline on one file (in a child process) and return its measurements."""
+    logging.basicConfig(level=getattr(logging, log_level), format='%(asctime)s - %(levelname)s - %(message)s')
+    from etl.run import run_enhanced_etl_pipeline
+
+    summary = run_enhanced_etl_pipeline(Path(xml_file), export_json=export_json)
+    return {
+        'status': summary.get('status'),
+        'message': summary.get('message'),
+        'duration_seconds': summary.get('duration_seconds'),
+        'transactions': summary.get('total_processed', 0),
+        'loaded': summary.get('final_loaded', 0),
+        'rejected': summary.get('rejected', 0),
+        'dead_lettered': summary.get('dead_lettered', 0),
+        'stage_metrics': summary.get('stage_metrics'),
+        'metrics_table': summary.get('metrics_table'),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent.parent,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(scales: List[int], seed: int, work_dir: Path, export_json: bool = True,
+                  log_level: str = 'WARNING') -> Dict[str, Any]:
+    """Generate and process one backup per scale factor; returns the full results."""
+    results = {
+        'benchmark': 'etl_end_to_end',
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': _git_revision(),
+        'parser_version': PARSER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'seed': seed,
+        'export_json': export_json,
+        'runs': []
+    }
+    spawn = multiprocessing.get_context('spawn')
+
+    for index, sms_count in enumerate(scales):
+        xml_file = work_dir / f'benchmark_{sms_count}_{seed}.xml'
+        print(f"Generating {sms_count:,} SMS -> {xml_file}")
+        started = time.perf_counter()
+        generate_backup(sms_count, xml_file, seed + index)
+        generate_seconds = time.perf_counter() - started
+
+        print(f"Running ETL pipeline on {sms_count:,} SMS...")
+        with spawn.Pool(1) as pool:
+            run = pool.apply(_run_scale, (str(xml_file), export_json, log_level))
+
+        duration = run['duration_seconds'] or 0.0
+        run.update({
+            'scale': sms_count,
+            'file_bytes': xml_file.stat().st_size,
+            'generate_seconds': round(generate_seconds, 3),
+            'sms_per_second': round(sms_count / duration, 1) if duration > 0 else None
+        })
+        results['runs'].append(run)
+
+        if run['metrics_table']:
+            print(run['metrics_table'])
+        if run['status'] != 'success':
+            print(f"Run failed: {run['message']}")
+        xml_file.unlink()
+
+    return results
+
+
+def format_summary(results: Dict[str, Any]) -> str:
+    """Render one line per scale factor."""
+    lines = [
+        f"{'Scale':>12}{'Status':>10}{'Transactions':>14}{'Wall s':>10}{'SMS/s':>12}{'Peak RSS MB':>13}",
+        '-' * 71
+    ]
+    for run in results['runs']:
+        wall = f"{run['duration_seconds']:.2f}" if run['duration_seconds'] is not None else 'n/a'
+        rate = f"{run['sms_per_second']:.0f}" if run['sms_per_second'] else 'n/a'
+        rss = f"{run['peak_rss_mb']:.1f}" if run['peak_rss_mb'] is not None else 'n/a'
+        lines.append(f"{run['scale']:>12,}{run['status']:>10}{run['transactions']:>14,}"
+                     f"{wall:>10}{rate:>12}{rss:>13}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ETL pipeline at several input sizes')
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help=f'Comma-separated SMS counts, k/M suffixes allowed (default: {DEFAULT_SCALES})')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for the generated backups (default: current time, so ids are new)')
+    parser.add_argument('--work-dir', type=Path, default=None,
+                        help='Where to write the generated backups (default: a temporary directory)')
+    parser.add_argument('--output', type=Path, default=None,
+                        help=f'Results JSON file (default: {BENCHMARK_DIR}/etl_benchmark_<timestamp>.json)')
+    parser.add_argument('--no-export', action='store_true', help='Skip the dashboard export stage')
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+
+    scales = [parse_scale(value) for value in args.scales.split(',') if value.strip()]
+    seed = args.seed if args.seed is not None else int(time.time())
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix='etl_benchmark_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        results = run_benchmark(scales, seed, work_dir, export_json=not args.no_export,
+                                log_level=args.log_level)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or BENCHMARK_DIR / f"etl_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(format_summary(results))
+    print(f"Results saved to {output}")
+    return 0 if all(run['status'] == 'success' for run in results['runs']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
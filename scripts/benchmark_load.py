@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Load Path Benchmark
+Compares the rows per second of the loader's insert modes against the
+configured MySQL database: one INSERT per transaction ('row'), one
+multi-row INSERT per ETL_BATCH_SIZE batch ('batch') and LOAD DATA LOCAL
+INFILE with a set-based merge ('bulk', needs local_infile enabled on the
+server).
+
+Rows are parsed and converted before the clock starts, so only loading is
+timed. Every mode loads its own generated backup (seed + mode index), so
+each one inserts new transactions instead of skipping duplicates; use a
+scratch database. The dedup filter is off so every mode does the same work.
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from etl.config import BENCHMARK_DIR, ETL_BATCH_SIZE
+from etl.loader import INSERT_MODES, MySQLDatabaseLoader
+from etl.stream import iter_convert, iter_parse
+from scripts.benchmark_etl import generate_backup, parse_scale
+
+DEFAULT_MODES = 'row,batch,bulk'
+
+
+def run_load_benchmark(sms_count: int, modes: List[str], batch_size: int, seed: int,
+                       work_dir: Path) -> Dict[str, Any]:
+    """Load one generated backup per mode; returns the full results."""
+    results = {
+        'benchmark': 'load_modes',
+        'timestamp': datetime.now().isoformat(),
+        'sms': sms_count,
+        'batch_size': batch_size,
+        'seed': seed,
+        'runs': []
+    }
+
+    for index, mode in enumerate(modes):
+        xml_file = generate_backup(sms_count, work_dir / f'load_{mode}_{sms_count}_{seed + index}.xml', seed + index)
+        rows = list(iter_convert(iter_parse(xml_file)))
+        xml_file.unlink()
+
+        print(f"Loading {len(rows):,} rows with insert mode '{mode}'...")
+        with MySQLDatabaseLoader(use_dedup_filter=False, insert_mode=mode) as loader:
+            started = time.perf_counter()
+            loader.load_transactions(rows, batch_size=batch_size)
+            seconds = time.perf_counter() - started
+
+        run = {
+            'mode': mode,
+            'rows': len(rows),
+            'loaded': loader.loaded_count,
+            'errors': loader.error_count,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(len(rows) / seconds, 1) if seconds > 0 else None
+        }
+        results['runs'].append(run)
+        print(f"{mode:>7}: {seconds:.2f}s, {run['rows_per_second'] or 0:.0f} rows/s")
+
+    return results
+
+
+def format_summary(results: Dict[str, Any]) -> str:
+    """Render one line per mode, with the speedup over the first one."""
+    lines = [f"{'Mode':>8}{'Rows':>12}{'Errors':>8}{'Seconds':>10}{'Rows/s':>12}{'Speedup':>9}", '-' * 59]
+    baseline = results['runs'][0]['rows_per_second'] if results['runs'] else None
+    for run in results['runs']:
+        rate = run['rows_per_second']
+        speedup = f"{rate / baseline:.1f}x" if rate and baseline else 'n/a'
+        lines.append(f"{run['mode']:>8}{run['rows']:>12,}{run['errors']:>8}{run['seconds']:>10.2f}"
+                     f"{rate or 0:>12.0f}{speedup:>9}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the loader insert modes against MySQL')
+    parser.add_argument('--sms', default='100k', help='SMS in each generated backup, k/M suffixes allowed')
+    parser.add_argument('--modes', default=DEFAULT_MODES,
+                        help=f'Comma-separated insert modes, the first is the baseline (default: {DEFAULT_MODES})')
+    parser.add_argument('--batch-size', type=int, default=ETL_BATCH_SIZE, help='Rows per batch and commit')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for the generated backups (default: current time, so ids are new)')
+    parser.add_argument('--output', type=Path, default=None,
+                        help=f'Results JSON file (default: {BENCHMARK_DIR}/load_benchmark_<timestamp>.json)')
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(asctime)s - %(levelname)s - %(message)s')
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in INSERT_MODES]
+    if unknown:
+        parser.error(f"Unknown insert modes: {', '.join(unknown)}")
+    seed = args.seed if args.seed is not None else int(time.time())
+
+    work_dir = Path(tempfile.mkdtemp(prefix='load_benchmark_'))
+    try:
+        results = run_load_benchmark(parse_scale(args.sms), modes, max(1, args.batch_size), seed, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or BENCHMARK_DIR / f"load_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(format_summary(results))
+    print(f"Results saved to {output}")
+    return 0 if all(run['errors'] == 0 for run in results['runs']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
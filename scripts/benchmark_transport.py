@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Parse Worker Transport Benchmark
+Measures what it costs to hand converted transaction batches from a parse
+worker process to the loading process, through shared memory
+(etl/shm_transport.py) and through plain pickling of TransactionRows.
+
+A worker parses a generated backup once, then returns slices of its rows
+on request. Every round trip is timed from request to rows in hand, and
+the CPU time of the receiving process is recorded separately, since that
+process also runs the loader. No database is needed.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from etl.config import BENCHMARK_DIR
+from etl.shm_transport import SharedBatch, SharedBatchHandle, pack_rows, unpack_rows
+from scripts.benchmark_etl import generate_backup, parse_scale
+
+TRANSPORTS = ('pickle', 'shm')
+DEFAULT_BATCH_SIZES = '1000,20000'
+
+_worker_rows = []
+
+
+def _load_rows(xml_file: str):
+    """Parse and convert the backup once per worker process."""
+    global _worker_rows
+    logging.basicConfig(level=logging.WARNING)
+    from etl.stream import iter_convert, iter_parse
+    _worker_rows = list(iter_convert(iter_parse(xml_file)))
+
+
+def _row_count() -> int:
+    return len(_worker_rows)
+
+
+def _send_batch(start: int, size: int, transport: str):
+    return pack_rows(_worker_rows[start:start + size], transport)
+
+
+def _payload_bytes(payload) -> tuple:
+    """Rows and the size of what crossed the process boundary."""
+    if isinstance(payload, SharedBatchHandle):
+        with SharedBatch(payload) as batch:
+            return batch.rows(), batch.nbytes
+    return payload, len(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def run_transport_benchmark(sms_count: int, batch_sizes: List[int], repeat: int, seed: int,
+                            work_dir: Path) -> Dict[str, Any]:
+    """Time every transport at every batch size; returns the full results."""
+    xml_file = generate_backup(sms_count, work_dir / f'transport_{sms_count}_{seed}.xml', seed)
+    results = {
+        'benchmark': 'parse_worker_transport',
+        'timestamp': datetime.now().isoformat(),
+        'sms': sms_count,
+        'seed': seed,
+        'repeat': repeat,
+        'runs': []
+    }
+
+    spawn = multiprocessing.get_context('spawn')
+    with spawn.Pool(1, initializer=_load_rows, initargs=(str(xml_file),)) as pool:
+        rows = pool.apply(_row_count)
+        results['rows'] = rows
+        print(f"Worker holds {rows:,} rows from {sms_count:,} SMS")
+
+        for size in batch_sizes:
+            starts = list(range(0, rows, size))
+            reference = None
+            for transport in TRANSPORTS:
+                # One untimed handoff to check the rows and measure the payload
+                batch, nbytes = _payload_bytes(pool.apply(_send_batch, (0, size, transport)))
+                reference = reference if reference is not None else batch
+                if batch != reference:
+                    raise RuntimeError(f"{transport} returned different rows")
+
+                walls, cpus = [], []
+                for _ in range(repeat):
+                    wall = time.perf_counter()
+                    cpu = time.process_time()
+                    for start in starts:
+                        unpack_rows(pool.apply(_send_batch, (start, size, transport)))
+                    walls.append(time.perf_counter() - wall)
+                    cpus.append(time.process_time() - cpu)
+
+                wall = median(walls)
+                run = {
+                    'transport': transport,
+                    'batch_size': size,
+                    'batches': len(starts),
+                    'wall_seconds': round(wall, 4),
+                    'receiver_cpu_seconds': round(median(cpus), 4),
+                    'rows_per_second': round(rows / wall, 1) if wall > 0 else None,
+                    'bytes_per_batch': nbytes
+                }
+                results['runs'].append(run)
+                print(f"{transport:>7} batch {size:>7,}: {wall:.3f}s wall, "
+                      f"{run['receiver_cpu_seconds']:.3f}s receiver CPU")
+
+    xml_file.unlink()
+    return results
+
+
+def format_summary(results: Dict[str, Any]) -> str:
+    """Render one line per transport and batch size."""
+    lines = [
+        f"{'Transport':>10}{'Batch':>9}{'Wall s':>10}{'Recv CPU s':>12}{'Rows/s':>12}{'Bytes/batch':>13}",
+        '-' * 66
+    ]
+    for run in results['runs']:
+        rate = f"{run['rows_per_second']:.0f}" if run['rows_per_second'] else 'n/a'
+        lines.append(f"{run['transport']:>10}{run['batch_size']:>9,}{run['wall_seconds']:>10.3f}"
+                     f"{run['receiver_cpu_seconds']:>12.3f}{rate:>12}{run['bytes_per_batch']:>13,}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark shared-memory against pickled row handoff')
+    parser.add_argument('--sms', default='100k', help='SMS in the generated backup, k/M suffixes allowed')
+    parser.add_argument('--batch-sizes', default=DEFAULT_BATCH_SIZES,
+                        help=f'Comma-separated rows per handoff (default: {DEFAULT_BATCH_SIZES})')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes per measurement; the median is kept')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', type=Path, default=None,
+                        help=f'Results JSON file (default: {BENCHMARK_DIR}/transport_benchmark_<timestamp>.json)')
+    args = parser.parse_args()
+
+    batch_sizes = [parse_scale(value) for value in args.batch_sizes.split(',') if value.strip()]
+    work_dir = Path(tempfile.mkdtemp(prefix='transport_benchmark_'))
+    try:
+        results = run_transport_benchmark(parse_scale(args.sms), batch_sizes, max(1, args.repeat),
+                                          args.seed, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or BENCHMARK_DIR / f"transport_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(format_summary(results))
+    print(f"Results saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
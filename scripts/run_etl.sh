@@ -41,6 +41,8 @@ show_usage() {
     echo ""
     echo "Options:"
     echo "  -x, --xml FILE     Path to XML input file (default: $DEFAULT_XML_FILE)"
+    echo "  -D, --dir DIR      Ingest all new or changed XML files in DIR"
+    echo "  -w, --workers N    Files ingested in parallel in directory mode"
     echo "  -n, --no-export    Skip dashboard JSON export"
     echo "  -d, --dry-run      Parse and clean data without loading to database"
     echo "  -l, --log-level    Set logging level (DEBUG, INFO, WARNING, ERROR)"
@@ -50,11 +52,14 @@ show_usage() {
     echo "  $0                                    # Run with default XML file"
     echo "  $0 -x data/raw/custom.xml            # Run with custom XML file"
     echo "  $0 -d                                # Dry run (no database loading)"
+    echo "  $0 -D data/raw -w 4                  # Ingest every pending backup, 4 at a time"
     echo "  $0 -n -l DEBUG                       # Skip export, debug logging"
 }
 
 # Default values
 XML_FILE="$DEFAULT_XML_FILE"
+INPUT_DIR=""
+WORKERS=""
 EXPORT_JSON=true
 DRY_RUN=false
 LOG_LEVEL="INFO"
@@ -66,6 +71,14 @@ while [[ $# -gt 0 ]]; do
             XML_FILE="$2"
             shift 2
             ;;
+        -D|--dir)
+            INPUT_DIR="$2"
+            shift 2
+            ;;
+        -w|--workers)
+            WORKERS="$2"
+            shift 2
+            ;;
         -n|--no-export)
             EXPORT_JSON=false
             shift
@@ -90,8 +103,13 @@ while [[ $# -gt 0 ]]; do
     esac
 done
 
-# Validate XML file
-if [[ ! -f "$XML_FILE" ]]; then
+# Validate input
+if [[ -n "$INPUT_DIR" ]]; then
+    if [[ ! -d "$INPUT_DIR" ]]; then
+        print_error "Input directory not found: $INPUT_DIR"
+        exit 1
+    fi
+elif [[ ! -f "$XML_FILE" ]]; then
     print_error "XML file not found: $XML_FILE"
     print_status "Please ensure the XML file exists or specify a different file with -x option"
     exit 1
@@ -125,7 +143,15 @@ mkdir -p "$PROJECT_ROOT/logs"
 mkdir -p "$PROJECT_ROOT/data/logs/dead_letter"
 
 # Build Python command
-PYTHON_CMD="python3 $ETL_SCRIPT --xml \"$XML_FILE\" --log-level $LOG_LEVEL"
+if [[ -n "$INPUT_DIR" ]]; then
+    PYTHON_CMD="python3 $ETL_SCRIPT --dir \"$INPUT_DIR\" --log-level $LOG_LEVEL"
+else
+    PYTHON_CMD="python3 $ETL_SCRIPT --xml \"$XML_FILE\" --log-level $LOG_LEVEL"
+fi
+
+if [[ -n "$WORKERS" ]]; then
+    PYTHON_CMD="$PYTHON_CMD --workers $WORKERS"
+fi
 
 if [[ "$EXPORT_JSON" == false ]]; then
     PYTHON_CMD="$PYTHON_CMD --no-export"
@@ -137,7 +163,11 @@ fi
 
 # Run ETL pipeline
 print_status "Starting MoMo ETL Pipeline..."
-print_status "XML File: $XML_FILE"
+if [[ -n "$INPUT_DIR" ]]; then
+    print_status "Input Directory: $INPUT_DIR"
+else
+    print_status "XML File: $XML_FILE"
+fi
 print_status "Export JSON: $EXPORT_JSON"
 print_status "Dry Run: $DRY_RUN"
 print_status "Log Level: $LOG_LEVEL"
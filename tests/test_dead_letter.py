@@ -0,0 +1,79 @@
+"""
+Test cases for the dead-letter spool.
+"""
+
+import gzip
+import os
+import subprocess
+import sys
+from etl.dead_letter import OPEN_SUFFIX, DeadLetterSpool, read_segment
+
+
+class TestDeadLetterSpool:
+    """Test cases for writing, rotating and reading spool segments."""
+    
+    def test_write_and_read(self, tmp_path):
+        """Test entries come back with the failing SMS and its context."""
+        with DeadLetterSpool(tmp_path) as spool:
+            spool.write('parse', 'unknown_type', 'Müller sent 5 RWF', timestamp='2024-05-17T12:02:50',
+                        address='M-Money', parser_version='2', source='backup.xml', sms_date='1715940170000')
+        segments = spool.segments()
+        assert len(segments) == 1
+        entries = list(read_segment(segments[0]))
+        assert entries[0]['body'] == 'Müller sent 5 RWF'
+        assert entries[0]['reason'] == 'unknown_type'
+        assert entries[0]['sms_date'] == '1715940170000'
+        assert spool.written == 1
+    
+    def test_open_segment_is_renamed_on_close(self, tmp_path):
+        """Test a segment is written under the open suffix until it is closed."""
+        spool = DeadLetterSpool(tmp_path)
+        spool.write('load', 'duplicate', 'body')
+        assert spool.segment_path.name.endswith(OPEN_SUFFIX)
+        assert spool.segments() == []
+        spool.close()
+        assert not spool.segment_path.name.endswith(OPEN_SUFFIX)
+        assert spool.segments() == [spool.segment_path]
+    
+    def test_flush_makes_entries_readable(self, tmp_path):
+        """Test flushed entries can be read while the segment stays open."""
+        spool = DeadLetterSpool(tmp_path)
+        spool.write('parse', 'exception', 'body', error='boom')
+        spool.flush()
+        assert [entry['error'] for entry in read_segment(spool.segment_path)] == ['boom']
+        spool.close()
+    
+    def test_rotation(self, tmp_path):
+        """Test a new segment is started once one reaches max_bytes."""
+        with DeadLetterSpool(tmp_path, max_bytes=1) as spool:
+            for i in range(3):
+                spool.write('parse', 'unknown_type', f'body {i}')
+        segments = spool.segments()
+        assert len(segments) == 3
+        assert [entry['body'] for path in segments for entry in read_segment(path)] == ['body 0', 'body 1', 'body 2']
+    
+    def test_orphaned_segments_are_included(self, tmp_path):
+        """Test open segments of exited processes are returned and live ones are not."""
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        orphan = tmp_path / f"dead_letter-20240101-000000-000000-{exited.pid}.jsonl.gz{OPEN_SUFFIX}"
+        live = tmp_path / f"dead_letter-20240101-000000-000001-{os.getpid()}.jsonl.gz{OPEN_SUFFIX}"
+        for path in (orphan, live):
+            with gzip.open(path, 'wb') as f:
+                f.write(b'{"body": "kept"}\n')
+        assert DeadLetterSpool(tmp_path).segments() == [orphan]
+    
+    def test_truncated_and_corrupt_entries(self, tmp_path):
+        """Test complete entries are read from a truncated segment and corrupt lines are skipped."""
+        path = tmp_path / 'dead_letter-truncated.jsonl.gz'
+        # Flushed but never closed, as a process that died mid-segment leaves it
+        raw = open(path, 'wb')
+        writer = gzip.GzipFile(fileobj=raw, mode='wb')
+        writer.write(b'{"body": "first"}\nnot json\n{"body": "second"}\n')
+        writer.flush()
+        raw.close()
+        assert [entry['body'] for entry in read_segment(path)] == ['first', 'second']
+    
+    def test_missing_directory(self, tmp_path):
+        """Test a spool that was never written has no segments."""
+        assert DeadLetterSpool(tmp_path / 'missing').segments() == []
@@ -5,7 +5,7 @@ Test cases for Data Structures and Algorithms implementation.
 import pytest
 from fastapi.testclient import TestClient
 from api.app import app
-from dsa import SearchComparison, SortingComparison, DataStructuresDemo
+from dsa import SearchComparison, SortingComparison, DataStructuresDemo, ScalableBloomFilter
 
 client = TestClient(app)
 
@@ -212,6 +212,134 @@ class TestDataStructures:
         assert demo["max_transaction"] is not None
         assert len(demo["inorder_traversal"]) == len(self.test_transactions)
 
+class TestBloomFilter:
+    """Test cases for the scalable Bloom filter."""
+    
+    def setup_method(self):
+        """Set up a small filter that has to grow."""
+        self.bloom = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+        self.keys = [f"FT{i}:body{i}" for i in range(2000)]
+        for key in self.keys:
+            self.bloom.add(key)
+    
+    def test_no_false_negatives(self):
+        """Test every added key is found."""
+        assert all(key in self.bloom for key in self.keys)
+        assert len(self.bloom) <= len(self.keys)
+    
+    def test_grows_within_error_rate(self):
+        """Test the filter grows and keeps false positives near the error rate."""
+        assert len(self.bloom.filters) > 1
+        assert self.bloom.capacity >= len(self.keys)
+        
+        false_positives = sum(f"other{i}" in self.bloom for i in range(5000))
+        assert false_positives / 5000 < 0.02
+    
+    def test_add_reports_duplicates(self):
+        """Test adding a present key returns False."""
+        assert self.bloom.add(self.keys[0]) == False
+        assert self.bloom.add("new key") == True
+    
+    def test_save_and_load(self, tmp_path):
+        """Test a saved filter loads with its keys and metadata."""
+        self.bloom.metadata["watermark"] = 42
+        self.bloom.save(tmp_path / "bloom.bin")
+        
+        loaded = ScalableBloomFilter.load(tmp_path / "bloom.bin")
+        assert loaded.metadata == {"watermark": 42}
+        assert len(loaded) == len(self.bloom)
+        assert all(key in loaded for key in self.keys)
+    
+    def test_load_or_create_unreadable_file(self, tmp_path):
+        """Test an unreadable file gives an empty filter."""
+        path = tmp_path / "bloom.bin"
+        path.write_bytes(b"not a filter")
+        
+        bloom = ScalableBloomFilter.load_or_create(path, initial_capacity=10)
+        assert len(bloom) == 0
+        assert bloom.initial_capacity == 10
+    
+    def test_update_merges_copies(self):
+        """Test merging two copies keeps the keys of both, including grown slices."""
+        other = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+        extra = [f"extra{i}" for i in range(400)]
+        for key in extra:
+            other.add(key)
+        
+        self.bloom.update(other)
+        assert all(key in self.bloom for key in self.keys + extra)
+        assert len(self.bloom.filters) >= len(other.filters)
+    
+    def test_update_rejects_different_parameters(self):
+        """Test filters created with different parameters cannot be merged."""
+        with pytest.raises(ValueError):
+            self.bloom.update(ScalableBloomFilter(initial_capacity=50, error_rate=0.01))
+
+class FakeCursor:
+    """Cursor returning transactions rows above the queried transaction_id."""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.pending = []
+    
+    def execute(self, query, params=()):
+        self.pending = [row for row in self.rows if row[0] > params[0]]
+    
+    def fetchmany(self, size):
+        batch, self.pending = self.pending[:size], self.pending[size:]
+        return batch
+
+class TestDedupFilterPersistence:
+    """Test cases for saving the loader's dedup filter and catching up on new rows."""
+    
+    @pytest.fixture(autouse=True)
+    def filter_file(self, tmp_path, monkeypatch):
+        import etl.loader
+        path = tmp_path / "dedup_bloom.bin"
+        monkeypatch.setattr(etl.loader, "DEDUP_FILTER_FILE", path)
+        monkeypatch.setattr(etl.loader, "DEDUP_FILTER_CAPACITY", 100)
+        return path
+    
+    def make_loader(self, rows):
+        from etl.loader import MySQLDatabaseLoader
+        loader = MySQLDatabaseLoader(use_dedup_filter=True)
+        loader._open_dedup_filter(FakeCursor(rows))
+        return loader
+    
+    def test_catch_up_from_saved_watermark(self, filter_file):
+        """Test a reopened filter only reads rows above the saved watermark."""
+        from etl.loader import MySQLDatabaseLoader
+        rows = [(i, f"FT{i}", f"sms {i}") for i in range(1, 51)]
+        loader = self.make_loader(rows)
+        loader.save_dedup_filter()
+        assert filter_file.exists()
+        
+        rows += [(i, f"FT{i}", f"sms {i}") for i in range(51, 61)]
+        cursor = FakeCursor(rows)
+        reopened = MySQLDatabaseLoader(use_dedup_filter=True)
+        reopened._open_dedup_filter(cursor)
+        assert reopened.dedup_filter.metadata["watermark"] == 60
+        assert all(MySQLDatabaseLoader._dedup_key(f"FT{i}", f"sms {i}") in reopened.dedup_filter
+                   for i in range(1, 61))
+    
+    def test_concurrent_saves_are_merged(self, filter_file):
+        """Test a second loader's save keeps the first one's keys and the lower watermark."""
+        from etl.loader import MySQLDatabaseLoader
+        first = self.make_loader([])
+        second = self.make_loader([])
+        
+        for loader, ids in ((first, range(1, 21)), (second, range(21, 31))):
+            for i in ids:
+                loader.dedup_filter.add(MySQLDatabaseLoader._dedup_key(f"FT{i}", f"sms {i}"))
+            loader.dedup_filter.metadata["watermark"] = max(ids)
+            loader._dedup_filter_changed = True
+        first.save_dedup_filter()
+        second.save_dedup_filter()
+        
+        saved = ScalableBloomFilter.load(filter_file)
+        assert saved.metadata["watermark"] == 20
+        assert all(MySQLDatabaseLoader._dedup_key(f"FT{i}", f"sms {i}") in saved for i in range(1, 31))
+
 class TestDSAAPI:
     """Test cases for DSA API endpoints."""
     
@@ -0,0 +1,44 @@
+"""
+Test cases for the MoMo SMS prefilter.
+"""
+
+import random
+import re
+from etl.prefilter import MOMO_KEYWORDS, _keyword_pattern, is_momo_sender, is_momo_sms
+
+
+class TestPrefilter:
+    """Test cases for sender and keyword checks."""
+    
+    def test_momo_senders(self):
+        """Test sender addresses are matched case-insensitively as substrings."""
+        assert is_momo_sender('M-Money')
+        assert is_momo_sender('mtn rwanda')
+        assert not is_momo_sender('+250791666666')
+        assert not is_momo_sender('')
+    
+    def test_momo_sms(self):
+        """Test MoMo senders always pass and other senders need a keyword."""
+        assert is_momo_sms('Hello', 'M-Money')
+        assert is_momo_sms('You have RECEIVED 1500 rwf', '+250791666666')
+        assert is_momo_sms('Your New Balance is 2000', 'Bank')
+        assert not is_momo_sms('See you at dinner', '+250791666666')
+        assert not is_momo_sms('', '')
+    
+    def test_keyword_pattern_matches_plain_search(self):
+        """Test the trie regex agrees with searching for each keyword."""
+        pattern = re.compile(_keyword_pattern(MOMO_KEYWORDS))
+        keywords = [keyword.lower() for keyword in MOMO_KEYWORDS]
+        rng = random.Random(11)
+        alphabet = 'abcdefilmnorstuwx '
+        for _ in range(5000):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            if rng.random() < 0.3:
+                text += rng.choice(keywords)[:rng.randint(1, 8)]
+            assert (pattern.search(text) is not None) == any(keyword in text for keyword in keywords), text
+    
+    def test_keyword_pattern_drops_longer_keywords(self):
+        """Test keywords containing another keyword are left out of the pattern."""
+        assert _keyword_pattern(['fee', 'feed', 'Fees']) == 'fee'
+        assert _keyword_pattern(['sent', 'send']) == 'sen(?:d|t)'
+        assert _keyword_pattern([]) == ''
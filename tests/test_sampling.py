@@ -0,0 +1,83 @@
+"""
+Test cases for streaming sampling and the estimates built on it.
+"""
+
+import random
+import pytest
+from collections import Counter
+from etl.sampling import bernoulli_sample, estimate_distribution, reservoir_sample, wilson_interval
+
+
+class TestReservoirSample:
+    """Test cases for reservoir sampling."""
+    
+    def test_sample_size_and_members(self):
+        """Test k distinct items of the stream are returned."""
+        sample = reservoir_sample(range(10000), 50, random.Random(1))
+        assert len(sample) == 50
+        assert len(set(sample)) == 50
+        assert all(0 <= item < 10000 for item in sample)
+    
+    def test_short_stream(self):
+        """Test a stream shorter than k is returned whole."""
+        assert reservoir_sample(iter(range(5)), 10) == [0, 1, 2, 3, 4]
+        assert reservoir_sample(range(5), 0) == []
+    
+    def test_sample_is_uniform(self):
+        """Test every position of the stream is picked about equally often."""
+        rng = random.Random(7)
+        counts = Counter()
+        for _ in range(2000):
+            counts.update(reservoir_sample(range(20), 5, rng))
+        # Each item is expected 500 times
+        assert all(400 < counts[item] < 600 for item in range(20))
+    
+    def test_seeded_sample_is_repeatable(self):
+        """Test the same seed gives the same sample."""
+        assert reservoir_sample(range(1000), 10, random.Random(3)) == reservoir_sample(range(1000), 10, random.Random(3))
+
+
+class TestBernoulliSample:
+    """Test cases for Bernoulli sampling."""
+    
+    def test_rate(self):
+        """Test about rate of the items are kept, in stream order."""
+        sample = list(bernoulli_sample(range(100000), 0.1, random.Random(5)))
+        assert 9400 < len(sample) < 10600
+        assert sample == sorted(sample)
+    
+    def test_edge_rates(self):
+        """Test rates of one or more keep everything and rates of zero or less keep nothing."""
+        assert list(bernoulli_sample(range(10), 1)) == list(range(10))
+        assert list(bernoulli_sample(range(10), 0)) == []
+        assert list(bernoulli_sample(range(10), -1)) == []
+
+
+class TestEstimates:
+    """Test cases for confidence intervals and distribution estimates."""
+    
+    def test_wilson_interval(self):
+        """Test the interval contains the sample share and stays within [0, 1]."""
+        low, high = wilson_interval(30, 100)
+        assert low < 0.3 < high
+        assert round(low, 3) == 0.219 and round(high, 3) == 0.396
+        assert wilson_interval(0, 50)[0] == pytest.approx(0.0)
+        assert wilson_interval(50, 50)[1] == pytest.approx(1.0)
+        assert wilson_interval(0, 0) == (0.0, 1.0)
+    
+    def test_finite_population_correction(self):
+        """Test a known population narrows the interval and a full census has no width."""
+        low, high = wilson_interval(30, 100)
+        corrected_low, corrected_high = wilson_interval(30, 100, population=200)
+        assert corrected_high - corrected_low < high - low
+        assert wilson_interval(30, 100, population=100) == (0.3, 0.3)
+    
+    def test_estimate_distribution(self):
+        """Test shares and counts are scaled up to the population."""
+        estimates = estimate_distribution(Counter({'TRANSFER': 60, 'PAYMENT': 40}), 100, 1000)
+        assert list(estimates) == ['TRANSFER', 'PAYMENT']
+        transfer = estimates['TRANSFER']
+        assert transfer['sample_count'] == 60
+        assert transfer['share'] == 0.6
+        assert transfer['estimated_count'] == 600
+        assert transfer['estimated_low'] < 600 < transfer['estimated_high']
@@ -0,0 +1,74 @@
+"""
+Test cases for the shared-memory row transport between parse workers and the loader.
+"""
+
+import pytest
+from etl.loader import TransactionRow
+from etl.shm_transport import SharedBatch, pack_rows, unpack_rows, discard_rows, write_shared_batch
+
+
+def make_row(index, **overrides):
+    """A converted transaction with every kind of column filled in."""
+    values = dict(
+        amount=1500.0 + index, currency='RWF', date='2024-05-17 12:02:50', transaction_type='TRANSFER',
+        category='TRANSFER_OUTGOING', direction='debit', confidence=0.95, sender_name=None,
+        sender_phone=None, recipient_name='Jane Smith', recipient_phone='250791666666', momo_code=None,
+        sender_momo_id=None, agent_momo_number=None, business_name=None, fee=100.0, new_balance=None,
+        transaction_id=f'T{index}', financial_transaction_id=f'F{index}', external_transaction_id=None,
+        original_message=f'You have transferred {1500 + index} RWF', processed_at='2024-06-01T00:00:00',
+        sms_index=index
+    )
+    values.update(overrides)
+    return TransactionRow(**values)
+
+
+class TestSharedBatch:
+    """Test cases for writing and reading shared batches."""
+    
+    def setup_method(self):
+        """Set up test rows."""
+        self.rows = [make_row(i) for i in range(5)]
+        self.rows.append(make_row(5, sms_index=None, confidence=0.5, new_balance=2500.0,
+                                  tags=('large', 'weekend'), original_message='Müller paid 5 RWF'))
+    
+    def test_round_trip(self):
+        """Test rows come back equal, including None, tags and non-ASCII text."""
+        assert unpack_rows(pack_rows(self.rows)) == self.rows
+    
+    def test_empty_tags_stay_empty(self):
+        """Test an empty tag tuple is not read back as one empty tag."""
+        rows = [make_row(0, tags=()), make_row(1, tags=None), make_row(2, tags=('vip',))]
+        assert [row.tags for row in unpack_rows(pack_rows(rows))] == [(), None, ('vip',)]
+    
+    def test_empty_batch(self):
+        """Test a batch without rows."""
+        assert unpack_rows(pack_rows([])) == []
+    
+    def test_numeric_columns_are_views(self):
+        """Test numeric columns are read from the segment with None as NaN or -1."""
+        with SharedBatch(write_shared_batch(self.rows)) as batch:
+            assert len(batch) == len(self.rows)
+            assert batch.column('amount').tolist()[:2] == [1500.0, 1501.0]
+            assert batch.column('sms_index').tolist()[-1] == -1
+            assert batch.strings('category') == ['TRANSFER_OUTGOING'] * len(self.rows)
+    
+    def test_segment_is_unlinked_after_reading(self):
+        """Test a read batch cannot be opened again."""
+        handle = pack_rows(self.rows)
+        unpack_rows(handle)
+        with pytest.raises(FileNotFoundError):
+            SharedBatch(handle)
+    
+    def test_discard(self):
+        """Test a discarded batch is gone and discarding twice is harmless."""
+        handle = pack_rows(self.rows)
+        discard_rows(handle)
+        discard_rows(handle)
+        with pytest.raises(FileNotFoundError):
+            SharedBatch(handle)
+    
+    def test_pickle_transport(self):
+        """Test the pickle transport passes the rows through."""
+        assert unpack_rows(pack_rows(self.rows, 'pickle')) == self.rows
+        with pytest.raises(ValueError):
+            pack_rows(self.rows, 'carrier-pigeon')
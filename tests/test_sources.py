@@ -0,0 +1,133 @@
+"""
+Test cases for the SMS input sources.
+"""
+
+import sqlite3
+import pytest
+from etl.sources import (
+    SmsRecord, build_sms_index, iter_sqlite_sms, iter_xml_sms, iter_xml_sms_at, iter_xml_sms_chunks,
+    iter_xml_sms_range, merge_sms_sources, sqlite_sms_max_id
+)
+
+
+def write_backup(path, messages):
+    """Write an SMS backup holding (address, date, body) messages."""
+    elements = ''.join(
+        f'<sms protocol="0" address="{address}" date="{date}" body="{body}" readable_date="" />\n'
+        for address, date, body in messages
+    )
+    path.write_text(f"<?xml version='1.0' encoding='UTF-8'?>\n<smses count=\"{len(messages)}\">\n"
+                    f"{elements}</smses>\n", encoding='utf-8')
+    return path
+
+
+class TestXmlSources:
+    """Test cases for reading XML backups."""
+    
+    def setup_method(self):
+        """Set up test messages."""
+        self.messages = [('M-Money', str(1000 + i), f'You have received {i} RWF') for i in range(20)]
+        self.messages.append(('M-Money', '2000', 'Amafaranga 500 RWF yoherejwe kuri Müller'))
+    
+    def test_iter_xml_sms(self, tmp_path):
+        """Test every SMS is read in file order."""
+        path = write_backup(tmp_path / 'backup.xml', self.messages)
+        records = list(iter_xml_sms(path))
+        assert [(r.address, r.date, r.body) for r in records] == self.messages
+        assert records[0].timestamp_ms == 1000
+        assert SmsRecord('', 'not-a-date', '').timestamp_ms == 0
+    
+    def test_chunks_split_anywhere(self, tmp_path):
+        """Test records are read from byte chunks that split elements."""
+        data = write_backup(tmp_path / 'backup.xml', self.messages).read_bytes()
+        chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+        assert list(iter_xml_sms_chunks(chunks)) == list(iter_xml_sms(tmp_path / 'backup.xml'))
+    
+    def test_ranges_cover_each_sms_once(self, tmp_path):
+        """Test consecutive byte ranges yield every SMS exactly once."""
+        path = write_backup(tmp_path / 'backup.xml', self.messages)
+        size = path.stat().st_size
+        for step in (1, 50, 333, size):
+            records = []
+            for start in range(0, size, step):
+                records.extend(iter_xml_sms_range(path, start, min(size, start + step)))
+            assert [r.body for r in records] == [body for _, _, body in self.messages]
+    
+    def test_index_reads_latest_first(self, tmp_path):
+        """Test the index finds every SMS and reads them back newest first."""
+        path = write_backup(tmp_path / 'backup.xml', self.messages)
+        index = build_sms_index(path)
+        assert len(index) == len(self.messages)
+        assert index.count_since(1015) == 6
+        records = list(iter_xml_sms_at(path, index, index.latest_first()))
+        assert [r.date for r in records] == sorted((date for _, date, _ in self.messages), key=int, reverse=True)
+    
+    def test_index_of_empty_file(self, tmp_path):
+        """Test an empty file gives an empty index."""
+        path = tmp_path / 'empty.xml'
+        path.write_bytes(b'')
+        assert len(build_sms_index(path)) == 0
+
+
+class TestMergeSources:
+    """Test cases for merging overlapping backups."""
+    
+    def test_merge_orders_and_drops_duplicates(self, tmp_path):
+        """Test backups are merged by date and exact duplicates are dropped."""
+        first = write_backup(tmp_path / 'a.xml', [('M-Money', '1', 'a'), ('M-Money', '3', 'c'), ('M-Money', '5', 'e')])
+        second = write_backup(tmp_path / 'b.xml', [('M-Money', '2', 'b'), ('M-Money', '3', 'c'), ('M-Money', '3', 'd')])
+        stats = {}
+        records = list(merge_sms_sources([first, second], stats=stats))
+        assert [r.body for r in records] == ['a', 'b', 'c', 'd', 'e']
+        assert stats['duplicates_dropped'] == 1
+        assert stats['records_read'] == {str(first): 3, str(second): 3}
+    
+    def test_merge_without_dedup(self, tmp_path):
+        """Test duplicates are kept when dedup is off."""
+        first = write_backup(tmp_path / 'a.xml', [('M-Money', '1', 'a')])
+        second = write_backup(tmp_path / 'b.xml', [('M-Money', '1', 'a')])
+        assert len(list(merge_sms_sources([first, second], dedup=False))) == 2
+    
+    def test_same_body_from_other_sender_is_kept(self, tmp_path):
+        """Test records only count as duplicates when the sender matches too."""
+        first = write_backup(tmp_path / 'a.xml', [('M-Money', '1', 'a')])
+        second = write_backup(tmp_path / 'b.xml', [('MTN', '1', 'a')])
+        assert len(list(merge_sms_sources([first, second]))) == 2
+
+
+class TestSqliteSource:
+    """Test cases for reading an Android SMS database."""
+    
+    def setup_method(self):
+        """Set up test rows."""
+        self.rows = [(1, 'M-Money', 300, 'c'), (2, 'M-Money', 100, 'a'), (3, None, None, None), (4, 'MTN', 200, 'b')]
+    
+    def make_database(self, path):
+        """Write the test rows to an sms table."""
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE sms (_id INTEGER PRIMARY KEY, address TEXT, date INTEGER, body TEXT)")
+        connection.executemany("INSERT INTO sms VALUES (?, ?, ?, ?)", self.rows)
+        connection.commit()
+        connection.close()
+        return path
+    
+    def test_reads_after_watermark(self, tmp_path):
+        """Test only SMS past after_id and up to until_id are read."""
+        path = self.make_database(tmp_path / 'mmssms.db')
+        assert sqlite_sms_max_id(path) == 4
+        records = list(iter_sqlite_sms(path, after_id=1, until_id=3))
+        assert records == [SmsRecord('M-Money', '100', 'a'), SmsRecord('', '', '')]
+    
+    def test_date_order(self, tmp_path):
+        """Test SMS can be read in date order."""
+        path = self.make_database(tmp_path / 'mmssms.db')
+        assert [r.body for r in iter_sqlite_sms(path, order='date')] == ['', 'a', 'b', 'c']
+        with pytest.raises(ValueError):
+            list(iter_sqlite_sms(path, order='body'))
+    
+    def test_database_is_not_modified(self, tmp_path):
+        """Test the database is opened read-only."""
+        path = self.make_database(tmp_path / 'mmssms.db')
+        before = path.read_bytes()
+        list(iter_sqlite_sms(path))
+        assert path.read_bytes() == before
@@ -0,0 +1,77 @@
+"""
+Test cases for transaction validation.
+"""
+
+from etl.dead_letter import DeadLetterSpool, read_segment
+from etl.parser import ParsedTransaction
+from etl.validation import REJECT_PREFIX, is_valid_date, is_valid_phone, validate_transactions
+
+
+class TestValidationRules:
+    """Test cases for the phone and date rules."""
+    
+    def test_phones(self):
+        """Test full, separated, masked and missing phone numbers."""
+        assert is_valid_phone('250791666666')
+        assert is_valid_phone('+250791666666')
+        assert is_valid_phone('0791 666-666')
+        assert is_valid_phone('*********013')
+        assert is_valid_phone(None)
+        assert not is_valid_phone('12345')
+        assert not is_valid_phone('1791666666')
+        assert not is_valid_phone('*****abc013')
+    
+    def test_dates(self):
+        """Test ISO dates and the configured formats are accepted."""
+        assert is_valid_date('2024-05-17 12:02:50')
+        assert is_valid_date('2024-05-17T12:02:50')
+        assert is_valid_date('17/05/2024')
+        assert not is_valid_date('May 17th')
+    
+    def test_missing_date_is_accepted(self):
+        """Test a transaction without a date is not rejected."""
+        assert is_valid_date(None)
+        assert is_valid_date('')
+        transaction = ParsedTransaction(amount=1500.0)
+        assert validate_transactions([transaction]) == ([transaction], 0)
+
+
+class TestValidateTransactions:
+    """Test cases for batch validation."""
+    
+    def setup_method(self):
+        """Set up a batch with one transaction breaking each rule."""
+        self.valid = [
+            ParsedTransaction(amount=1500.0, date='2024-05-17 12:02:50', recipient_phone='250791666666'),
+            ParsedTransaction(amount=100.0, date='2024-05-17', sender_phone='*********013')
+        ]
+        self.invalid = [
+            ParsedTransaction(amount=None, date='2024-05-17'),
+            ParsedTransaction(amount=50.0, date='2024-05-17'),
+            ParsedTransaction(amount=20000000.0, date='2024-05-17', sender_phone='123'),
+            ParsedTransaction(amount=1500.0, date='yesterday', original_message='You have received 1500 RWF')
+        ]
+    
+    def test_valid_transactions_keep_their_order(self):
+        """Test the valid transactions are returned in order with the reject count."""
+        batch = [self.invalid[0], self.valid[0], self.invalid[1], self.invalid[2], self.valid[1], self.invalid[3]]
+        valid, rejected = validate_transactions(batch)
+        assert valid == self.valid
+        assert rejected == len(self.invalid)
+    
+    def test_all_valid_and_empty(self):
+        """Test a clean batch is returned whole and an empty one is allowed."""
+        assert validate_transactions(self.valid) == (self.valid, 0)
+        assert validate_transactions([]) == ([], 0)
+    
+    def test_rejects_are_spooled_with_every_reason(self, tmp_path):
+        """Test each reject is written with every rule it broke."""
+        with DeadLetterSpool(tmp_path, prefix=REJECT_PREFIX) as rejects:
+            validate_transactions(self.valid + self.invalid, rejects, 'backup.xml')
+        entries = [entry for path in rejects.segments() for entry in read_segment(path)]
+        assert [entry['reason'] for entry in entries] == [
+            'missing_amount', 'amount_below_minimum', 'amount_above_maximum,invalid_sender_phone', 'invalid_date'
+        ]
+        assert entries[3]['body'] == 'You have received 1500 RWF'
+        assert {entry['stage'] for entry in entries} == {'validate'}
+        assert {entry['source'] for entry in entries} == {'backup.xml'}